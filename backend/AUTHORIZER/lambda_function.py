@@ -0,0 +1,211 @@
+import os
+import json
+import time
+import hmac
+import base64
+import hashlib
+import urllib.request
+from common.cache import MISSING, TTLCache
+from common.roles import role_from_claims
+from common.instrumentation import log
+
+# Environment variables
+USER_POOL_ID = os.environ['USER_POOL_ID']
+CLIENT_ID = os.environ['COGNITO_CLIENT_ID']
+REGION = USER_POOL_ID.split('_')[0]
+ISSUER = f"https://cognito-idp.{REGION}.amazonaws.com/{USER_POOL_ID}"
+JWKS_URL = f"{ISSUER}/.well-known/jwks.json"
+JWKS_CACHE_PATH = os.environ.get('JWKS_CACHE_PATH', f"/tmp/jwks-{USER_POOL_ID}.json")
+JWKS_MAX_AGE_SECONDS = int(os.environ.get('JWKS_MAX_AGE_SECONDS', '86400'))
+JWKS_MIN_REFRESH_SECONDS = int(os.environ.get('JWKS_MIN_REFRESH_SECONDS', '60'))
+CLOCK_SKEW_SECONDS = int(os.environ.get('CLOCK_SKEW_SECONDS', '30'))
+DECISION_CACHE_SIZE = int(os.environ.get('DECISION_CACHE_SIZE', '2048'))
+DECISION_CACHE_TTL_SECONDS = int(os.environ.get('DECISION_CACHE_TTL_SECONDS', '300'))
+
+# Lambda authorizer that verifies Cognito RS256 tokens locally.
+# Signing keys are fetched once and kept in memory and in /tmp, so a warm
+# container never calls Cognito to authorize a request.
+
+# DER prefix of the DigestInfo for SHA-256 (RFC 8017, EMSA-PKCS1-v1_5)
+SHA256_DIGEST_INFO = bytes.fromhex('3031300d060960864801650304020105000420')
+
+# kid -> (modulus, exponent)
+_signing_keys = {}
+_jwks_fetched_at = 0.0
+
+# sha256(token) -> verified claims
+decision_cache = TTLCache(DECISION_CACHE_SIZE, DECISION_CACHE_TTL_SECONDS)
+
+class Unauthorized(Exception):
+    pass
+
+def b64url_decode(value):
+    return base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+
+def b64url_to_int(value):
+    return int.from_bytes(b64url_decode(value), 'big')
+
+def load_jwks(jwks, fetched_at):
+    """Replace the in-memory signing keys with the RSA keys from a JWKS document."""
+    global _signing_keys, _jwks_fetched_at
+    _signing_keys = {
+        key['kid']: (b64url_to_int(key['n']), b64url_to_int(key['e']))
+        for key in jwks.get('keys', [])
+        if key.get('kty') == 'RSA'
+    }
+    _jwks_fetched_at = fetched_at
+
+def read_jwks_file():
+    """Load the JWKS saved in /tmp by an earlier invocation, if it is recent enough."""
+    try:
+        with open(JWKS_CACHE_PATH) as f:
+            cached = json.load(f)
+        if time.time() - cached.get('fetchedAt', 0) > JWKS_MAX_AGE_SECONDS:
+            return False
+        load_jwks(cached['jwks'], cached['fetchedAt'])
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        # Missing or damaged; fetch a fresh copy
+        return False
+    return True
+
+def fetch_jwks():
+    """Download the user pool JWKS and save it to /tmp for later cold starts."""
+    with urllib.request.urlopen(JWKS_URL, timeout=3) as response:
+        jwks = json.loads(response.read())
+    fetched_at = time.time()
+    load_jwks(jwks, fetched_at)
+    try:
+        with open(JWKS_CACHE_PATH, 'w') as f:
+            json.dump({'fetchedAt': fetched_at, 'jwks': jwks}, f)
+    except OSError as e:
+        log("Could not write JWKS cache", level='WARN', error=str(e))
+
+def refresh_jwks():
+    """fetch_jwks(), with a failed download or a bad document reported as Unauthorized."""
+    try:
+        fetch_jwks()
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        # URLError and timeouts are OSErrors
+        log("Could not fetch JWKS", level='ERROR', error=str(e))
+        raise Unauthorized("Signing keys unavailable")
+
+def get_signing_key(kid):
+    """Return (n, e) for a key id, refreshing the JWKS when an unknown key shows up after rotation."""
+    if not _signing_keys or time.time() - _jwks_fetched_at > JWKS_MAX_AGE_SECONDS:
+        if not read_jwks_file():
+            refresh_jwks()
+    key = _signing_keys.get(kid)
+    if key is None and time.time() - _jwks_fetched_at > JWKS_MIN_REFRESH_SECONDS:
+        refresh_jwks()
+        key = _signing_keys.get(kid)
+    if key is None:
+        raise Unauthorized(f"Unknown signing key: {kid}")
+    return key
+
+def verify_rs256(signing_input, signature, public_key):
+    """Check an RSASSA-PKCS1-v1_5 SHA-256 signature."""
+    n, e = public_key
+    size = (n.bit_length() + 7) // 8
+    if len(signature) != size:
+        return False
+    decrypted = pow(int.from_bytes(signature, 'big'), e, n).to_bytes(size, 'big')
+    digest_info = SHA256_DIGEST_INFO + hashlib.sha256(signing_input).digest()
+    padding = size - len(digest_info) - 3
+    if padding < 8:
+        return False
+    expected = b'\x00\x01' + b'\xff' * padding + b'\x00' + digest_info
+    return hmac.compare_digest(decrypted, expected)
+
+def verify_token(token):
+    """Verify signature, expiry, issuer and audience of a Cognito IdToken or AccessToken. Returns the claims."""
+    try:
+        header_segment, payload_segment, signature_segment = token.split('.')
+        header = json.loads(b64url_decode(header_segment))
+        claims = json.loads(b64url_decode(payload_segment))
+        signature = b64url_decode(signature_segment)
+    except ValueError:
+        raise Unauthorized("Malformed token")
+    # Valid JSON isn't necessarily an object: "W10" decodes to []
+    if not isinstance(header, dict) or not isinstance(claims, dict):
+        raise Unauthorized("Malformed token")
+
+    if header.get('alg') != 'RS256':
+        raise Unauthorized("Unsupported algorithm")
+    if not isinstance(header.get('kid'), str):
+        raise Unauthorized("Malformed token")
+    public_key = get_signing_key(header['kid'])
+    if not verify_rs256(f"{header_segment}.{payload_segment}".encode('ascii'), signature, public_key):
+        raise Unauthorized("Invalid signature")
+
+    if claims.get('iss') != ISSUER:
+        raise Unauthorized("Invalid issuer")
+    expires = claims.get('exp')
+    if not isinstance(expires, (int, float)) or isinstance(expires, bool) or not claims.get('sub'):
+        raise Unauthorized("Malformed token")
+    if expires + CLOCK_SKEW_SECONDS < time.time():
+        raise Unauthorized("Token expired")
+
+    token_use = claims.get('token_use')
+    if token_use == 'id':
+        audience = claims.get('aud')
+    elif token_use == 'access':
+        audience = claims.get('client_id')
+    else:
+        raise Unauthorized("Invalid token_use")
+    if audience != CLIENT_ID:
+        raise Unauthorized("Invalid audience")
+    return claims
+
+def authorize(token):
+    """Verify a token, reusing the decision for tokens seen recently by this container."""
+    token_hash = hashlib.sha256(token.encode('utf-8')).hexdigest()
+    claims = decision_cache.get(token_hash)
+    if claims is MISSING:
+        claims = verify_token(token)
+        ttl = min(DECISION_CACHE_TTL_SECONDS, claims['exp'] - time.time())
+        decision_cache.set(token_hash, claims, ttl)
+    return claims
+
+def get_token(event):
+    """Read the bearer token from a TOKEN or REQUEST authorizer event."""
+    token = event.get('authorizationToken')
+    if token is None:
+        headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+        token = headers.get('authorization')
+    if not token:
+        raise Unauthorized("Missing token")
+    if token.lower().startswith('bearer '):
+        token = token[7:]
+    return token.strip()
+
+def build_policy(claims, method_arn):
+    """Allow every method of the API stage so API Gateway can reuse the cached policy."""
+    arn_parts = method_arn.split('/')
+    resource = '/'.join(arn_parts[:2]) + '/*'
+    return {
+        "principalId": claims['sub'],
+        "policyDocument": {
+            "Version": "2012-10-17",
+            "Statement": [{
+                "Action": "execute-api:Invoke",
+                "Effect": "Allow",
+                "Resource": resource
+            }]
+        },
+        "context": {
+            "username": claims.get('cognito:username') or claims.get('username', ''),
+            "email": claims.get('email', ''),
+            # From the groups an admin assigned, never the self-declared custom:userRole
+            "role": role_from_claims(claims),
+            "tokenUse": claims['token_use']
+        }
+    }
+
+def lambda_handler(event, context):
+    try:
+        claims = authorize(get_token(event))
+    except Unauthorized as e:
+        log("Rejected token", level='WARN', reason=str(e))
+        # API Gateway turns this exact message into a 401
+        raise Exception("Unauthorized")
+    return build_policy(claims, event['methodArn'])
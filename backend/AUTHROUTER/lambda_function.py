@@ -0,0 +1,92 @@
+import os
+import json
+import importlib.util
+from common.email_index import EMAIL_INDEX_TABLE_NAME
+from common.events import request_method
+from common.instrumentation import instrumented_handler
+from common.responses import cors_headers, responder
+from common.warmup import prewarm_on_init, warmup_response
+
+# Single entry point for the auth endpoints, so LOGIN, CREATEUSER and RESETPASSWORD
+# share one warm container pool. Each route's handler module is imported the first
+# time that route is hit; the existing handler logic runs unchanged.
+#
+# The deployment package holds this directory next to the handler directories
+# (HANDLERS_ROOT, by default the parent of this file) plus the COMMON layer.
+
+HANDLERS_ROOT = os.environ.get('HANDLERS_ROOT', os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# path -> (handler directory, allowed actions, default action)
+ROUTES = {
+    '/auth/login': ('LOGIN', ('check', 'login', 'refresh', 'new_password'), 'login'),
+    '/auth/refresh': ('LOGIN', ('refresh',), 'refresh'),
+    '/users': ('CREATEUSER', ('signup', 'confirm', 'resend_verification'), 'signup'),
+    '/auth/reset-password': ('RESETPASSWORD', ('initiate', 'confirm'), 'initiate')
+}
+
+# handler directory -> lambda_handler, filled lazily
+_handlers = {}
+
+respond = responder("OPTIONS,POST,GET")
+
+# Every route talks to Cognito; signup also reads the email index. This init-time prewarm
+# covers the route handlers too: they skip their own when load_handler imports them.
+WARMUP_TARGETS = {'cognito': True, 'tables': {EMAIL_INDEX_TABLE_NAME: {'email': '__warmup__'}}}
+prewarm_on_init(**WARMUP_TARGETS)
+
+def load_handler(directory):
+    """Import <HANDLERS_ROOT>/<directory>/lambda_function.py once and return its lambda_handler."""
+    handler = _handlers.get(directory)
+    if handler is None:
+        path = os.path.join(HANDLERS_ROOT, directory, 'lambda_function.py')
+        spec = importlib.util.spec_from_file_location(f"{directory.lower()}_lambda_function", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        handler = _handlers[directory] = module.lambda_handler
+    return handler
+
+def match_route(event):
+    """
+    Find the route for the request. The resource template is used when it is one of the
+    routes (REST API); otherwise the path, with the stage prefix an HTTP API puts on
+    rawPath removed, must equal a route exactly.
+    """
+    resource = (event.get('resource') or '').rstrip('/')
+    if resource in ROUTES:
+        return resource, ROUTES[resource]
+    path = event.get('path') or event.get('rawPath') or ''
+    stage = (event.get('requestContext') or {}).get('stage')
+    if stage and stage != '$default' and path.startswith(f"/{stage}/"):
+        path = path[len(stage) + 1:]
+    path = path.rstrip('/') or '/'
+    return path, ROUTES.get(path)
+
+@instrumented_handler('AUTHROUTER')
+def lambda_handler(event, context):
+    warm = warmup_response(event, **WARMUP_TARGETS)
+    if warm:
+        return warm
+
+    path, target = match_route(event)
+    if target is None:
+        return respond(404, {"success": False, "message": f"Unknown route: {path}"})
+
+    method = request_method(event)
+    if method == 'OPTIONS':
+        # CORS preflight never needs the handler module
+        return {"statusCode": 200, "headers": cors_headers("OPTIONS,POST,GET"), "body": ""}
+
+    directory, actions, default_action = target
+    try:
+        body = json.loads(event.get('body') or '{}')
+    except ValueError:
+        return respond(400, {"success": False, "message": "Request body must be JSON"})
+    if not isinstance(body, dict):
+        return respond(400, {"success": False, "message": "Request body must be a JSON object"})
+
+    action = body.setdefault('action', default_action)
+    if action not in actions:
+        return respond(400, {"success": False, "message": f"Invalid action: {action}"})
+
+    # Hand the parsed body through so the handler doesn't decode it again
+    return load_handler(directory)(dict(event, parsedBody=body), context)
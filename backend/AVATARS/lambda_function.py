@@ -0,0 +1,218 @@
+import os
+import io
+import sys
+import json
+import uuid
+import tempfile
+from datetime import datetime
+from urllib.parse import unquote_plus
+from common.clients import get_dynamodb, get_table
+from common.events import caller, request_method
+from common.profiles import user_id_for
+from common.storage import ObjectTooLarge, get_storage
+from common.instrumentation import instrumented_handler, set_request_fields, log
+from common.responses import responder, parse_body
+
+# Pillow is a required dependency (requirements.txt, built into this function's layer).
+# Without it the function fails at import rather than quietly skipping the resizing.
+from PIL import Image, ImageOps
+
+# Environment variables
+TABLE_NAME = os.environ['USER_TABLE']
+AVATAR_MAX_BYTES = int(os.environ.get('AVATAR_MAX_BYTES', str(5 * 1024 * 1024)))
+AVATAR_MAX_PIXELS = int(os.environ.get('AVATAR_MAX_PIXELS', str(40_000_000)))
+AVATAR_SIZES = [int(size) for size in os.environ.get('AVATAR_SIZES', '64,256').split(',')]
+
+respond = responder("OPTIONS,POST", "Content-Type,Authorization")
+
+# Profile pictures. The browser never sends image bytes through the API:
+#   1. POST {"action": "upload"}               -> presigned POST for uploads/<userId>/<uploadId>
+#   2. the browser posts the file straight to storage (size and type enforced there)
+#   3. the S3 ObjectCreated event makes square WebP and JPEG variants for each
+#      AVATAR_SIZES edge and records their URLs on the USER_TABLE row under `avatar`,
+#      or records why the file was refused under `avatarRejected`
+#   4. the browser polls POST {"action": "status", "key": ...}, which only reads the row
+# The S3 event is the only place an upload is processed, so each upload is resized once.
+# Variant keys include the upload id, so they never change and can be cached forever.
+#
+# Replay a recorded S3 event locally (with STORAGE_BACKEND=local):
+#   python lambda_function.py events/avatar_uploaded.json
+
+UPLOAD_PREFIX = 'uploads/'
+AVATAR_PREFIX = 'avatars/'
+IMAGE_CONTENT_TYPE = 'image/'
+VARIANT_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Uploads are spooled to memory up to this size, then to /tmp
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 75, 'method': 4}),
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 80, 'optimize': True, 'progressive': True})
+}
+
+class ProfileNotFound(Exception):
+    pass
+
+def caller_user_id(event):
+    username, _ = caller(event)
+    return user_id_for(username) if username else None
+
+def parse_upload_key(key):
+    """uploads/<userId>/<uploadId> -> (userId, uploadId)."""
+    parts = key.split('/')
+    if len(parts) != 3 or f"{parts[0]}/" != UPLOAD_PREFIX or not parts[1] or not parts[2]:
+        raise ValueError(f"Not an avatar upload key: {key}")
+    return parts[1], parts[2]
+
+def open_image(spool):
+    """Open an uploaded image, refusing decompression bombs before decoding any pixels."""
+    spool.seek(0)
+    image = Image.open(spool)
+    width, height = image.size
+    if width * height > AVATAR_MAX_PIXELS:
+        raise ValueError(f"Image is {width}x{height}, over the {AVATAR_MAX_PIXELS} pixel limit")
+    # JPEGs can be decoded at 1/2, 1/4 or 1/8 scale, so a phone photo never expands to full size
+    image.draft('RGB', (max(AVATAR_SIZES) * 2, max(AVATAR_SIZES) * 2))
+    image = ImageOps.exif_transpose(image)
+    return image.convert('RGB')
+
+def render_variants(image, user_id, upload_id):
+    """Yield (size, format, key, bytes, content type) for each square variant, largest first."""
+    for size in sorted(AVATAR_SIZES, reverse=True):
+        square = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        for fmt, (pil_format, content_type, options) in FORMATS.items():
+            buffer = io.BytesIO()
+            square.save(buffer, pil_format, **options)
+            yield size, fmt, f"{AVATAR_PREFIX}{user_id}/{upload_id}/{size}.{fmt}", buffer.getvalue(), content_type
+        # Smaller sizes are resized from the previous one rather than the original
+        image = square
+
+def process_upload(key):
+    """Build the variants for an uploaded original and record them on the profile row."""
+    user_id, upload_id = parse_upload_key(key)
+    storage = get_storage()
+    avatar = {'original': storage.url(key), 'uploadId': upload_id, 'sizes': {}}
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as spool:
+        storage.read_into(key, spool, AVATAR_MAX_BYTES)
+        image = open_image(spool)
+        for size, fmt, variant_key, data, content_type in render_variants(image, user_id, upload_id):
+            storage.put(variant_key, data, content_type, VARIANT_CACHE_CONTROL)
+            avatar['sizes'].setdefault(str(size), {})[fmt] = storage.url(variant_key)
+            log("Avatar variant stored", size=size, format=fmt, bytes=len(data))
+
+    try:
+        get_table(TABLE_NAME).update_item(
+            Key={'userId': user_id},
+            # Bumping version invalidates the PROFILE ETag
+            UpdateExpression='SET avatar = :avatar, updatedAt = :now ADD version :one',
+            ConditionExpression='attribute_exists(userId)',
+            ExpressionAttributeValues={':avatar': avatar, ':now': datetime.utcnow().isoformat(), ':one': 1}
+        )
+    except get_dynamodb().meta.client.exceptions.ConditionalCheckFailedException:
+        raise ProfileNotFound(f"No profile for user {user_id}")
+    return avatar
+
+def record_rejection(key, message):
+    """Note on the profile row why an upload was refused, for the status action to report."""
+    user_id, upload_id = parse_upload_key(key)
+    try:
+        get_table(TABLE_NAME).update_item(
+            Key={'userId': user_id},
+            UpdateExpression='SET avatarRejected = :rejected',
+            ConditionExpression='attribute_exists(userId)',
+            ExpressionAttributeValues={':rejected': {'uploadId': upload_id, 'message': message}}
+        )
+    except get_dynamodb().meta.client.exceptions.ConditionalCheckFailedException:
+        pass
+
+def rejection_message(error):
+    if isinstance(error, ObjectTooLarge):
+        return f"Pictures can be at most {AVATAR_MAX_BYTES // (1024 * 1024)} MB."
+    if isinstance(error, OSError):
+        # Pillow raises UnidentifiedImageError (an OSError) for files that aren't images
+        return "Unsupported image. Please upload a JPEG, PNG or WebP picture."
+    return str(error)
+
+def handle_s3_event(records):
+    processed = 0
+    for record in records:
+        key = unquote_plus(record['s3']['object']['key'])
+        if not key.startswith(UPLOAD_PREFIX):
+            continue
+        try:
+            process_upload(key)
+            processed += 1
+        except ProfileNotFound as e:
+            log("Avatar upload rejected", level='WARN', key=key, error=str(e))
+        except (ValueError, ObjectTooLarge, OSError) as e:
+            # A bad file won't get better on retry
+            log("Avatar upload rejected", level='WARN', key=key, error=str(e))
+            record_rejection(key, rejection_message(e))
+    return {'processed': processed}
+
+def upload_status(user_id, upload_id):
+    """Where the upload stands, from the profile row alone: ready, rejected or processing."""
+    item = get_table(TABLE_NAME).get_item(
+        Key={'userId': user_id},
+        ProjectionExpression='avatar, avatarRejected'
+    ).get('Item')
+    if item is None:
+        raise ProfileNotFound(f"No profile for user {user_id}")
+    if (item.get('avatar') or {}).get('uploadId') == upload_id:
+        return respond(200, {"success": True, "status": "ready", "avatar": item['avatar']})
+    rejected = item.get('avatarRejected') or {}
+    if rejected.get('uploadId') == upload_id:
+        return respond(200, {"success": False, "status": "rejected", "message": rejected.get('message')})
+    return respond(202, {"success": True, "status": "processing"}, headers={"Retry-After": "1"})
+
+@instrumented_handler('AVATARS')
+def lambda_handler(event, context):
+    if 'Records' in event:
+        set_request_fields(action='s3_event')
+        return handle_s3_event(event['Records'])
+    if request_method(event) == 'OPTIONS':
+        return respond(200, {})
+    try:
+        user_id = caller_user_id(event)
+        if not user_id:
+            return respond(401, {"success": False, "message": "Unauthorized"})
+
+        body = parse_body(event)
+        if not isinstance(body, dict):
+            raise ValueError("Request body must be a JSON object")
+        action = body.get('action', 'upload')
+        set_request_fields(action=action)
+
+        if action == 'upload':
+            key = f"{UPLOAD_PREFIX}{user_id}/{uuid.uuid4().hex}"
+            target = get_storage().upload_target(key, IMAGE_CONTENT_TYPE, AVATAR_MAX_BYTES)
+            return respond(200, {"success": True, "key": key, "maxBytes": AVATAR_MAX_BYTES,
+                                 "url": target['url'], "fields": target['fields']})
+
+        if action == 'status':
+            owner, upload_id = parse_upload_key(body['key'])
+            if owner != user_id:
+                return respond(403, {"success": False, "message": "Upload belongs to another user"})
+            return upload_status(user_id, upload_id)
+
+        return respond(400, {"success": False, "message": f"Invalid action: {action}"})
+
+    except ProfileNotFound as e:
+        return respond(404, {"success": False, "message": str(e)})
+
+    except (KeyError, ValueError) as e:
+        log("Avatar request rejected", level='WARN', error=str(e))
+        return respond(400, {"success": False, "message": f"Invalid request: {e}"})
+
+    except Exception as e:
+        log("An unexpected error occurred", level='ERROR', error=str(e))
+        return respond(500, {
+            "success": False,
+            "message": "An internal error occurred. Please try again later."
+        })
+
+if __name__ == '__main__':
+    for path in sys.argv[1:]:
+        with open(path) as f:
+            print(json.dumps(lambda_handler(json.load(f), None), indent=2))
@@ -0,0 +1,663 @@
+import re
+import json
+import time
+import uuid
+import base64
+import random
+import threading
+from copy import deepcopy
+from decimal import Decimal
+
+# In-process stand-ins for the Cognito and DynamoDB operations the handlers use.
+# Every call goes through FakeBackend.call(), which injects latency, errors and
+# throttling and counts remote calls per operation and per thread.
+
+class FakeClientError(Exception):
+    """Shaped like botocore's ClientError so handlers and common.throttle treat it the same way."""
+
+    code = 'ClientError'
+
+    def __init__(self, message='', operation_name=''):
+        super().__init__(f"An error occurred ({self.code}) when calling the {operation_name} operation: {message}")
+        self.response = {'Error': {'Code': self.code, 'Message': message}}
+        self.operation_name = operation_name
+
+class FakeExceptions:
+    """client.exceptions namespace; exception classes are created on first access."""
+
+    def __init__(self):
+        self._classes = {}
+
+    def __getattr__(self, code):
+        if code.startswith('_'):
+            raise AttributeError(code)
+        if code not in self._classes:
+            self._classes[code] = type(code, (FakeClientError,), {'code': code})
+        return self._classes[code]
+
+class FakeBackend:
+    """
+    Shared state and fault injection for the fakes.
+
+    latency_ms: {'default': ms, '<operation>': ms} added to each call
+    jitter_ms: uniform random extra latency
+    error_rate / throttle_rate: probability that a call fails with InternalErrorException / throttling
+    """
+
+    def __init__(self, latency_ms=None, jitter_ms=0.0, error_rate=0.0, throttle_rate=0.0, seed=None):
+        self.latency_ms = latency_ms or {}
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.random = random.Random(seed)
+        self.counts = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.cognito = FakeCognito(self)
+        self.dynamodb = FakeDynamoDB(self)
+
+    def call(self, service, operation, exceptions):
+        """Count one remote call and apply the configured latency and faults."""
+        with self._lock:
+            self.counts[operation] = self.counts.get(operation, 0) + 1
+            roll = self.random.random()
+            jitter = self.random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+        self._local.calls = getattr(self._local, 'calls', 0) + 1
+
+        delay = self.latency_ms.get(operation, self.latency_ms.get(service, self.latency_ms.get('default', 0.0)))
+        if delay or jitter:
+            time.sleep((delay + jitter) / 1000)
+
+        if roll < self.throttle_rate:
+            code = 'TooManyRequestsException' if service == 'cognito-idp' else 'ProvisionedThroughputExceededException'
+            raise getattr(exceptions, code)("Rate exceeded", operation)
+        if roll < self.throttle_rate + self.error_rate:
+            raise exceptions.InternalErrorException("Injected failure", operation)
+
+    def reset_thread_calls(self):
+        self._local.calls = 0
+
+    def thread_calls(self):
+        """Remote calls made by the current thread since the last reset."""
+        return getattr(self._local, 'calls', 0)
+
+    def reset_counts(self):
+        with self._lock:
+            self.counts.clear()
+
+def fake_jwt(claims):
+    """Unsigned JWT-shaped token; the handlers only decode the payload."""
+    def encode(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode('utf-8')).decode().rstrip('=')
+    return f"{encode({'alg': 'none', 'kid': 'fake'})}.{encode(claims)}.c2lnbmF0dXJl"
+
+class FakeCognito:
+    VERIFICATION_CODE = '123456'
+    # admin_create_user's default temporary password
+    TEMPORARY_PASSWORD = 'Temporary1!'
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.exceptions = FakeExceptions()
+        self.users = {}
+        self.emails = {}
+        self.groups = {}
+        self.sessions = {}
+        self._lock = threading.Lock()
+
+    def _call(self, operation):
+        self.backend.call('cognito-idp', operation, self.exceptions)
+
+    def add_user(self, username, password, attributes, status='CONFIRMED'):
+        with self._lock:
+            self.users[username] = {'password': password, 'attributes': dict(attributes), 'status': status}
+            if attributes.get('email'):
+                self.emails[attributes['email'].lower()] = username
+
+    def seed_users(self, count, password='Password1!', status='CONFIRMED', prefix='student'):
+        """Create `count` users named <prefix><n> with <prefix><n>@example.edu emails, in the student group."""
+        created = []
+        for n in range(count):
+            username = f"{prefix}{n}"
+            self.add_user(username, password, {
+                'sub': str(uuid.uuid4()),
+                'email': f"{prefix}{n}@example.edu",
+                'given_name': prefix.title(),
+                'family_name': str(n),
+                'phone_number': '',
+                'custom:userRole': 'student'
+            }, status)
+            self.groups.setdefault('student', set()).add(username)
+            created.append(username)
+        return created
+
+    def _find(self, operation, username):
+        name = self.emails.get(username.lower(), username)
+        user = self.users.get(name)
+        if user is None:
+            raise self.exceptions.UserNotFoundException("User does not exist.", operation)
+        return name, user
+
+    def _tokens(self, username, user):
+        groups = sorted(group for group, members in self.groups.items() if username in members)
+        claims = dict(user['attributes'], **{'cognito:username': username, 'cognito:groups': groups,
+                                             'token_use': 'id', 'exp': int(time.time()) + 3600})
+        return {
+            'IdToken': fake_jwt(claims),
+            'AccessToken': fake_jwt({'username': username, 'token_use': 'access'}),
+            'RefreshToken': f"refresh-{username}",
+            'ExpiresIn': 3600,
+            'TokenType': 'Bearer'
+        }
+
+    def admin_get_user(self, UserPoolId, Username):
+        self._call('admin_get_user')
+        name, user = self._find('AdminGetUser', Username)
+        return {
+            'Username': name,
+            'UserAttributes': [{'Name': k, 'Value': v} for k, v in user['attributes'].items()],
+            'UserStatus': user['status']
+        }
+
+    def initiate_auth(self, AuthFlow, ClientId, AuthParameters):
+        self._call('initiate_auth')
+        if AuthFlow == 'REFRESH_TOKEN_AUTH':
+            token = AuthParameters.get('REFRESH_TOKEN', '')
+            if not token.startswith('refresh-') or token[len('refresh-'):] not in self.users:
+                raise self.exceptions.NotAuthorizedException("Invalid Refresh Token", 'InitiateAuth')
+            username = token[len('refresh-'):]
+            tokens = self._tokens(username, self.users[username])
+            del tokens['RefreshToken']
+            return {'AuthenticationResult': tokens}
+
+        name, user = self._find('InitiateAuth', AuthParameters['USERNAME'])
+        if user['password'] != AuthParameters.get('PASSWORD'):
+            raise self.exceptions.NotAuthorizedException("Incorrect username or password.", 'InitiateAuth')
+        if user['status'] == 'FORCE_CHANGE_PASSWORD':
+            session = uuid.uuid4().hex
+            self.sessions[session] = name
+            return {'ChallengeName': 'NEW_PASSWORD_REQUIRED', 'Session': session,
+                    'ChallengeParameters': {'USER_ID_FOR_SRP': name, 'requiredAttributes': '[]'}}
+        if user['status'] != 'CONFIRMED':
+            raise self.exceptions.UserNotConfirmedException("User is not confirmed.", 'InitiateAuth')
+        return {'AuthenticationResult': self._tokens(name, user)}
+
+    def respond_to_auth_challenge(self, ClientId, ChallengeName, Session, ChallengeResponses):
+        self._call('respond_to_auth_challenge')
+        name = self.sessions.pop(Session, None)
+        if ChallengeName != 'NEW_PASSWORD_REQUIRED' or name is None or name != ChallengeResponses.get('USERNAME'):
+            raise self.exceptions.NotAuthorizedException("Invalid session for the user.", 'RespondToAuthChallenge')
+        if len(ChallengeResponses.get('NEW_PASSWORD') or '') < 8:
+            raise self.exceptions.InvalidPasswordException("Password does not conform to policy", 'RespondToAuthChallenge')
+        user = self.users[name]
+        user['password'] = ChallengeResponses['NEW_PASSWORD']
+        user['status'] = 'CONFIRMED'
+        return {'AuthenticationResult': self._tokens(name, user)}
+
+    def sign_up(self, ClientId, Username, Password, UserAttributes, SecretHash=None):
+        self._call('sign_up')
+        if Username in self.users:
+            raise self.exceptions.UsernameExistsException("User already exists", 'SignUp')
+        attributes = {attr['Name']: attr['Value'] for attr in UserAttributes}
+        attributes['sub'] = str(uuid.uuid4())
+        self.add_user(Username, Password, attributes, 'UNCONFIRMED')
+        return {'UserConfirmed': False, 'UserSub': attributes['sub']}
+
+    def confirm_sign_up(self, ClientId, Username, ConfirmationCode, SecretHash=None):
+        self._call('confirm_sign_up')
+        _, user = self._find('ConfirmSignUp', Username)
+        if user['status'] == 'CONFIRMED':
+            raise self.exceptions.NotAuthorizedException("User cannot be confirmed. Current status is CONFIRMED", 'ConfirmSignUp')
+        if ConfirmationCode != self.VERIFICATION_CODE:
+            raise self.exceptions.CodeMismatchException("Invalid verification code provided.", 'ConfirmSignUp')
+        user['status'] = 'CONFIRMED'
+        return {}
+
+    def resend_confirmation_code(self, ClientId, Username, SecretHash=None):
+        self._call('resend_confirmation_code')
+        self._find('ResendConfirmationCode', Username)
+        return {'CodeDeliveryDetails': {'DeliveryMedium': 'EMAIL'}}
+
+    def forgot_password(self, ClientId, Username, SecretHash=None):
+        self._call('forgot_password')
+        self._find('ForgotPassword', Username)
+        return {'CodeDeliveryDetails': {'DeliveryMedium': 'EMAIL'}}
+
+    def confirm_forgot_password(self, ClientId, Username, ConfirmationCode, Password, SecretHash=None):
+        self._call('confirm_forgot_password')
+        _, user = self._find('ConfirmForgotPassword', Username)
+        if ConfirmationCode != self.VERIFICATION_CODE:
+            raise self.exceptions.CodeMismatchException("Invalid verification code provided.", 'ConfirmForgotPassword')
+        user['password'] = Password
+        return {}
+
+    def admin_create_user(self, UserPoolId, Username, UserAttributes, **kwargs):
+        self._call('admin_create_user')
+        if Username in self.users:
+            raise self.exceptions.UsernameExistsException("User already exists", 'AdminCreateUser')
+        attributes = {attr['Name']: attr['Value'] for attr in UserAttributes}
+        attributes['sub'] = str(uuid.uuid4())
+        self.add_user(Username, kwargs.get('TemporaryPassword', self.TEMPORARY_PASSWORD), attributes, 'FORCE_CHANGE_PASSWORD')
+        return {'User': {'Username': Username, 'UserStatus': 'FORCE_CHANGE_PASSWORD'}}
+
+    def admin_add_user_to_group(self, UserPoolId, Username, GroupName):
+        self._call('admin_add_user_to_group')
+        name, _ = self._find('AdminAddUserToGroup', Username)
+        with self._lock:
+            self.groups.setdefault(GroupName, set()).add(name)
+        return {}
+
+    def describe_user_pool_client(self, UserPoolId, ClientId):
+        self._call('describe_user_pool_client')
+        return {'UserPoolClient': {'UserPoolId': UserPoolId, 'ClientId': ClientId}}
+
+class FakeDynamoDB:
+    """Stand-in for boto3.resource('dynamodb')."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.tables = {}
+        self.key_schemas = {}
+        self.index_schemas = {}
+        self.exceptions = FakeExceptions()
+        # handlers reach DynamoDB exceptions and transactions through resource.meta.client
+        self.meta = type('Meta', (), {'client': FakeDynamoDBClient(self)})()
+
+    def create_table(self, name, keys, indexes=None):
+        """
+        Declare a table and its key attribute names, e.g. create_table('Users', ['userId']).
+        indexes maps GSI names to their [partition, sort] attribute names.
+        """
+        self.key_schemas[name] = list(keys)
+        self.index_schemas[name] = {index: list(index_keys) for index, index_keys in (indexes or {}).items()}
+        return self.Table(name)
+
+    def Table(self, name):
+        if name not in self.tables:
+            self.tables[name] = FakeTable(self, name, self.key_schemas.get(name), self.index_schemas.get(name))
+        return self.tables[name]
+
+    def batch_get_item(self, RequestItems):
+        self.backend.call('dynamodb', 'batch_get_item', self.exceptions)
+        responses = {}
+        for name, request in RequestItems.items():
+            table = self.Table(name)
+            found = []
+            for key in request['Keys']:
+                item = table.items.get(table.key_for(key))
+                if item is not None:
+                    found.append(project(item, request.get('ProjectionExpression'), request.get('ExpressionAttributeNames')))
+            responses[name] = found
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+class FakeDynamoDBClient:
+    """The low-level client behind FakeDynamoDB.meta.client."""
+
+    def __init__(self, dynamodb):
+        self.dynamodb = dynamodb
+        self.exceptions = dynamodb.exceptions
+
+    def transact_write_items(self, TransactItems):
+        """Update entries only. Every condition is checked before any write, so it is all or nothing."""
+        self.dynamodb.backend.call('dynamodb', 'transact_write_items', self.exceptions)
+        writes = []
+        for entry in TransactItems:
+            update = entry['Update']
+            writes.append((self.dynamodb.Table(update['TableName']), from_attribute_values(update['Key']), update,
+                           from_attribute_values(update.get('ExpressionAttributeValues') or {})))
+        tables = sorted({table.name: table for table, _, _, _ in writes}.values(), key=lambda table: table.name)
+        for table in tables:
+            table._lock.acquire()
+        try:
+            reasons = []
+            for table, key, update, values in writes:
+                current = table.items.get(table.key_for(key))
+                condition = update.get('ConditionExpression')
+                passed = not condition or evaluate_condition(current, condition, update.get('ExpressionAttributeNames') or {}, values)
+                reasons.append({'Code': 'None' if passed else 'ConditionalCheckFailed'})
+            if any(reason['Code'] != 'None' for reason in reasons):
+                error = self.exceptions.TransactionCanceledException("Transaction cancelled", 'TransactWriteItems')
+                error.response['CancellationReasons'] = reasons
+                raise error
+            for table, key, update, values in writes:
+                current = table.items.get(table.key_for(key))
+                item = deepcopy(current) if current is not None else dict(key)
+                apply_update(item, update['UpdateExpression'], update.get('ExpressionAttributeNames') or {}, values)
+                table.items[table.key_for(key)] = item
+        finally:
+            for table in tables:
+                table._lock.release()
+        return {}
+
+def project(item, projection, names=None):
+    if not projection:
+        return deepcopy(item)
+    names = names or {}
+    fields = [names.get(field.strip(), field.strip()) for field in projection.split(',')]
+    if len(set(fields)) < len(fields):
+        # The real service rejects the whole request
+        raise FakeClientError("Invalid ProjectionExpression: Two document paths overlap with each other", 'GetItem')
+    return {field: deepcopy(item[field]) for field in fields if field in item}
+
+class FakeTable:
+    """Hash-map table supporting the expression subset the handlers use."""
+
+    def __init__(self, dynamodb, name, key_names, index_keys=None):
+        self.dynamodb = dynamodb
+        self.name = name
+        self.key_names = key_names
+        self.index_keys = index_keys or {}
+        self.items = {}
+        self._lock = threading.Lock()
+
+    def _call(self, operation):
+        self.dynamodb.backend.call('dynamodb', operation, self.dynamodb.exceptions)
+
+    def key_for(self, data):
+        names = self.key_names or sorted(data)[:1]
+        return tuple(data[name] for name in names)
+
+    def get_item(self, Key, ProjectionExpression=None, ExpressionAttributeNames=None, ConsistentRead=False):
+        self._call('get_item')
+        item = self.items.get(self.key_for(Key))
+        if item is None:
+            return {}
+        return {'Item': project(item, ProjectionExpression, ExpressionAttributeNames)}
+
+    def put_item(self, Item, ConditionExpression=None, ExpressionAttributeNames=None, ExpressionAttributeValues=None,
+                 ReturnValuesOnConditionCheckFailure='NONE', **kwargs):
+        self._call('put_item')
+        with self._lock:
+            key = self.key_for(Item)
+            current = self.items.get(key)
+            self._check(current, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues, 'PutItem',
+                        ReturnValuesOnConditionCheckFailure == 'ALL_OLD')
+            self.items[key] = deepcopy(Item)
+        return {}
+
+    def delete_item(self, Key, ConditionExpression=None, ExpressionAttributeNames=None, ExpressionAttributeValues=None, **kwargs):
+        self._call('delete_item')
+        with self._lock:
+            current = self.items.get(self.key_for(Key))
+            self._check(current, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues, 'DeleteItem')
+            self.items.pop(self.key_for(Key), None)
+        return {}
+
+    def update_item(self, Key, UpdateExpression, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, ReturnValues='NONE', ReturnValuesOnConditionCheckFailure='NONE', **kwargs):
+        self._call('update_item')
+        names = ExpressionAttributeNames or {}
+        values = ExpressionAttributeValues or {}
+        with self._lock:
+            key = self.key_for(Key)
+            current = self.items.get(key)
+            self._check(current, ConditionExpression, names, values, 'UpdateItem',
+                        ReturnValuesOnConditionCheckFailure == 'ALL_OLD')
+            item = deepcopy(current) if current is not None else dict(Key)
+            apply_update(item, UpdateExpression, names, values)
+            self.items[key] = item
+        if ReturnValues in ('ALL_NEW', 'UPDATED_NEW'):
+            return {'Attributes': deepcopy(item)}
+        return {}
+
+    def query(self, KeyConditionExpression, ExpressionAttributeValues, ExpressionAttributeNames=None, IndexName=None,
+              Limit=None, ExclusiveStartKey=None, ScanIndexForward=True, ProjectionExpression=None,
+              FilterExpression=None, **kwargs):
+        """
+        Partition key equality plus an optional sort key condition, in sort key order.
+        Like the real service, Limit counts items read and FilterExpression drops them afterwards.
+        """
+        self._call('query')
+        names = ExpressionAttributeNames or {}
+        key_names = self.index_keys[IndexName] if IndexName else self.key_names
+        sort = key_names[1] if len(key_names) > 1 else None
+        with self._lock:
+            matches = [item for item in self.items.values()
+                       if all(name in item for name in key_names)
+                       and evaluate_key_condition(item, KeyConditionExpression, names, ExpressionAttributeValues)]
+        matches.sort(key=lambda item: (item[sort] if sort else '', self.key_for(item)), reverse=not ScanIndexForward)
+        if ExclusiveStartKey:
+            position = [i for i, item in enumerate(matches) if all(item.get(k) == v for k, v in ExclusiveStartKey.items())]
+            matches = matches[position[0] + 1:] if position else []
+        page = matches[:Limit] if Limit else matches
+        found = [item for item in page
+                 if not FilterExpression or evaluate_condition(item, FilterExpression, names, ExpressionAttributeValues)]
+        response = {
+            'Items': [project(item, ProjectionExpression, names) for item in found],
+            'Count': len(found),
+            'ScannedCount': len(page)
+        }
+        if Limit and len(matches) > Limit:
+            last = page[-1]
+            response['LastEvaluatedKey'] = {name: last[name] for name in set(self.key_names) | set(key_names)}
+        return response
+
+    def scan(self, Limit=None, ExclusiveStartKey=None, ProjectionExpression=None, ExpressionAttributeNames=None, **kwargs):
+        """Every item in key order, paginated like query."""
+        self._call('scan')
+        with self._lock:
+            matches = sorted(self.items.values(), key=self.key_for)
+        if ExclusiveStartKey:
+            position = [i for i, item in enumerate(matches) if self.key_for(item) == self.key_for(ExclusiveStartKey)]
+            matches = matches[position[0] + 1:] if position else []
+        page = matches[:Limit] if Limit else matches
+        response = {'Items': [project(item, ProjectionExpression, ExpressionAttributeNames) for item in page], 'Count': len(page)}
+        if Limit and len(matches) > Limit:
+            response['LastEvaluatedKey'] = {name: page[-1][name] for name in self.key_names}
+        return response
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return FakeBatchWriter(self, overwrite_by_pkeys)
+
+    def _check(self, current, condition, names, values, operation, return_old=False):
+        if condition and not evaluate_condition(current, condition, names or {}, values or {}):
+            error = self.dynamodb.exceptions.ConditionalCheckFailedException("The conditional request failed", operation)
+            if return_old and current is not None:
+                # The real service returns the item in low-level AttributeValue form
+                error.response['Item'] = {name: to_attribute_value(value) for name, value in current.items()}
+            raise error
+
+class FakeBatchWriter:
+    """Buffers writes like boto3's batch_writer and sends one batch_write_item per 25 items."""
+
+    def __init__(self, table, overwrite_by_pkeys=None):
+        self.table = table
+        self.overwrite_by_pkeys = overwrite_by_pkeys
+        self.buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        while self.buffer:
+            self._flush()
+        return False
+
+    def _add(self, request, key):
+        if self.overwrite_by_pkeys:
+            self.buffer = [(r, k) for r, k in self.buffer if k != key]
+        self.buffer.append((request, key))
+        if len(self.buffer) >= 25:
+            self._flush()
+
+    def _flush(self):
+        batch, self.buffer = self.buffer[:25], self.buffer[25:]
+        self.table._call('batch_write_item')
+        with self.table._lock:
+            for (operation, data), _ in batch:
+                if operation == 'put':
+                    self.table.items[self.table.key_for(data)] = deepcopy(data)
+                else:
+                    self.table.items.pop(self.table.key_for(data), None)
+
+    def put_item(self, Item):
+        self._add(('put', Item), tuple(Item.get(name) for name in self.overwrite_by_pkeys or ()))
+
+    def delete_item(self, Key):
+        self._add(('delete', Key), tuple(Key.get(name) for name in self.overwrite_by_pkeys or ()))
+
+CONDITION_RE = re.compile(r"(NOT\s+)?(attribute_exists|attribute_not_exists|contains|begins_with)\(\s*([#\w]+)\s*(?:,\s*(:\w+)\s*)?\)|([#\w.]+)\s*(=|<>|<=|>=|<|>)\s*(:\w+)")
+
+def split_top_level(expression, keyword):
+    """Split on AND / OR outside parentheses."""
+    parts, depth, start = [], 0, 0
+    for match in re.finditer(rf"[()]|\s+{keyword}\s+", expression, flags=re.IGNORECASE):
+        token = match.group()
+        if token in '()':
+            depth += 1 if token == '(' else -1
+        elif depth == 0:
+            parts.append(expression[start:match.start()])
+            start = match.end()
+    parts.append(expression[start:])
+    return parts
+
+def is_group(clause):
+    """True for '( ... )' where the first parenthesis closes at the end."""
+    if not clause.startswith('('):
+        return False
+    depth = 0
+    for position, char in enumerate(clause):
+        depth += {'(': 1, ')': -1}.get(char, 0)
+        if depth == 0:
+            return position == len(clause) - 1
+    return False
+
+def evaluate_condition(item, condition, names, values):
+    """Evaluate OR / AND / parenthesised groups of attribute_exists / attribute_not_exists / [NOT] contains / [NOT] begins_with / comparison clauses."""
+    return any(evaluate_conjunction(item or {}, group, names, values)
+               for group in split_top_level(condition.strip(), 'OR'))
+
+def evaluate_conjunction(item, condition, names, values):
+    for clause in split_top_level(condition.strip(), 'AND'):
+        clause = clause.strip()
+        if is_group(clause):
+            if not evaluate_condition(item, clause[1:-1], names, values):
+                return False
+            continue
+        match = CONDITION_RE.fullmatch(clause)
+        if match is None:
+            raise ValueError(f"Unsupported condition in fake: {clause}")
+        negate, function, attribute, operand, left, operator, placeholder = match.groups()
+        if function == 'contains':
+            found = values[operand] in (item.get(names.get(attribute, attribute)) or ())
+            if found == bool(negate):
+                return False
+            continue
+        if function == 'begins_with':
+            found = str(item.get(names.get(attribute, attribute), '')).startswith(values[operand])
+            if found == bool(negate):
+                return False
+            continue
+        if function:
+            exists = names.get(attribute, attribute) in item
+            if exists != (function == 'attribute_exists'):
+                return False
+            continue
+        actual = item.get(names.get(left, left))
+        expected = values[placeholder]
+        if operator == '=' and actual != expected:
+            return False
+        if operator == '<>' and actual == expected:
+            return False
+        if operator in ('<', '<=', '>', '>=') and (actual is None or not {
+            '<': actual < expected, '<=': actual <= expected, '>': actual > expected, '>=': actual >= expected
+        }[operator]):
+            return False
+    return True
+
+def to_attribute_value(value):
+    """Serialise a plain value the way DynamoDB returns it on the wire."""
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, (int, float, Decimal)):
+        return {'N': str(value)}
+    if isinstance(value, (set, frozenset)):
+        return {'SS': sorted(value)} if all(isinstance(v, str) for v in value) else {'NS': sorted(str(v) for v in value)}
+    if isinstance(value, dict):
+        return {'M': {k: to_attribute_value(v) for k, v in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {'L': [to_attribute_value(v) for v in value]}
+    return {'S': str(value)}
+
+def from_attribute_value(value):
+    """Inverse of to_attribute_value, for requests sent through the low-level client."""
+    kind, data = next(iter(value.items()))
+    if kind == 'NULL':
+        return None
+    if kind == 'N':
+        return Decimal(data)
+    if kind == 'SS':
+        return set(data)
+    if kind == 'NS':
+        return {Decimal(v) for v in data}
+    if kind == 'M':
+        return from_attribute_values(data)
+    if kind == 'L':
+        return [from_attribute_value(v) for v in data]
+    return data
+
+def from_attribute_values(values):
+    return {name: from_attribute_value(value) for name, value in values.items()}
+
+KEY_CONDITION_RE = re.compile(
+    r"begins_with\(\s*([#\w]+)\s*,\s*(:\w+)\s*\)|([#\w]+)\s+BETWEEN\s+(:\w+)\s+AND\s+(:\w+)|([#\w]+)\s*(=|<=|>=|<|>)\s*(:\w+)",
+    re.IGNORECASE
+)
+
+def evaluate_key_condition(item, condition, names, values):
+    """Evaluate a query key condition: equality, comparisons, BETWEEN and begins_with."""
+    for match in KEY_CONDITION_RE.finditer(condition):
+        prefix_attr, prefix, between_attr, low, high, attribute, operator, placeholder = match.groups()
+        if prefix_attr:
+            if not str(item.get(names.get(prefix_attr, prefix_attr), '')).startswith(values[prefix]):
+                return False
+        elif between_attr:
+            actual = item.get(names.get(between_attr, between_attr))
+            if actual is None or not values[low] <= actual <= values[high]:
+                return False
+        elif not evaluate_condition(item, f"{attribute} {operator} {placeholder}", names, values):
+            return False
+    return True
+
+def apply_update(item, expression, names, values):
+    """Apply SET / ADD / REMOVE / DELETE clauses (plain assignments, if_not_exists and numeric +/-)."""
+    for section, body in re.findall(r"(SET|ADD|REMOVE|DELETE)\s+(.*?)(?=\s+(?:SET|ADD|REMOVE|DELETE)\s+|$)", expression.strip(), flags=re.IGNORECASE):
+        section = section.upper()
+        for part in [p.strip() for p in re.split(r",(?![^(]*\))", body) if p.strip()]:
+            if section == 'REMOVE':
+                item.pop(names.get(part, part), None)
+            elif section == 'DELETE':
+                attribute, placeholder = part.split()
+                attribute = names.get(attribute, attribute)
+                remaining = set(item.get(attribute, set())) - set(values[placeholder])
+                if remaining:
+                    item[attribute] = remaining
+                else:
+                    item.pop(attribute, None)
+            elif section == 'ADD':
+                attribute, placeholder = part.split()
+                attribute = names.get(attribute, attribute)
+                value = values[placeholder]
+                if isinstance(value, (set, frozenset)):
+                    item[attribute] = set(item.get(attribute, set())) | set(value)
+                else:
+                    item[attribute] = item.get(attribute, 0) + value
+            else:
+                attribute, expr = [p.strip() for p in part.split('=', 1)]
+                item[names.get(attribute, attribute)] = evaluate_value(item, expr, names, values)
+
+def evaluate_value(item, expr, names, values):
+    match = re.fullmatch(r"if_not_exists\(\s*([#\w]+)\s*,\s*(:\w+)\s*\)", expr)
+    if match:
+        attribute = names.get(match.group(1), match.group(1))
+        return item[attribute] if attribute in item else values[match.group(2)]
+    match = re.fullmatch(r"([#\w:]+)\s*([+-])\s*([#\w:]+)", expr)
+    if match:
+        left = evaluate_value(item, match.group(1), names, values)
+        right = evaluate_value(item, match.group(3), names, values)
+        return left + right if match.group(2) == '+' else left - right
+    if expr.startswith(':'):
+        return values[expr]
+    return item.get(names.get(expr, expr), 0)
@@ -0,0 +1,350 @@
+import os
+import io
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import itertools
+import contextlib
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+
+# Local benchmark / load test for the auth lambda_handlers against fake_aws.
+#
+#   python backend/BENCHMARK/run_benchmark.py --concurrency 1,8,32 --requests 200 --latency-ms 20
+#   python backend/BENCHMARK/run_benchmark.py --scenarios login.login --cold-start
+#
+# Exits non-zero if any scenario makes more remote calls per request than its budget,
+# so an extra Cognito/DynamoDB round trip shows up before it ships.
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path[:0] = [BENCHMARK_DIR, os.path.join(BACKEND_DIR, 'COMMON', 'python')]
+
+ENVIRONMENT = {
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'USER_POOL_ID': 'us-east-1_benchmark',
+    'COGNITO_CLIENT_ID': 'benchmark-client',
+    'COGNITO_CLIENT_SECRET': 'benchmark-secret',
+    'USER_TABLE': 'Users',
+    'EMAIL_INDEX_TABLE': 'UserEmails',
+    'GROUP_TABLE': 'Groups',
+    'CHECKIN_TABLE': 'Checkins',
+    'STATS_TABLE': 'CheckinStats',
+    'ABUSE_TABLE': 'AbuseCounters',
+    'METRICS_ENABLED': 'false',
+    'LOG_SAMPLE_RATE': '0'
+}
+for name, value in ENVIRONMENT.items():
+    os.environ.setdefault(name, value)
+# One process stands in for many containers, so don't let the per-container Cognito buckets cap the load
+for category in ('USERAUTHENTICATION', 'USERCREATION', 'USERACCOUNTRECOVERY', 'USERREAD', 'USERUPDATE', 'USERLIST'):
+    os.environ.setdefault(f"COGNITO_RPS_{category}", '100000')
+
+from fake_aws import FakeBackend
+from common.profiles import build_profile_item
+
+TABLE_KEYS = {
+    'Users': ['userId'],
+    'UserEmails': ['email'],
+    'Groups': ['groupStatus', 'sortKey'],
+    'Checkins': ['checkinId', 'entryKey'],
+    'CheckinStats': ['courseId', 'statKey'],
+    'AbuseCounters': ['limiterKey']
+}
+TABLE_INDEXES = {
+    'Checkins': {'checkinId-geoKey-index': ['checkinId', 'geoKey']},
+    'Users': {
+        'directoryRole-searchName-index': ['directoryRole', 'searchName'],
+        'directoryRole-searchNameReversed-index': ['directoryRole', 'searchNameReversed'],
+        'directoryRole-emailLower-index': ['directoryRole', 'emailLower']
+    }
+}
+
+SEEDED_USERS = 500
+SEEDED_GROUPS = 300
+CHECKIN_ID = 'benchmark-checkin'
+PASSWORD = 'Password1!'
+
+def admin_get(params):
+    """A GET event as API Gateway passes it after the AUTHORIZER allowed an admin token."""
+    return authorized({'httpMethod': 'GET', 'queryStringParameters': params}, 'admin', 'admin')
+
+def from_ip(body, ip):
+    """A POST event from a client address, as API Gateway reports it in the request context."""
+    return {'httpMethod': 'POST', 'body': json.dumps(body), 'requestContext': {'identity': {'sourceIp': ip}}}
+
+def authorized(event, username, role):
+    event['requestContext'] = {'authorizer': {'role': role, 'username': username}}
+    event.setdefault('httpMethod', 'POST')
+    return event
+
+def build_scenarios():
+    """
+    scenario -> (handler directory, event body factory, max remote calls per request).
+    A factory returns either a JSON body or, for GET routes, a whole event.
+    """
+    counter = itertools.count()
+
+    def existing_email():
+        return f"student{next(counter) % SEEDED_USERS}@example.edu"
+
+    def existing_username():
+        return f"student{next(counter) % SEEDED_USERS}"
+
+    def pending_username():
+        return f"pending{next(counter) % SEEDED_USERS}"
+
+    def orphan_username():
+        return f"orphan{next(counter) % SEEDED_USERS}"
+
+    def new_user():
+        n = uuid.uuid4().hex[:10]
+        return {
+            'action': 'signup',
+            'email': f"new{n}@example.edu",
+            'password': PASSWORD,
+            'firstName': 'New',
+            'lastName': n,
+            'phone': '',
+            'userRole': 'student'
+        }
+
+    def client_ip():
+        return f"10.0.{next(counter) % 200}.{next(counter) % 250 + 1}"
+
+    return {
+        # check, login and reset initiate go through the abuse limiter, which counts failures in
+        # the container and only calls ABUSE_TABLE once a key nears its limit
+        'login.check': ('LOGIN', lambda: from_ip({'action': 'check', 'email': existing_email()}, client_ip()), 1),
+        'login.login': ('LOGIN', lambda: from_ip({'action': 'login', 'email': existing_email(), 'password': PASSWORD}, client_ip()), 1),
+        # One address trying passwords against one account: near the limit each failure also updates
+        # the shared counter and each attempt first reads the shared lockout; once the email is
+        # locked out here it is rejected without any remote call
+        'login.stuffing': ('LOGIN', lambda: from_ip({'action': 'login', 'email': 'student1@example.edu', 'password': 'guess'}, '203.0.113.9'), 4),
+        'login.refresh': ('LOGIN', lambda: {'action': 'refresh', 'username': existing_username(), 'refreshToken': f"refresh-{existing_username()}"}, 1),
+        # Signup's conditional put on the email index is both the duplicate check and its retry guard.
+        # The fake confirm_sign_up doesn't run the Post Confirmation trigger, which real Cognito
+        # runs synchronously inside it; see POSTCONFIRMATION for what confirm latency leaves out here.
+        'createuser.signup': ('CREATEUSER', new_user, 3),
+        'createuser.confirm': ('CREATEUSER', lambda: {'action': 'confirm', 'username': pending_username(), 'verificationCode': '123456', 'userRole': 'student'}, 1),
+        # The same confirm clicked again after it went through: the error plus a profile point read
+        'createuser.confirm_retry': ('CREATEUSER', lambda: {'action': 'confirm', 'username': 'student0', 'verificationCode': '123456', 'userRole': 'student'}, 2),
+        # A retried confirm whose first attempt's trigger failed after Cognito confirmed the account:
+        # the retry adds the group and writes the profile and email index rows
+        'createuser.confirm_repair': ('CREATEUSER', lambda: {'action': 'confirm', 'username': orphan_username(), 'verificationCode': '123456', 'userRole': 'student'}, 6),
+        'createuser.resend_verification': ('CREATEUSER', lambda: {'action': 'resend_verification', 'username': existing_username()}, 1),
+        'reset.initiate': ('RESETPASSWORD', lambda: from_ip({'action': 'initiate', 'email': existing_email()}, client_ip()), 2),
+        'reset.confirm': ('RESETPASSWORD', lambda: {'action': 'confirm', 'email': existing_email(), 'verificationCode': '123456', 'newPassword': PASSWORD}, 2),
+        'groups.list': ('GROUPS', lambda: admin_get({'status': 'current', 'limit': '6'}), 1),
+        'checkins.submit': ('CHECKINS', lambda: authorized({'body': json.dumps({
+            'checkinId': CHECKIN_ID, 'lat': 30.6 + random.random() / 10, 'lon': -96.3 - random.random() / 10
+        })}, existing_username(), 'student'), 2),
+        'checkins.missing': ('CHECKINS', lambda: authorized({'httpMethod': 'GET', 'queryStringParameters': {
+            'checkinId': CHECKIN_ID, 'view': 'missing'
+        }}, 'faculty', 'faculty'), 2),
+        'stats.course': ('CHECKINSTATS', lambda: authorized({'httpMethod': 'GET', 'queryStringParameters': {
+            'courseId': 'ISTM 631'
+        }}, 'faculty', 'faculty'), 1),
+        'profile.get': ('PROFILE', lambda: authorized({'httpMethod': 'GET'}, existing_username(), 'student'), 1),
+        # Without a role filter a page queries each role's partition in turn, "first last" then "last first"
+        'directory.search': ('DIRECTORY', lambda: admin_get({'q': f"student {next(counter) % 50}", 'limit': '20'}), 6),
+        'directory.role': ('DIRECTORY', lambda: admin_get({'q': f"student{next(counter) % 50}@", 'role': 'student', 'limit': '20'}), 1)
+    }
+
+def make_backend(args):
+    latency = {'default': args.latency_ms}
+    for override in args.op_latency or []:
+        operation, ms = override.split('=')
+        latency[operation] = float(ms)
+    backend = FakeBackend(latency, args.jitter_ms, args.error_rate, args.throttle_rate, args.seed)
+    for table, keys in TABLE_KEYS.items():
+        backend.dynamodb.create_table(table, keys, TABLE_INDEXES.get(table))
+    backend.cognito.seed_users(SEEDED_USERS, PASSWORD)
+    emails = backend.dynamodb.Table('UserEmails')
+    users = backend.dynamodb.Table('Users')
+    for username, user in backend.cognito.users.items():
+        emails.items[(user['attributes']['email'],)] = {'email': user['attributes']['email'], 'username': username, 'status': 'CONFIRMED'}
+        profile = build_profile_item(username, user['attributes'])
+        users.items[(profile['userId'],)] = profile
+    # Signed up but not yet confirmed, for the confirm scenario
+    backend.cognito.seed_users(SEEDED_USERS, PASSWORD, status='UNCONFIRMED', prefix='pending')
+    # Confirmed, but the Post Confirmation trigger failed: no group and no profile row
+    for username in backend.cognito.seed_users(SEEDED_USERS, PASSWORD, prefix='orphan'):
+        backend.cognito.groups['student'].discard(username)
+    groups = backend.dynamodb.Table('Groups')
+    for n in range(SEEDED_GROUPS):
+        status = 'current' if n % 3 == 0 else 'previous'
+        sort_key = f"2024-{n % 12 + 1:02d}#2024-01-01T00:00:{n % 60:02d}#group{n}"
+        groups.items[(status, sort_key)] = {
+            'groupStatus': status, 'sortKey': sort_key, 'groupId': f"group{n}", 'name': f"ISTM {600 + n % 50} Group {n}",
+            'faculty': 'Dr. Benchmark', 'members': 25, 'term': f"2024-{n % 12 + 1:02d}", 'lastActive': '2024-01-01T00:00:00'
+        }
+    backend.dynamodb.Table('Checkins').items[(CHECKIN_ID, 'PROMPT')] = {
+        'checkinId': CHECKIN_ID, 'entryKey': 'PROMPT', 'courseId': 'ISTM 631', 'createdAt': '2024-02-14T15:00:00',
+        'expectedStudents': [f"student{n}" for n in range(SEEDED_USERS)], 'siteLat': 30.6, 'siteLon': -96.3
+    }
+    stats = backend.dynamodb.Table('CheckinStats')
+    stats.items[('ISTM 631', 'COURSE')] = {'courseId': 'ISTM 631', 'statKey': 'COURSE', 'checkins': 20, 'responses': 4000}
+    for n in range(20):
+        stat_key = f"CHECKIN#2024-02-{n + 1:02d}T15:00:00#checkin{n}"
+        stats.items[('ISTM 631', stat_key)] = {
+            'courseId': 'ISTM 631', 'statKey': stat_key, 'checkinId': f"checkin{n}", 'expected': SEEDED_USERS, 'responded': 200,
+            'expectedStudents': [f"student{i}" for i in range(SEEDED_USERS)], 'respondedStudents': {f"student{i}" for i in range(200)}
+        }
+    return backend
+
+def load_handler(directory, fresh=False):
+    """Import backend/<directory>/lambda_function.py under a unique module name."""
+    if fresh:
+        for name in [name for name in sys.modules if name == 'common' or name.startswith('common.')]:
+            del sys.modules[name]
+    path = os.path.join(BACKEND_DIR, directory, 'lambda_function.py')
+    spec = importlib.util.spec_from_file_location(f"benchmark_{directory.lower()}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def install(backend):
+    from common import clients
+    clients.install_clients(cognito=backend.cognito, dynamodb=backend.dynamodb)
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+class Context:
+    def __init__(self):
+        self.aws_request_id = str(uuid.uuid4())
+        self.function_name = 'benchmark'
+
+def run_scenario(backend, scenario, directory, make_body, concurrency, total, cold_start):
+    module = load_handler(directory, fresh=True)
+    install(backend)
+    events = []
+    for _ in range(total):
+        body = make_body()
+        events.append(body if 'httpMethod' in body else {'body': json.dumps(body)})
+
+    def one(event):
+        nonlocal module
+        backend.reset_thread_calls()
+        start = time.perf_counter()
+        if cold_start:
+            module = load_handler(directory, fresh=True)
+            install(backend)
+        response = module.lambda_handler(event, Context())
+        return (time.perf_counter() - start) * 1000, backend.thread_calls(), response.get('statusCode')
+
+    sink = io.StringIO()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(sink):
+        if cold_start:
+            # Re-importing shares module state, so cold starts run one at a time
+            results = [one(event) for event in events]
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = list(executor.map(one, events))
+    elapsed = time.perf_counter() - started
+
+    profiles = [json.loads(line) for line in sink.getvalue().splitlines() if '"Slow request profile"' in line]
+
+    latencies = [r[0] for r in results]
+    calls = [r[1] for r in results]
+    statuses = {}
+    for r in results:
+        statuses[str(r[2])] = statuses.get(str(r[2]), 0) + 1
+    return {
+        'scenario': scenario,
+        'concurrency': 1 if cold_start else concurrency,
+        'coldStart': cold_start,
+        'requests': total,
+        'p50Ms': round(percentile(latencies, 50), 2),
+        'p95Ms': round(percentile(latencies, 95), 2),
+        'p99Ms': round(percentile(latencies, 99), 2),
+        'callsPerRequest': round(sum(calls) / len(calls), 2),
+        'maxCalls': max(calls),
+        'throughputRps': round(total / elapsed, 1),
+        'statusCodes': statuses,
+        'profiled': len(profiles),
+        'hotFunctions': hot_functions(profiles)
+    }
+
+def hot_functions(profiles, top_n=8):
+    """Merge profile records: the functions with the most cumulative time across requests."""
+    totals = {}
+    for profile in profiles:
+        for row in profile['functions']:
+            entry = totals.setdefault(row['fn'], {'fn': row['fn'], 'calls': 0, 'cumMs': 0.0})
+            entry['calls'] += row['calls']
+            entry['cumMs'] = round(entry['cumMs'] + row['cumMs'], 3)
+    return sorted(totals.values(), key=lambda entry: entry['cumMs'], reverse=True)[:top_n]
+
+def main():
+    scenarios = build_scenarios()
+    parser = argparse.ArgumentParser(description='Benchmark the auth lambda_handlers against in-process fake AWS backends.')
+    parser.add_argument('--scenarios', default='all', help=f"Comma separated, from: {', '.join(scenarios)}")
+    parser.add_argument('--concurrency', default='1,8', help='Comma separated worker counts')
+    parser.add_argument('--requests', type=int, default=100, help='Requests per scenario and concurrency level')
+    parser.add_argument('--latency-ms', type=float, default=10.0, help='Injected latency per remote call')
+    parser.add_argument('--op-latency', action='append', help='Per-operation latency, e.g. initiate_auth=80')
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--cold-start', action='store_true', help='Re-import the handler module before every request')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile every request of the profiled handlers and report their hottest functions (adds overhead)')
+    parser.add_argument('--profile-threshold-ms', type=float, default=0.0, help='Only keep profiles of requests slower than this')
+    parser.add_argument('--tracemalloc', action='store_true', help='Include allocation sites in the profiles')
+    args = parser.parse_args()
+
+    if args.profile:
+        # Read by common.profiling, which every scenario re-imports
+        os.environ['PROFILE_SAMPLE_RATE'] = '1'
+        os.environ['PROFILE_THRESHOLD_MS'] = str(args.profile_threshold_ms)
+        os.environ['PROFILE_TRACEMALLOC'] = 'true' if args.tracemalloc else 'false'
+
+    selected = list(scenarios) if args.scenarios == 'all' else args.scenarios.split(',')
+    levels = [int(level) for level in args.concurrency.split(',')]
+    if args.cold_start:
+        levels = [1]
+
+    rows = []
+    over_budget = []
+    for scenario in selected:
+        directory, make_body, budget = scenarios[scenario]
+        for level in levels:
+            backend = make_backend(args)
+            row = run_scenario(backend, scenario, directory, make_body, level, args.requests, args.cold_start)
+            row['callBudget'] = budget
+            rows.append(row)
+            if row['maxCalls'] > budget and not (args.error_rate or args.throttle_rate):
+                over_budget.append(row)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"{'scenario':<32}{'conc':>5}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'calls/req':>10}{'budget':>7}{'req/s':>9}  status")
+        for row in rows:
+            print(f"{row['scenario']:<32}{row['concurrency']:>5}{row['p50Ms']:>9}{row['p95Ms']:>9}{row['p99Ms']:>9}"
+                  f"{row['callsPerRequest']:>10}{row['callBudget']:>7}{row['throughputRps']:>9}  {row['statusCodes']}")
+
+        for row in rows:
+            if row['hotFunctions']:
+                print(f"\n{row['scenario']} (concurrency {row['concurrency']}), {row['profiled']} requests profiled")
+                for entry in row['hotFunctions']:
+                    print(f"  {entry['cumMs']:>10.2f} ms {entry['calls']:>8} calls  {entry['fn']}")
+
+    for row in over_budget:
+        print(f"REGRESSION: {row['scenario']} made {row['maxCalls']} remote calls in one request (budget {row['callBudget']})", file=sys.stderr)
+    sys.exit(1 if over_budget else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,354 @@
+import os
+import io
+import sys
+import csv
+import json
+import uuid
+import codecs
+import hashlib
+import tempfile
+from datetime import datetime
+from urllib.parse import unquote_plus
+from concurrent.futures import ThreadPoolExecutor
+from common.clients import get_cognito, get_table
+from common.events import is_admin, request_method
+from common.email_index import EMAIL_INDEX_TABLE_NAME, normalize_email, find_existing_emails, build_email_index_item
+from common.profiles import build_profile_item
+from common.storage import ObjectTooLarge, get_storage
+from common.throttle import CognitoThrottled, cognito_call
+from common.instrumentation import instrumented_handler, set_request_fields, log
+from common.responses import responder, parse_body
+
+# Environment variables
+USER_POOL_ID = os.environ['USER_POOL_ID']
+TABLE_NAME = os.environ['USER_TABLE']
+BULK_MAX_WORKERS = int(os.environ.get('BULK_MAX_WORKERS', '8'))
+BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE', '100'))
+# Workers queue on the Cognito token buckets instead of failing fast like the browser endpoints
+BULK_CALL_DEADLINE_SECONDS = float(os.environ.get('BULK_CALL_DEADLINE_SECONDS', '30'))
+BULK_ROSTER_MAX_BYTES = int(os.environ.get('BULK_ROSTER_MAX_BYTES', str(10 * 1024 * 1024)))
+
+respond = responder("OPTIONS,GET,POST", "Content-Type,Authorization")
+
+# Bulk cohort provisioning for admins. The roster CSV uses the signup field names:
+#   email,firstName,lastName,phone,userRole
+#
+# A roster runs as a job, not inside the API request: at UserUpdate's 25 RPS the group
+# adds for 1,000 rows alone take ~40s, past API Gateway's 29s limit.
+#   POST {"roster": "<csv>"}               stores rosters/<jobId>.csv, answers 202 {"jobId"}
+#   POST {"action": "upload"}              presigned POST for rosters/<jobId>.csv, for large files
+#   POST {"roster": ..., "dryRun": true}   validates and checks duplicates, answers right away
+#   GET ?jobId=...                         the job's status document
+# The S3 ObjectCreated event for rosters/*.csv runs the job in this function (give it a
+# timeout of several minutes). After each chunk the job writes rosters/<jobId>.json with
+# its progress, summary and per-row results; clients poll it through GET.
+#
+# A row is done once its email index entry exists, and that entry is written last.
+# Usernames are derived from the email, so re-running a roster that stopped part way
+# picks up each unfinished row at the step it stopped at instead of creating a second account.
+# A job that fails or times out is retried by Lambda and continues after its last
+# completed chunk.
+#
+# Run a stored roster locally (STORAGE_BACKEND=local): python lambda_function.py --run <jobId>
+
+ROSTER_PREFIX = 'rosters/'
+ROSTER_CONTENT_TYPE = 'text/'
+
+REQUIRED_COLUMNS = ('email', 'firstName', 'lastName', 'userRole')
+VALID_ROLES = ('student', 'faculty', 'admin')
+
+def read_roster(lines):
+    """Yield roster rows one at a time from a text stream."""
+    for row in csv.DictReader(lines):
+        yield {k.strip(): (v or '').strip() for k, v in row.items() if k}
+
+def chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def validate_row(row):
+    missing = [column for column in REQUIRED_COLUMNS if not row.get(column)]
+    if missing:
+        return f"Missing {', '.join(missing)}"
+    if '@' not in row['email']:
+        return "Invalid email"
+    if row['userRole'].lower() not in VALID_ROLES:
+        return f"Invalid userRole: {row['userRole']}"
+    return None
+
+def username_for(row):
+    """The same username for the same roster row on every run."""
+    digest = hashlib.sha256(normalize_email(row['email']).encode('utf-8')).hexdigest()[:8]
+    return f"{row['firstName'].lower()}.{row['lastName'].lower()}{digest}"
+
+def has_email(user, email):
+    return any(
+        attribute['Name'] == 'email' and normalize_email(attribute['Value']) == normalize_email(email)
+        for attribute in user.get('UserAttributes', [])
+    )
+
+def create_account(row):
+    """
+    Create one Cognito user and add it to its role group. Runs on a worker thread.
+    Returns (username, attributes, resumed); resumed is True when an earlier run had
+    already created the user.
+    """
+    username = username_for(row)
+    role = row['userRole'].lower()
+    attributes = {
+        'email': row['email'],
+        'given_name': row['firstName'],
+        'family_name': row['lastName'],
+        'custom:userRole': role
+    }
+    if row.get('phone'):
+        attributes['phone_number'] = row['phone']
+
+    resumed = False
+    try:
+        cognito_call(
+            'admin_create_user',
+            deadline_seconds=BULK_CALL_DEADLINE_SECONDS,
+            UserPoolId=USER_POOL_ID,
+            Username=username,
+            UserAttributes=[{'Name': name, 'Value': value} for name, value in attributes.items()]
+                + [{'Name': 'email_verified', 'Value': 'true'}],
+            DesiredDeliveryMediums=['EMAIL']
+        )
+    except get_cognito().exceptions.UsernameExistsException:
+        # An earlier run created the user and stopped before the group or the table rows.
+        # Carry on only if it really is this roster row's account.
+        existing = cognito_call('admin_get_user', deadline_seconds=BULK_CALL_DEADLINE_SECONDS,
+                                UserPoolId=USER_POOL_ID, Username=username)
+        if not has_email(existing, row['email']):
+            raise
+        resumed = True
+    # Adding a user to a group it is already in succeeds, so this step is safe to repeat
+    cognito_call(
+        'admin_add_user_to_group',
+        deadline_seconds=BULK_CALL_DEADLINE_SECONDS,
+        UserPoolId=USER_POOL_ID,
+        Username=username,
+        GroupName=role
+    )
+    return username, attributes, resumed
+
+def provision_chunk(chunk, first_row_number, seen_emails, executor, dry_run):
+    """Dedupe a chunk, create its accounts in parallel and batch-write the profile rows."""
+    results = []
+    pending = []
+    for offset, row in enumerate(chunk):
+        result = {'row': first_row_number + offset, 'email': row.get('email', '')}
+        error = validate_row(row)
+        if error:
+            result.update(status='invalid', message=error)
+        elif normalize_email(row['email']) in seen_emails:
+            result.update(status='duplicate', message='Email repeated in roster')
+        else:
+            seen_emails.add(normalize_email(row['email']))
+            pending.append((result, row))
+        results.append(result)
+
+    existing = find_existing_emails([row['email'] for _, row in pending]) if pending else set()
+    to_create = []
+    for result, row in pending:
+        if normalize_email(row['email']) in existing:
+            result.update(status='duplicate', message='Email already exists!')
+        elif dry_run:
+            result.update(status='valid')
+        else:
+            to_create.append((result, row))
+
+    created = []
+    futures = [(result, executor.submit(create_account, row)) for result, row in to_create]
+    for result, future in futures:
+        try:
+            username, attributes, resumed = future.result()
+            result.update(status='created', username=username)
+            if resumed:
+                result['resumed'] = True
+            created.append((username, attributes))
+        except CognitoThrottled as e:
+            result.update(status='throttled', message=str(e))
+        except Exception as e:
+            result.update(status='failed', message=str(e))
+
+    if created:
+        # Profiles first: a run that stops between the two batches leaves rows without an
+        # email index entry, which the next run resumes (the profile put is a plain overwrite)
+        items = [(build_profile_item(username, attributes), attributes) for username, attributes in created]
+        with get_table(TABLE_NAME).batch_writer() as profile_batch:
+            for item, _ in items:
+                profile_batch.put_item(Item=item)
+        with get_table(EMAIL_INDEX_TABLE_NAME).batch_writer() as email_batch:
+            for item, attributes in items:
+                email_batch.put_item(Item=build_email_index_item(attributes['email'], item['username'], 'CONFIRMED', item['userId']))
+    return results
+
+def roster_key(job_id):
+    return f"{ROSTER_PREFIX}{job_id}.csv"
+
+def status_key(job_id):
+    return f"{ROSTER_PREFIX}{job_id}.json"
+
+def job_id_for(key):
+    """rosters/<jobId>.csv -> jobId."""
+    name = key[len(ROSTER_PREFIX):] if key.startswith(ROSTER_PREFIX) else ''
+    if '/' in name or not name.endswith('.csv') or len(name) == len('.csv'):
+        raise ValueError(f"Not a roster key: {key}")
+    return name[:-len('.csv')]
+
+def summarize(results):
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    return summary
+
+def read_status(job_id):
+    """The job's status document, or None if there is no such job."""
+    storage = get_storage()
+    if storage.size(status_key(job_id)) is None:
+        return None
+    buffer = io.BytesIO()
+    storage.read_into(status_key(job_id), buffer, BULK_ROSTER_MAX_BYTES)
+    return json.loads(buffer.getvalue())
+
+def write_status(status):
+    status['updatedAt'] = datetime.utcnow().isoformat()
+    get_storage().put(status_key(status['jobId']), json.dumps(status).encode('utf-8'), 'application/json', 'no-cache')
+
+def new_job():
+    """Create a queued job and return its status document."""
+    status = {'jobId': uuid.uuid4().hex, 'status': 'queued', 'nextRow': 1, 'total': 0, 'summary': {}, 'results': [],
+              'createdAt': datetime.utcnow().isoformat()}
+    write_status(status)
+    return status
+
+def run_job(job_id):
+    """
+    Provision a stored roster, saving progress after every chunk. Chunks finished by an
+    earlier attempt are skipped; their emails still count for the in-roster duplicate check.
+    """
+    status = read_status(job_id) or {'jobId': job_id, 'nextRow': 1, 'results': [], 'createdAt': datetime.utcnow().isoformat()}
+    if status.get('status') == 'done':
+        log("Roster job already finished", jobId=job_id)
+        return status
+    status['status'] = 'running'
+    results = status['results']
+    seen_emails = set()
+
+    try:
+        with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as spool:
+            get_storage().read_into(roster_key(job_id), spool, BULK_ROSTER_MAX_BYTES)
+            spool.seek(0)
+            rows = read_roster(codecs.getreader('utf-8-sig')(spool))
+            next_row = 1
+            with ThreadPoolExecutor(max_workers=BULK_MAX_WORKERS) as executor:
+                for chunk in chunks(rows, BULK_CHUNK_SIZE):
+                    first_row, next_row = next_row, next_row + len(chunk)
+                    if next_row <= status['nextRow']:
+                        seen_emails.update(normalize_email(row['email']) for row in chunk if validate_row(row) is None)
+                        continue
+                    results.extend(provision_chunk(chunk, first_row, seen_emails, executor, False))
+                    status.update(nextRow=next_row, total=len(results), summary=summarize(results))
+                    write_status(status)
+                    log("Bulk provisioning progress", jobId=job_id, rowsProcessed=len(results))
+    except (KeyError, ValueError, csv.Error, ObjectTooLarge) as e:
+        # A bad file won't get better on retry
+        status.update(status='failed', message=f"Invalid roster: {e}")
+        write_status(status)
+        log("Roster rejected", level='WARN', jobId=job_id, error=str(e))
+        return status
+    except Exception as e:
+        status['message'] = f"Interrupted, retrying: {e}"
+        write_status(status)
+        raise
+
+    status.pop('message', None)
+    status.update(status='done', total=len(results), summary=summarize(results))
+    write_status(status)
+    return status
+
+def handle_s3_event(records):
+    jobs = []
+    for record in records:
+        key = unquote_plus(record['s3']['object']['key'])
+        if key.startswith(ROSTER_PREFIX) and key.endswith('.csv'):
+            job = run_job(job_id_for(key))
+            jobs.append({'jobId': job['jobId'], 'status': job['status'], 'summary': job.get('summary', {})})
+    return {'jobs': jobs}
+
+@instrumented_handler('BULKPROVISION')
+def lambda_handler(event, context):
+    if 'Records' in event:
+        set_request_fields(action='s3_event')
+        return handle_s3_event(event['Records'])
+    method = request_method(event, default='POST')
+    if method == 'OPTIONS':
+        return respond(200, {})
+    try:
+        if not is_admin(event):
+            return respond(403, {"success": False, "message": "Admin access required"})
+
+        if method == 'GET':
+            set_request_fields(action='status')
+            job_id = (event.get('queryStringParameters') or {}).get('jobId') or ''
+            status = read_status(job_id) if job_id.isalnum() else None
+            if status is None:
+                return respond(404, {"success": False, "message": "Job not found"})
+            return respond(200, {"success": True, "job": status})
+
+        body = parse_body(event)
+        if not isinstance(body, dict):
+            return respond(400, {"success": False, "message": "Invalid roster request: expected a JSON object"})
+
+        if body.get('action') == 'upload':
+            set_request_fields(action='upload')
+            job = new_job()
+            target = get_storage().upload_target(roster_key(job['jobId']), ROSTER_CONTENT_TYPE, BULK_ROSTER_MAX_BYTES)
+            return respond(200, {"success": True, "jobId": job['jobId'], "maxBytes": BULK_ROSTER_MAX_BYTES,
+                                 "url": target['url'], "fields": target['fields']})
+
+        roster = body['roster']
+        if not isinstance(roster, str):
+            raise ValueError("roster must be CSV text")
+        if len(roster.encode('utf-8')) > BULK_ROSTER_MAX_BYTES:
+            return respond(413, {"success": False, "message": f"Roster is larger than {BULK_ROSTER_MAX_BYTES} bytes"})
+
+        if body.get('dryRun', False):
+            # Validation and duplicate checks only: a few BatchGetItems per 100 rows
+            set_request_fields(action='dry_run')
+            results = []
+            seen_emails = set()
+            for chunk in chunks(read_roster(io.StringIO(roster)), BULK_CHUNK_SIZE):
+                results.extend(provision_chunk(chunk, len(results) + 1, seen_emails, None, True))
+            return respond(200, {"success": True, "total": len(results), "summary": summarize(results), "results": results})
+
+        set_request_fields(action='provision')
+        job = new_job()
+        # Storing the roster fires the ObjectCreated event that runs the job
+        get_storage().put(roster_key(job['jobId']), roster.encode('utf-8'), 'text/csv')
+        log("Roster job queued", jobId=job['jobId'])
+        return respond(202, {"success": True, "jobId": job['jobId'], "status": job['status']})
+
+    except (KeyError, ValueError, csv.Error) as e:
+        return respond(400, {"success": False, "message": f"Invalid roster request: {str(e)}"})
+
+    except Exception as e:
+        log("Bulk provisioning failed", level='ERROR', error=str(e))
+        return respond(500, {"success": False, "message": f"An error occurred: {str(e)}"})
+
+if __name__ == '__main__':
+    # Replay recorded S3 events, or run a stored roster: python lambda_function.py --run <jobId>
+    if sys.argv[1:2] == ['--run']:
+        print(json.dumps(run_job(sys.argv[2]), indent=2))
+    else:
+        for path in sys.argv[1:]:
+            with open(path) as f:
+                print(json.dumps(lambda_handler(json.load(f), None), indent=2))
@@ -0,0 +1,286 @@
+import os
+import uuid
+from decimal import Decimal
+from datetime import datetime
+from common import geohash
+from common.cache import MISSING, TTLCache
+from common.clients import get_table
+from common.events import caller, request_method
+from common.pagination import encode_cursor, decode_cursor, page_size
+from common.instrumentation import instrumented_handler, set_request_fields, log
+from common.responses import responder, parse_body
+from common.warmup import prewarm_on_init, warmup_response
+
+# Environment variables
+TABLE_NAME = os.environ['CHECKIN_TABLE']
+GEO_INDEX_NAME = os.environ.get('CHECKIN_GEO_INDEX', 'checkinId-geoKey-index')
+MAX_BATCH_SIZE = int(os.environ.get('CHECKIN_MAX_BATCH', '100'))
+DEFAULT_RADIUS_KM = float(os.environ.get('CHECKIN_DEFAULT_RADIUS_KM', '5'))
+
+respond = responder("OPTIONS,GET,POST", "Content-Type,Authorization")
+
+# Location check-ins. CHECKIN_TABLE holds one partition per check-in prompt:
+#   checkinId, entryKey 'PROMPT'             the prompt a faculty member sent (course, site, expected students)
+#   checkinId, entryKey 'STUDENT#<username>' each student's latest submission
+# Submissions also carry geoKey '<geohash>#<username>', and GEO_INDEX_NAME (a GSI on
+# checkinId + geoKey) turns "who is within X km of the site" into begins_with queries
+# on a few geohash cells. "Who hasn't checked in" is one query on the partition.
+# Check-ins without a prompt go to a daily partition, 'daily#<YYYY-MM-DD>'.
+#
+#   POST {"action": "prompt", "courseId": ..., "title": ..., "siteLat": ..., "siteLon": ..., "expectedStudents": [...]}
+#   POST {"checkinId": ..., "lat": ..., "lon": ..., "withWhom": ..., "currentPlace": ..., "comments": ...}
+#   POST {"submissions": [{...}, ...]}  (batched, e.g. replayed from an offline queue)
+#   GET  ?checkinId=...&view=responses|missing|near&radiusKm=5&lat=..&lon=..&limit=..&cursor=..
+
+PROMPT_KEY = 'PROMPT'
+STUDENT_PREFIX = 'STUDENT#'
+STAFF_ROLES = ('faculty', 'admin')
+DETAIL_FIELDS = ('withWhom', 'currentPlace', 'comments')
+RESPONSE_PROJECTION = 'username, courseId, lat, lon, submittedAt, withWhom, currentPlace, comments'
+
+class CheckinNotFound(Exception):
+    pass
+
+# Prompts don't change once sent, so each warm container reads one at most every few minutes
+prompt_cache = TTLCache(256, 300, name='prompts')
+
+WARMUP_TARGETS = {'tables': {TABLE_NAME: {'checkinId': '__warmup__', 'entryKey': PROMPT_KEY}}}
+prewarm_on_init(**WARMUP_TARGETS)
+
+def to_decimal(value):
+    return Decimal(str(round(float(value), 6)))
+
+def parse_coordinates(lat, lon):
+    lat, lon = float(lat), float(lon)
+    if not -90 <= lat <= 90 or not -180 <= lon <= 180:
+        raise ValueError(f"Coordinates out of range: {lat},{lon}")
+    return lat, lon
+
+def get_prompt(checkin_id):
+    """Return the prompt item for a check-in, or None if it doesn't exist."""
+    prompt = prompt_cache.get(checkin_id)
+    if prompt is MISSING:
+        prompt = get_table(TABLE_NAME).get_item(Key={'checkinId': checkin_id, 'entryKey': PROMPT_KEY}).get('Item')
+        if prompt is not None:
+            prompt_cache.set(checkin_id, prompt)
+    return prompt
+
+def create_prompt(body, username):
+    """Store a new check-in prompt and return it."""
+    course_id = (body.get('courseId') or '').strip()
+    if not course_id:
+        raise ValueError("courseId is required")
+    now = datetime.utcnow().isoformat()
+    item = {
+        'checkinId': str(uuid.uuid4()),
+        'entryKey': PROMPT_KEY,
+        'courseId': course_id,
+        'title': (body.get('title') or 'Check-in').strip(),
+        'createdBy': username,
+        'expectedStudents': sorted({s.strip() for s in body.get('expectedStudents', []) if s and s.strip()}),
+        'createdAt': now
+    }
+    if body.get('siteLat') not in (None, '') and body.get('siteLon') not in (None, ''):
+        lat, lon = parse_coordinates(body['siteLat'], body['siteLon'])
+        item.update(siteLat=to_decimal(lat), siteLon=to_decimal(lon))
+    get_table(TABLE_NAME).put_item(Item=item)
+    prompt_cache.set(item['checkinId'], item)
+    return item
+
+def build_checkin_item(username, submission, prompt, checkin_id):
+    lat, lon = parse_coordinates(submission['lat'], submission['lon'])
+    cell = geohash.encode(lat, lon)
+    item = {
+        'checkinId': checkin_id,
+        'entryKey': f"{STUDENT_PREFIX}{username}",
+        'geoKey': f"{cell}#{username}",
+        'geohash': cell,
+        'username': username,
+        'lat': to_decimal(lat),
+        'lon': to_decimal(lon),
+        'submittedAt': submission.get('submittedAt') or datetime.utcnow().isoformat()
+    }
+    course_id = (prompt or {}).get('courseId') or submission.get('courseId')
+    if course_id:
+        item['courseId'] = course_id
+    if prompt:
+        # Lets the stats consumer key its per-checkin aggregate by prompt time without a read
+        item['promptCreatedAt'] = prompt['createdAt']
+    if submission.get('accuracy') not in (None, ''):
+        item['accuracy'] = to_decimal(submission['accuracy'])
+    for field in DETAIL_FIELDS:
+        if submission.get(field):
+            item[field] = str(submission[field])[:1000]
+    return item
+
+def ingest(submissions, username, role):
+    """
+    Validate submissions and batch-write the accepted ones.
+    Students submit for themselves; faculty and admins may submit for a named student.
+    Returns one {index, status, ...} result per submission.
+    """
+    if len(submissions) > MAX_BATCH_SIZE:
+        raise ValueError(f"At most {MAX_BATCH_SIZE} submissions per request")
+    results = []
+    items = []
+    for index, submission in enumerate(submissions):
+        result = {'index': index}
+        try:
+            if not isinstance(submission, dict):
+                raise ValueError("Each submission must be a JSON object")
+            student = submission.get('username') if role in STAFF_ROLES and submission.get('username') else username
+            if not student:
+                raise ValueError("No student for this submission")
+            checkin_id = submission.get('checkinId')
+            prompt = None
+            if checkin_id:
+                prompt = get_prompt(checkin_id)
+                if prompt is None:
+                    raise ValueError(f"Unknown checkinId: {checkin_id}")
+            else:
+                checkin_id = f"daily#{datetime.utcnow().date().isoformat()}"
+            item = build_checkin_item(student, submission, prompt, checkin_id)
+            items.append(item)
+            result.update(status='accepted', checkinId=checkin_id, username=student)
+        except (KeyError, TypeError, ValueError) as e:
+            result.update(status='rejected', message=str(e) if not isinstance(e, KeyError) else f"Missing {e}")
+        results.append(result)
+
+    if items:
+        # One BatchWriteItem per 25 rows; a resubmission in the same batch replaces the earlier one
+        with get_table(TABLE_NAME).batch_writer(overwrite_by_pkeys=['checkinId', 'entryKey']) as batch:
+            for item in items:
+                batch.put_item(Item=item)
+    return results
+
+def query_all(query):
+    """Run a query to the end, following LastEvaluatedKey."""
+    table = get_table(TABLE_NAME)
+    items = []
+    while True:
+        result = table.query(**query)
+        items.extend(result.get('Items', []))
+        if not result.get('LastEvaluatedKey'):
+            return items
+        query['ExclusiveStartKey'] = result['LastEvaluatedKey']
+
+def list_responses(checkin_id, params):
+    query = {
+        'KeyConditionExpression': 'checkinId = :checkin AND begins_with(entryKey, :prefix)',
+        'ExpressionAttributeValues': {':checkin': checkin_id, ':prefix': STUDENT_PREFIX},
+        'ProjectionExpression': RESPONSE_PROJECTION,
+        'Limit': page_size(params.get('limit'), 25)
+    }
+    start_key = decode_cursor(params.get('cursor'), expected={'checkinId': checkin_id})
+    if start_key:
+        query['ExclusiveStartKey'] = start_key
+    result = get_table(TABLE_NAME).query(**query)
+    return {"responses": result.get('Items', []), "nextCursor": encode_cursor(result.get('LastEvaluatedKey'))}
+
+def list_missing(checkin_id):
+    """Expected students with no submission for this prompt."""
+    prompt = get_prompt(checkin_id)
+    if prompt is None:
+        raise CheckinNotFound(f"Unknown checkinId: {checkin_id}")
+    responded = query_all({
+        'KeyConditionExpression': 'checkinId = :checkin AND begins_with(entryKey, :prefix)',
+        'ExpressionAttributeValues': {':checkin': checkin_id, ':prefix': STUDENT_PREFIX},
+        'ProjectionExpression': 'username'
+    })
+    checked_in = {item['username'] for item in responded}
+    expected = prompt.get('expectedStudents', [])
+    return {
+        "expected": len(expected),
+        "checkedIn": len(checked_in),
+        "missing": [student for student in expected if student not in checked_in]
+    }
+
+def list_nearby(checkin_id, params):
+    """Submissions within radiusKm of a point (the prompt's site unless lat/lon are given)."""
+    if params.get('lat') and params.get('lon'):
+        lat, lon = parse_coordinates(params['lat'], params['lon'])
+    else:
+        prompt = get_prompt(checkin_id)
+        if prompt is None or 'siteLat' not in prompt:
+            raise ValueError("lat and lon are required when the check-in has no site")
+        lat, lon = float(prompt['siteLat']), float(prompt['siteLon'])
+    radius_km = float(params.get('radiusKm') or DEFAULT_RADIUS_KM)
+    if radius_km <= 0:
+        raise ValueError("radiusKm must be positive")
+
+    nearby = []
+    for cell in geohash.covering_cells(lat, lon, radius_km):
+        for item in query_all({
+            'IndexName': GEO_INDEX_NAME,
+            'KeyConditionExpression': 'checkinId = :checkin AND begins_with(geoKey, :cell)',
+            'ExpressionAttributeValues': {':checkin': checkin_id, ':cell': cell},
+            'ProjectionExpression': 'username, lat, lon, submittedAt'
+        }):
+            distance = geohash.distance_km(lat, lon, float(item['lat']), float(item['lon']))
+            if distance <= radius_km:
+                item['distanceKm'] = round(distance, 3)
+                nearby.append(item)
+    nearby.sort(key=lambda item: item['distanceKm'])
+    return {"center": {"lat": lat, "lon": lon}, "radiusKm": radius_km, "nearby": nearby}
+
+@instrumented_handler('CHECKINS')
+def lambda_handler(event, context):
+    warm = warmup_response(event, **WARMUP_TARGETS)
+    if warm:
+        return warm
+    method = request_method(event, default='POST')
+    if method == 'OPTIONS':
+        return respond(200, {})
+    try:
+        username, role = caller(event)
+        if not username:
+            return respond(401, {"success": False, "message": "Unauthorized"})
+
+        if method == 'GET':
+            if role not in STAFF_ROLES:
+                return respond(403, {"success": False, "message": "Faculty access required"})
+            params = event.get('queryStringParameters') or {}
+            checkin_id = params['checkinId']
+            view = params.get('view', 'responses')
+            set_request_fields(action=view, checkinId=checkin_id)
+            if view == 'responses':
+                return respond(200, dict(success=True, **list_responses(checkin_id, params)))
+            if view == 'missing':
+                return respond(200, dict(success=True, **list_missing(checkin_id)))
+            if view == 'near':
+                return respond(200, dict(success=True, **list_nearby(checkin_id, params)))
+            return respond(400, {"success": False, "message": f"Invalid view: {view}"})
+
+        body = parse_body(event)
+        if not isinstance(body, dict):
+            raise ValueError("Request body must be a JSON object")
+        if body.get('action') == 'prompt':
+            set_request_fields(action='prompt')
+            if role not in STAFF_ROLES:
+                return respond(403, {"success": False, "message": "Faculty access required"})
+            prompt = create_prompt(body, username)
+            log("Check-in prompt created", checkinId=prompt['checkinId'], courseId=prompt['courseId'])
+            return respond(201, {"success": True, "checkinId": prompt['checkinId'], "courseId": prompt['courseId']})
+
+        submissions = body['submissions'] if 'submissions' in body else [body]
+        if not isinstance(submissions, list):
+            raise ValueError("submissions must be a list")
+        set_request_fields(action='submit', submissions=len(submissions))
+        results = ingest(submissions, username, role)
+        accepted = sum(1 for result in results if result['status'] == 'accepted')
+        status_code = 200 if accepted == len(results) else (207 if accepted else 400)
+        return respond(status_code, {"success": accepted > 0, "accepted": accepted, "results": results})
+
+    except CheckinNotFound as e:
+        return respond(404, {"success": False, "message": str(e)})
+
+    except (KeyError, ValueError) as e:
+        message = f"Missing {e}" if isinstance(e, KeyError) else str(e)
+        return respond(400, {"success": False, "message": message})
+
+    except Exception as e:
+        log("An unexpected error occurred", level='ERROR', error=str(e))
+        return respond(500, {
+            "success": False,
+            "message": "An internal error occurred. Please try again later."
+        })
@@ -0,0 +1,276 @@
+import os
+import sys
+import json
+from common.clients import get_dynamodb, get_table
+from common.events import caller, request_method
+from common.instrumentation import instrumented_handler, set_request_fields, log
+from common.responses import responder, json_default
+
+# Environment variables
+TABLE_NAME = os.environ['STATS_TABLE']
+RECENT_CHECKINS = int(os.environ.get('STATS_RECENT_CHECKINS', '5'))
+
+respond = responder("OPTIONS,GET", "Content-Type,Authorization")
+
+# Read model for the faculty dashboard, maintained from the CHECKIN_TABLE stream
+# (NEW_AND_OLD_IMAGES). STATS_TABLE has one partition per course:
+#   courseId, statKey 'COURSE'                              checkins, responses, lastCheckinAt, latest prompt
+#   courseId, statKey 'CHECKIN#<promptCreatedAt>#<checkinId>' expected, responded, respondedStudents, lastResponseAt
+# Every change is an UpdateItem with ADD, so concurrent batches never read-modify-write.
+# Stream records are delivered at least once: the per-checkin update is conditional on the
+# student (or prompt) not being counted yet, and it is written in one TransactWriteItems with
+# the course update, so the course counters move exactly when it applies.
+#
+#   GET ?courseIds=ISTM 631,ISTM 615   course cards, one BatchGetItem
+#   GET ?courseId=ISTM 631             course totals plus the latest check-ins, one Query
+#
+# Replay recorded stream events locally:
+#   python lambda_function.py --dry-run events/checkin_stream.json   (print the updates)
+#   python lambda_function.py events/checkin_stream.json             (apply them to STATS_TABLE)
+
+COURSE_KEY = 'COURSE'
+CHECKIN_PREFIX = 'CHECKIN#'
+PROMPT_KEY = 'PROMPT'
+STUDENT_PREFIX = 'STUDENT#'
+STAFF_ROLES = ('faculty', 'admin')
+COURSE_PROJECTION = 'courseId, checkins, responses, lastCheckinAt, latestCheckinId, latestCheckinAt'
+
+_deserializer = None
+_serializer = None
+
+def from_image(image):
+    """Convert a stream image ({"S": ...} typed values) to a plain item."""
+    global _deserializer
+    if _deserializer is None:
+        from boto3.dynamodb.types import TypeDeserializer
+        _deserializer = TypeDeserializer()
+    return {name: _deserializer.deserialize(value) for name, value in (image or {}).items()}
+
+def to_attribute_values(values):
+    """Convert plain values to the {"S": ...} form the low-level client takes."""
+    global _serializer
+    if _serializer is None:
+        from boto3.dynamodb.types import TypeSerializer
+        _serializer = TypeSerializer()
+    return {name: _serializer.serialize(value) for name, value in values.items()}
+
+def transact_update(update):
+    """One TransactWriteItems Update entry for an update_item argument dict."""
+    entry = {
+        'TableName': TABLE_NAME,
+        'Key': to_attribute_values(update['Key']),
+        'UpdateExpression': update['UpdateExpression'],
+        'ExpressionAttributeValues': to_attribute_values(update['ExpressionAttributeValues'])
+    }
+    if 'ConditionExpression' in update:
+        entry['ConditionExpression'] = update['ConditionExpression']
+    return {'Update': entry}
+
+def checkin_stat_key(created_at, checkin_id):
+    return f"{CHECKIN_PREFIX}{created_at}#{checkin_id}"
+
+def stats_updates(event_name, old, new):
+    """
+    Return the (checkin update, course update) pair for one stream record, either
+    possibly None. The course update only runs if the checkin update applied.
+    """
+    item = new or old
+    course_id = item.get('courseId')
+    entry_key = item.get('entryKey', '')
+    if not course_id:
+        # Daily check-ins without a prompt don't belong to a course dashboard
+        return None, None
+
+    if entry_key == PROMPT_KEY:
+        if event_name != 'INSERT':
+            return None, None
+        key = {'courseId': course_id, 'statKey': checkin_stat_key(item['createdAt'], item['checkinId'])}
+        checkin = {
+            'Key': key,
+            'UpdateExpression': 'SET checkinId = :id, title = :title, createdAt = :created, '
+                                'expected = :expected, expectedStudents = :students ADD responded :zero',
+            'ConditionExpression': 'attribute_not_exists(createdAt)',
+            'ExpressionAttributeValues': {
+                ':id': item['checkinId'], ':title': item.get('title', 'Check-in'), ':created': item['createdAt'],
+                ':expected': len(item.get('expectedStudents', [])), ':students': item.get('expectedStudents', []),
+                ':zero': 0
+            }
+        }
+        course = {
+            'Key': {'courseId': course_id, 'statKey': COURSE_KEY},
+            'UpdateExpression': 'SET latestCheckinId = :id, latestCheckinAt = :created ADD checkins :one',
+            'ExpressionAttributeValues': {':id': item['checkinId'], ':created': item['createdAt'], ':one': 1}
+        }
+        return checkin, course
+
+    if not entry_key.startswith(STUDENT_PREFIX) or not item.get('promptCreatedAt'):
+        return None, None
+    key = {'courseId': course_id, 'statKey': checkin_stat_key(item['promptCreatedAt'], item['checkinId'])}
+    student = item['username']
+
+    if event_name == 'INSERT':
+        checkin = {
+            'Key': key,
+            'UpdateExpression': 'SET lastResponseAt = :at ADD responded :one, respondedStudents :student',
+            'ConditionExpression': 'NOT contains(respondedStudents, :name)',
+            'ExpressionAttributeValues': {':at': item['submittedAt'], ':one': 1, ':student': {student}, ':name': student}
+        }
+        course = {
+            'Key': {'courseId': course_id, 'statKey': COURSE_KEY},
+            'UpdateExpression': 'SET lastCheckinAt = :at ADD responses :one',
+            'ExpressionAttributeValues': {':at': item['submittedAt'], ':one': 1}
+        }
+        return checkin, course
+
+    if event_name == 'MODIFY':
+        # Resubmission: same student, no count change
+        return {
+            'Key': key,
+            'UpdateExpression': 'SET lastResponseAt = :at',
+            'ExpressionAttributeValues': {':at': item['submittedAt']}
+        }, None
+
+    if event_name == 'REMOVE':
+        checkin = {
+            'Key': key,
+            'UpdateExpression': 'ADD responded :minus DELETE respondedStudents :student',
+            'ConditionExpression': 'contains(respondedStudents, :name)',
+            'ExpressionAttributeValues': {':minus': -1, ':student': {student}, ':name': student}
+        }
+        course = {
+            'Key': {'courseId': course_id, 'statKey': COURSE_KEY},
+            'UpdateExpression': 'ADD responses :minus',
+            'ExpressionAttributeValues': {':minus': -1}
+        }
+        return checkin, course
+
+    return None, None
+
+def apply_record(record):
+    """Apply one stream record. Returns 'applied', 'duplicate' or 'skipped'."""
+    change = record['dynamodb']
+    checkin, course = stats_updates(record['eventName'], from_image(change.get('OldImage')), from_image(change.get('NewImage')))
+    if checkin is None:
+        return 'skipped'
+    client = get_dynamodb().meta.client
+    if course is None:
+        try:
+            get_table(TABLE_NAME).update_item(**checkin)
+        except client.exceptions.ConditionalCheckFailedException:
+            return 'duplicate'
+        return 'applied'
+    try:
+        client.transact_write_items(TransactItems=[transact_update(checkin), transact_update(course)])
+    except client.exceptions.TransactionCanceledException as e:
+        reasons = e.response.get('CancellationReasons') or []
+        if reasons and reasons[0].get('Code') == 'ConditionalCheckFailed':
+            # The checkin item already counts this record
+            return 'duplicate'
+        raise
+    return 'applied'
+
+def handle_stream(records):
+    """
+    Apply records in order. On a failure, stop and report that record's sequence number
+    so Lambda retries the batch from there and the per-key order is kept.
+    """
+    outcomes = {}
+    for record in records:
+        try:
+            outcome = apply_record(record)
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        except Exception as e:
+            log("Stats update failed", level='ERROR', eventID=record.get('eventID'), error=str(e))
+            return {'batchItemFailures': [{'itemIdentifier': record['dynamodb'].get('SequenceNumber')}]}
+    log("Stream batch applied", records=len(records), **outcomes)
+    return {'batchItemFailures': []}
+
+def checkin_summary(item):
+    responded = item.get('respondedStudents') or set()
+    expected = item.get('expectedStudents') or []
+    return {
+        'checkinId': item.get('checkinId'),
+        'title': item.get('title'),
+        'createdAt': item.get('createdAt'),
+        'expected': item.get('expected', 0),
+        'responded': item.get('responded', 0),
+        'lastResponseAt': item.get('lastResponseAt'),
+        'missing': [student for student in expected if student not in responded]
+    }
+
+def course_cards(course_ids):
+    request = {
+        TABLE_NAME: {
+            'Keys': [{'courseId': course_id, 'statKey': COURSE_KEY} for course_id in course_ids[:100]],
+            'ProjectionExpression': COURSE_PROJECTION
+        }
+    }
+    cards = []
+    while request:
+        response = get_dynamodb().batch_get_item(RequestItems=request)
+        cards.extend(response['Responses'].get(TABLE_NAME, []))
+        request = response.get('UnprocessedKeys')
+    return cards
+
+def course_detail(course_id):
+    """COURSE item and the newest check-ins come back in one descending query."""
+    result = get_table(TABLE_NAME).query(
+        KeyConditionExpression='courseId = :course',
+        ExpressionAttributeValues={':course': course_id},
+        ScanIndexForward=False,
+        Limit=RECENT_CHECKINS + 1
+    )
+    course = None
+    checkins = []
+    for item in result.get('Items', []):
+        if item['statKey'] == COURSE_KEY:
+            course = {k: v for k, v in item.items() if k != 'statKey'}
+        else:
+            checkins.append(checkin_summary(item))
+    return course, checkins[:RECENT_CHECKINS]
+
+@instrumented_handler('CHECKINSTATS')
+def lambda_handler(event, context):
+    if 'Records' in event:
+        set_request_fields(action='stream')
+        return handle_stream(event['Records'])
+    if request_method(event) == 'OPTIONS':
+        return respond(200, {})
+    try:
+        _, role = caller(event)
+        if role not in STAFF_ROLES:
+            return respond(403, {"success": False, "message": "Faculty access required"})
+
+        params = event.get('queryStringParameters') or {}
+        if params.get('courseIds'):
+            set_request_fields(action='cards')
+            course_ids = [course_id.strip() for course_id in params['courseIds'].split(',') if course_id.strip()]
+            return respond(200, {"success": True, "courses": course_cards(course_ids)})
+
+        set_request_fields(action='course')
+        course, checkins = course_detail(params['courseId'])
+        return respond(200, {"success": True, "course": course, "checkins": checkins})
+
+    except KeyError as e:
+        return respond(400, {"success": False, "message": f"Missing {e}"})
+
+    except Exception as e:
+        log("An unexpected error occurred", level='ERROR', error=str(e))
+        return respond(500, {
+            "success": False,
+            "message": "An internal error occurred. Please try again later."
+        })
+
+if __name__ == '__main__':
+    dry_run = '--dry-run' in sys.argv
+    for path in [arg for arg in sys.argv[1:] if arg != '--dry-run']:
+        with open(path) as f:
+            records = json.load(f)['Records']
+        if dry_run:
+            for record in records:
+                change = record['dynamodb']
+                updates = stats_updates(record['eventName'], from_image(change.get('OldImage')), from_image(change.get('NewImage')))
+                print(json.dumps({'eventID': record.get('eventID'), 'checkin': updates[0], 'course': updates[1]},
+                                 indent=2, default=json_default))
+        else:
+            print(json.dumps(lambda_handler({'Records': records}, None), indent=2))
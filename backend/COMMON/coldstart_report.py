@@ -0,0 +1,115 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+# Cold-start timing report for the backend handlers.
+# Each measurement runs in a fresh interpreter so nothing is shared between samples.
+# The "eager" numbers reproduce what the handlers used to do at import time
+# (import boto3 and build module-level clients); the "layer" numbers import the
+# handler as it is now and then create its clients on first use.
+#
+# Lazy clients don't remove the boto3 import and client construction, they move it into
+# the first invocation that needs a client. Compare the total columns (init plus first
+# use): that is what the first request after a cold start waits for either way. The init
+# column alone only shows what warm-up pings and requests rejected before any AWS call save.
+# Provisioned concurrency runs init ahead of traffic, which is why the handlers prewarm
+# during init there (common.warmup.PREWARM_ON_INIT).
+#
+#   python backend/COMMON/coldstart_report.py --runs 10
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYER_DIR = os.path.join(BACKEND_DIR, 'COMMON', 'python')
+HANDLERS = ['LOGIN', 'CREATEUSER', 'RESETPASSWORD']
+
+DUMMY_ENV = {
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'AWS_ACCESS_KEY_ID': 'testing',
+    'AWS_SECRET_ACCESS_KEY': 'testing',
+    'USER_POOL_ID': 'us-east-1_example',
+    'COGNITO_CLIENT_ID': 'example-client-id',
+    'COGNITO_CLIENT_SECRET': 'example-client-secret',
+    'USER_TABLE': 'Users',
+    'EMAIL_INDEX_TABLE': 'UserEmails'
+}
+
+EAGER_SNIPPET = """
+import time
+start = time.perf_counter()
+import boto3
+cognito = boto3.client('cognito-idp')
+{resource}
+init = time.perf_counter() - start
+print(init * 1000, 0.0)
+"""
+
+LAYER_SNIPPET = """
+import time
+start = time.perf_counter()
+import lambda_function
+init = time.perf_counter() - start
+from common import clients
+start = time.perf_counter()
+clients.get_cognito()
+{resource}
+first_use = time.perf_counter() - start
+print(init * 1000, first_use * 1000)
+"""
+
+def run_sample(snippet, handler):
+    """Run one snippet in a fresh interpreter and return (init_ms, first_use_ms)."""
+    env = dict(os.environ, **DUMMY_ENV)
+    env['PYTHONPATH'] = os.pathsep.join([os.path.join(BACKEND_DIR, handler), LAYER_DIR])
+    output = subprocess.run(
+        [sys.executable, '-c', snippet],
+        env=env,
+        cwd=os.path.join(BACKEND_DIR, handler),
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout.split()
+    return float(output[0]), float(output[1])
+
+def median(values):
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2
+
+def measure(handler, runs):
+    uses_dynamodb = handler == 'CREATEUSER'
+    eager = EAGER_SNIPPET.format(resource="boto3.resource('dynamodb')" if uses_dynamodb else '')
+    layer = LAYER_SNIPPET.format(resource="clients.get_dynamodb()" if uses_dynamodb else '')
+
+    eager_samples = [run_sample(eager, handler) for _ in range(runs)]
+    layer_samples = [run_sample(layer, handler) for _ in range(runs)]
+    return {
+        'handler': handler,
+        'eagerInitMs': round(median([s[0] for s in eager_samples]), 1),
+        'layerInitMs': round(median([s[0] for s in layer_samples]), 1),
+        'layerFirstUseMs': round(median([s[1] for s in layer_samples]), 1),
+        'eagerTotalMs': round(median([sum(s) for s in eager_samples]), 1),
+        'layerTotalMs': round(median([sum(s) for s in layer_samples]), 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare handler init and first-invocation cost before and after the shared client layer.')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per measurement')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args()
+
+    results = [measure(handler, args.runs) for handler in HANDLERS]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    columns = [('eagerInitMs', 'eager init ms'), ('layerInitMs', 'layer init ms'), ('layerFirstUseMs', 'first use ms'),
+               ('eagerTotalMs', 'eager total ms'), ('layerTotalMs', 'layer total ms')]
+    print(f"{'handler':<15}" + ''.join(f"{title:>16}" for _, title in columns))
+    for row in results:
+        print(f"{row['handler']:<15}" + ''.join(f"{row[key]:>16}" for key, _ in columns))
+
+if __name__ == '__main__':
+    main()
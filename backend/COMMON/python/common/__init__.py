@@ -0,0 +1,6 @@
+"""
+Shared code for the study abroad backend lambdas.
+
+Deployed as a Lambda layer: zip the backend/COMMON directory so that this package ends up
+under python/common, which Lambda puts on sys.path at /opt/python.
+"""
@@ -0,0 +1,300 @@
+import os
+import time
+import hashlib
+import threading
+from functools import lru_cache
+from collections import OrderedDict
+from common.clients import get_dynamodb, get_table
+from common.instrumentation import log
+
+# Sliding-window limits on failed attempts at the unauthenticated actions that reach Cognito
+# (a wrong password, a check for an email that doesn't exist, every password reset email),
+# keyed by email and by source IP. Successful requests are never counted.
+#
+#   check_request   before the Cognito call: rejects an IP while it is over its limit
+#                   (throttled until the window slides back under it) and an email while it
+#                   is locked out. Reads this container's counters; an email key this
+#                   container has already synced with ABUSE_TABLE is also checked against
+#                   the table's lockout (one GetItem), so a lockout set by another container
+#                   holds here too.
+#   record_attempt  after the Cognito call, for failures: counts against both keys. An email
+#                   that reaches its limit is locked out for the scope's lockout period; an IP
+#                   never is, so a shared campus NAT recovers as soon as it slows down.
+#
+# Two tiers:
+#   memory       per warm container, where every failure is counted first
+#   ABUSE_TABLE  counters shared by all containers, partition key limiterKey, TTL on expiresAt.
+#                A key only goes to the table once this container's estimate reaches
+#                ABUSE_SHARED_FRACTION of its limit, carrying the failures it counted so far;
+#                the shared view (and any lockout) then replaces the local one. Without the
+#                table only the memory tier applies; if it fails, requests go through.
+# Limitation: a container that hasn't synced an email key yet doesn't see a lockout another
+# container stored for it until it counts ABUSE_SHARED_FRACTION of the limit itself. So
+# with N warm containers an attacker gets up to about N * limit * ABUSE_SHARED_FRACTION
+# attempts at one email before every container enforces its lockout. Lower the fraction
+# to tighten that; successful requests still never reach the table.
+# A counter holds the current and previous fixed windows. The estimate weights the previous
+# window by how much of it the sliding window still covers.
+#
+# Limits:   ABUSE_LIMIT_<SCOPE>_<DIMENSION>="<failures>/<seconds>", e.g. ABUSE_LIMIT_RESET_EMAIL=3/900
+# Lockouts: ABUSE_LOCKOUT_<SCOPE>_SECONDS, falling back to ABUSE_LOCKOUT_SECONDS
+ABUSE_TABLE_NAME = os.environ.get('ABUSE_TABLE')
+ABUSE_LOCKOUT_SECONDS = int(os.environ.get('ABUSE_LOCKOUT_SECONDS', '900'))
+ABUSE_LOCAL_MAX_KEYS = int(os.environ.get('ABUSE_LOCAL_MAX_KEYS', '10000'))
+ABUSE_SHARED_FRACTION = float(os.environ.get('ABUSE_SHARED_FRACTION', '0.5'))
+# Emails and IPs are stored as salted digests
+ABUSE_KEY_SALT = os.environ.get('ABUSE_KEY_SALT', '')
+
+# scope -> dimension -> (failures, window seconds)
+DEFAULT_LIMITS = {
+    'login': {'ip': (100, 300), 'email': (10, 300)},
+    # Checks for emails that don't exist are the enumeration path, so one IP gets fewer of them
+    'check': {'ip': (30, 300), 'email': (20, 300)},
+    # Every initiate sends an email, so each one counts
+    'reset': {'ip': (20, 900), 'email': (3, 900)}
+}
+
+# Attempts to claim a shared window before giving up on the shared tier for a request
+SHARED_ATTEMPTS = 3
+
+class RateLimited(Exception):
+    """Raised when an IP is throttled or an email is locked out; handlers answer 429."""
+
+    def __init__(self, scope, dimension, retry_after):
+        super().__init__(f"{scope} limit reached for {dimension}, retry after {retry_after}s")
+        self.scope = scope
+        self.dimension = dimension
+        self.retry_after = retry_after
+
+@lru_cache(maxsize=None)
+def limit_for(scope, dimension):
+    """(requests, window seconds) for a scope and dimension."""
+    override = os.environ.get(f"ABUSE_LIMIT_{scope.upper()}_{dimension.upper()}")
+    if override:
+        requests, seconds = override.split('/')
+        return int(requests), int(seconds)
+    return DEFAULT_LIMITS[scope][dimension]
+
+@lru_cache(maxsize=None)
+def lockout_for(scope):
+    return int(os.environ.get(f"ABUSE_LOCKOUT_{scope.upper()}_SECONDS", ABUSE_LOCKOUT_SECONDS))
+
+def source_ip(event):
+    """Caller IP from a REST API (identity.sourceIp) or HTTP API (http.sourceIp) request context."""
+    context = event.get('requestContext') or {}
+    return (context.get('identity') or {}).get('sourceIp') or (context.get('http') or {}).get('sourceIp')
+
+def limiter_key(scope, dimension, value):
+    digest = hashlib.sha256((ABUSE_KEY_SALT + value.strip().lower()).encode('utf-8')).hexdigest()[:32]
+    return f"{scope}:{dimension}:{digest}"
+
+def sliding_estimate(hits, previous_hits, start, window, now):
+    return hits + previous_hits * max(0.0, 1 - (now - start) / window)
+
+def seconds_until_under(hits, previous_hits, start, window, now, limit):
+    """How long until the sliding estimate drops below the limit with no further failures."""
+    if hits >= limit:
+        # Not before this window ends; by then its hits are the previous window's
+        wait = start + window - now
+        hits, previous_hits, start, now = 0, hits, start + window, start + window
+    else:
+        wait = 0
+    if previous_hits:
+        # previous_hits * (1 - elapsed / window) < limit - hits
+        elapsed = window * (1 - (limit - hits) / previous_hits)
+        wait += max(0.0, start + elapsed - now)
+    # Whole seconds, strictly past the point where the estimate equals the limit
+    return int(wait) + 1
+
+class LocalCounters:
+    """
+    Bounded per-container counters: key -> [window start, hits, previous hits, locked until,
+    hits not yet in the shared tier, whether the key has been synced with the shared tier].
+    """
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _roll(self, entry, window, now):
+        start = int(now) - int(now) % window
+        if entry[0] != start:
+            entry[2] = entry[1] if entry[0] == start - window else 0
+            entry[0], entry[1], entry[4] = start, 0, 0
+        return entry
+
+    def peek(self, key, window, now):
+        """(window start, hits, previous hits, locked until) without counting anything."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return int(now) - int(now) % window, 0, 0, 0
+            return tuple(self._roll(entry, window, now)[:4])
+
+    def hit(self, key, window, now):
+        """Count a failure. Returns (estimate, hits not yet in the shared tier)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = [int(now) - int(now) % window, 0, 0, 0, 0, False]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+            self._roll(entry, window, now)
+            entry[1] += 1
+            entry[4] += 1
+            return sliding_estimate(entry[1], entry[2], entry[0], window, now), entry[4]
+
+    def sync(self, key, start, hits, previous_hits, locked_until):
+        """Replace the local view with the shared one after those hits were sent."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= start:
+                entry[:] = [start, hits, previous_hits, max(entry[3], locked_until), 0, True]
+
+    def is_synced(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[5]
+
+    def lock(self, key, until):
+        """Lock the key out until the given time; counting starts from zero afterwards."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[1] = entry[2] = entry[4] = 0
+                entry[3] = max(entry[3], until)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+local_counters = LocalCounters(ABUSE_LOCAL_MAX_KEYS)
+
+def _number(attribute):
+    # Old images from ReturnValuesOnConditionCheckFailure come back in wire format
+    return int(attribute['N']) if isinstance(attribute, dict) else int(attribute or 0)
+
+def _shared_hit(key, count, window, lockout, now):
+    """
+    Add count failures to the key in ABUSE_TABLE and return its
+    (window start, hits, previous hits, locked until). Usually one UpdateItem; the
+    first failure of a new window rolls the counter with a second.
+    """
+    table = get_table(ABUSE_TABLE_NAME)
+    conditional_failed = get_dynamodb().meta.client.exceptions.ConditionalCheckFailedException
+    start = int(now) - int(now) % window
+    # Kept long enough to outlive a lockout set during this window
+    expires = start + 2 * window + lockout
+
+    for _ in range(SHARED_ATTEMPTS):
+        try:
+            item = table.update_item(
+                Key={'limiterKey': key},
+                UpdateExpression='SET windowStart = if_not_exists(windowStart, :start), expiresAt = :expires ADD hits :count',
+                # Failures during a lockout aren't counted, so it ends with a clean window
+                ConditionExpression='(attribute_not_exists(windowStart) OR windowStart = :start) '
+                                    'AND (attribute_not_exists(lockedUntil) OR lockedUntil < :now)',
+                ExpressionAttributeValues={':start': start, ':expires': expires, ':count': count, ':now': int(now)},
+                ReturnValues='ALL_NEW',
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
+            )['Attributes']
+        except conditional_failed as e:
+            old = e.response.get('Item')
+            if old is None:
+                # Older SDKs don't return the item; read it instead
+                old = table.get_item(Key={'limiterKey': key}, ConsistentRead=True).get('Item') or {}
+            old_start = _number(old.get('windowStart'))
+            if _number(old.get('lockedUntil')) > now or old_start > start:
+                # Locked by another container, or its clock is ahead; go by its view without counting twice
+                return old_start, _number(old.get('hits')), _number(old.get('previousHits')), _number(old.get('lockedUntil'))
+            previous = _number(old.get('hits')) if old_start == start - window else 0
+            try:
+                item = table.update_item(
+                    Key={'limiterKey': key},
+                    UpdateExpression='SET windowStart = :start, hits = :count, previousHits = :previous, expiresAt = :expires',
+                    ConditionExpression='windowStart = :old',
+                    ExpressionAttributeValues={':start': start, ':count': count, ':previous': previous,
+                                               ':expires': expires, ':old': old_start},
+                    ReturnValues='ALL_NEW'
+                )['Attributes']
+            except conditional_failed:
+                # Another container rolled the window first; count in its window
+                continue
+        return start, int(item['hits']), int(item.get('previousHits', 0)), int(item.get('lockedUntil', 0))
+    raise RuntimeError(f"Could not claim a window for {key.split(':', 1)[0]}")
+
+def _shared_locked_until(key):
+    item = get_table(ABUSE_TABLE_NAME).get_item(
+        Key={'limiterKey': key},
+        ProjectionExpression='lockedUntil'
+    ).get('Item') or {}
+    return _number(item.get('lockedUntil'))
+
+def _shared_lock(key, until):
+    get_table(ABUSE_TABLE_NAME).update_item(
+        Key={'limiterKey': key},
+        UpdateExpression='SET lockedUntil = :until, hits = :zero, previousHits = :zero',
+        ExpressionAttributeValues={':until': int(until) + 1, ':zero': 0}
+    )
+
+def _dimensions(event, email):
+    # The IP comes first, so a throttled IP is reported before the email it was trying
+    return [(dimension, value) for dimension, value in (('ip', source_ip(event)), ('email', email)) if value]
+
+def check_request(scope, event, email=None):
+    """
+    Raise RateLimited if the request's IP is over the scope's failure limit or its email
+    is locked out. Counts nothing; the only remote call is the lockout read for an email
+    key this container has synced.
+    """
+    now = time.time()
+    for dimension, value in _dimensions(event, email):
+        limit, window = limit_for(scope, dimension)
+        key = limiter_key(scope, dimension, value)
+        start, hits, previous_hits, locked_until = local_counters.peek(key, window, now)
+        if locked_until <= now and dimension == 'email' and ABUSE_TABLE_NAME and local_counters.is_synced(key):
+            try:
+                locked_until = _shared_locked_until(key)
+            except Exception as e:
+                log("Abuse counters unavailable", level='WARN', scope=scope, error=str(e))
+            if locked_until > now:
+                local_counters.lock(key, locked_until)
+        if locked_until > now:
+            raise RateLimited(scope, dimension, max(1, int(locked_until - now + 0.999)))
+        if dimension == 'ip' and sliding_estimate(hits, previous_hits, start, window, now) >= limit:
+            raise RateLimited(scope, dimension, seconds_until_under(hits, previous_hits, start, window, now, limit))
+
+def record_attempt(scope, event, email=None):
+    """
+    Count a failed attempt against the scope's IP and email limits, locking the email
+    out once it reaches its limit. The response to this request is already decided;
+    the limits apply from the next one.
+    """
+    now = time.time()
+    lockout = lockout_for(scope)
+    for dimension, value in _dimensions(event, email):
+        limit, window = limit_for(scope, dimension)
+        key = limiter_key(scope, dimension, value)
+
+        estimate, unsynced = local_counters.hit(key, window, now)
+        locked_until = 0
+        if ABUSE_TABLE_NAME and estimate >= limit * ABUSE_SHARED_FRACTION:
+            try:
+                start, hits, previous_hits, locked_until = _shared_hit(key, unsynced, window, lockout, now)
+                local_counters.sync(key, start, hits, previous_hits, locked_until)
+                estimate = sliding_estimate(hits, previous_hits, start, window, now)
+            except Exception as e:
+                log("Abuse counters unavailable", level='WARN', scope=scope, error=str(e))
+
+        if dimension != 'email' or locked_until > now or estimate < limit:
+            continue
+        until = now + lockout
+        local_counters.lock(key, until)
+        log("Locking out email", level='WARN', scope=scope, estimate=round(estimate, 1), limit=limit)
+        if ABUSE_TABLE_NAME:
+            try:
+                _shared_lock(key, until)
+            except Exception as e:
+                log("Failed to store lockout", level='WARN', scope=scope, error=str(e))
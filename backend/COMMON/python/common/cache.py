@@ -0,0 +1,90 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from common.instrumentation import record_cache_lookup
+
+# Cache settings (per warm container)
+USER_CACHE_MAX_SIZE = int(os.environ.get('USER_CACHE_MAX_SIZE', '1024'))
+USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', '300'))
+USER_CACHE_NEGATIVE_TTL_SECONDS = float(os.environ.get('USER_CACHE_NEGATIVE_TTL_SECONDS', '30'))
+
+MISSING = object()
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire after a TTL.
+    Lives at module level so it survives across warm invocations of the same container.
+    Hits and misses of a named cache are counted per invocation and logged on the
+    "Request complete" line (common.instrumentation).
+    """
+
+    def __init__(self, max_size, ttl_seconds, name=None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.name = name
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value, or MISSING if absent or expired."""
+        with self._lock:
+            value = self._lookup(key)
+        if self.name:
+            record_cache_lookup(self.name, value is not MISSING)
+        return value
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl_seconds=None):
+        """Store a value, evicting the least recently used entry when full."""
+        if self.max_size <= 0:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Shared user lookups: email/username -> exists (bool), username -> attribute dict
+user_exists_cache = TTLCache(USER_CACHE_MAX_SIZE, USER_CACHE_TTL_SECONDS, name='userExists')
+user_attributes_cache = TTLCache(USER_CACHE_MAX_SIZE, USER_CACHE_TTL_SECONDS, name='userAttributes')
+
+def user_key(identifier):
+    """Cognito usernames and emails are case-insensitive, so cache them lower-cased."""
+    return identifier.strip().lower()
+
+def get_user_exists(identifier):
+    """Return True/False from the cache, or MISSING if the user has not been looked up recently."""
+    return user_exists_cache.get(user_key(identifier))
+
+def set_user_exists(identifier, exists):
+    """Cache an existence result. Negative results get a shorter TTL so new signups show up quickly."""
+    ttl = None if exists else USER_CACHE_NEGATIVE_TTL_SECONDS
+    user_exists_cache.set(user_key(identifier), exists, ttl)
+
+def invalidate_user(*identifiers):
+    """Drop everything cached for these emails/usernames after signup, confirm or password reset."""
+    for identifier in identifiers:
+        if identifier:
+            key = user_key(identifier)
+            user_exists_cache.invalidate(key)
+            user_attributes_cache.invalidate(key)
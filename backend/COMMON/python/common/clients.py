@@ -0,0 +1,117 @@
+import os
+import hmac
+import hashlib
+import base64
+import threading
+from functools import lru_cache
+from common.instrumentation import instrument_client
+
+# Connection settings shared by every AWS client in the layer
+AWS_CONNECT_TIMEOUT = float(os.environ.get('AWS_CONNECT_TIMEOUT', '2'))
+AWS_READ_TIMEOUT = float(os.environ.get('AWS_READ_TIMEOUT', '5'))
+AWS_MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', '25'))
+# Attempts per call including the first (botocore's retries.max_attempts would count retries only)
+AWS_MAX_ATTEMPTS = int(os.environ.get('AWS_MAX_ATTEMPTS', '3'))
+
+# Lazily created singletons; boto3 is only imported on first use
+_cognito = None
+_dynamodb = None
+_s3 = None
+_tables = {}
+_lock = threading.Lock()
+
+def _client_config(retries=None):
+    """Botocore config with explicit timeouts, keep-alive, a larger pool and adaptive retries."""
+    from botocore.config import Config
+    return Config(
+        connect_timeout=AWS_CONNECT_TIMEOUT,
+        read_timeout=AWS_READ_TIMEOUT,
+        tcp_keepalive=True,
+        max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+        retries=retries or {'mode': 'adaptive', 'total_max_attempts': AWS_MAX_ATTEMPTS}
+    )
+
+# Cognito calls go through common.throttle.cognito_call, which owns the retry policy
+# (token buckets, jittered backoff, a per-call deadline). Botocore retrying underneath
+# it, or its adaptive mode sleeping, would multiply attempts and overrun that deadline.
+COGNITO_RETRIES = {'mode': 'standard', 'total_max_attempts': 1}
+
+def get_cognito():
+    """Return the shared cognito-idp client, creating it on first use."""
+    global _cognito
+    if _cognito is None:
+        with _lock:
+            if _cognito is None:
+                import boto3
+                _cognito = instrument_client(boto3.client('cognito-idp', config=_client_config(COGNITO_RETRIES)))
+    return _cognito
+
+def get_s3():
+    """Return the shared S3 client, creating it on first use."""
+    global _s3
+    if _s3 is None:
+        with _lock:
+            if _s3 is None:
+                import boto3
+                _s3 = instrument_client(boto3.client('s3', config=_client_config()))
+    return _s3
+
+def get_dynamodb():
+    """Return the shared DynamoDB resource, creating it on first use."""
+    global _dynamodb
+    if _dynamodb is None:
+        with _lock:
+            if _dynamodb is None:
+                import boto3
+                _dynamodb = boto3.resource('dynamodb', config=_client_config())
+                instrument_client(_dynamodb.meta.client)
+    return _dynamodb
+
+def get_table(table_name):
+    """Return a cached Table handle so requests don't rebuild it."""
+    table = _tables.get(table_name)
+    if table is None:
+        table = get_dynamodb().Table(table_name)
+        _tables[table_name] = table
+    return table
+
+@lru_cache(maxsize=1)
+def _secret_hmac():
+    """Keyed HMAC object built once per container; copied for each hash."""
+    client_secret = os.environ.get('COGNITO_CLIENT_SECRET')
+    if not client_secret:
+        return None
+    return hmac.new(client_secret.encode('utf-8'), digestmod=hashlib.sha256)
+
+@lru_cache(maxsize=1024)
+def calculate_secret_hash(username):
+    """
+    Calculate the SECRET_HASH required for Cognito API calls when the app client has a secret.
+    Returns None if no client secret is configured.
+    """
+    base = _secret_hmac()
+    if base is None:
+        return None
+    dig = base.copy()
+    dig.update((username + os.environ['COGNITO_CLIENT_ID']).encode('utf-8'))
+    return base64.b64encode(dig.digest()).decode()
+
+def install_clients(cognito=None, dynamodb=None, s3=None):
+    """Use the given client objects instead of boto3 ones (local fakes for benchmarks and event replay)."""
+    global _cognito, _dynamodb, _s3
+    with _lock:
+        _cognito = cognito or _cognito
+        _dynamodb = dynamodb or _dynamodb
+        _s3 = s3 or _s3
+        _tables.clear()
+
+def reset_clients():
+    """Forget the cached clients, e.g. to simulate a cold start locally."""
+    global _cognito, _dynamodb, _s3
+    with _lock:
+        _cognito = None
+        _dynamodb = None
+        _s3 = None
+        _tables.clear()
+    _secret_hmac.cache_clear()
+    calculate_secret_hash.cache_clear()
@@ -0,0 +1,96 @@
+import os
+import json
+import time
+import hashlib
+from datetime import datetime
+from common.clients import get_dynamodb, get_table
+
+# email -> username table used for signup duplicate checks
+EMAIL_INDEX_TABLE_NAME = os.environ.get('EMAIL_INDEX_TABLE')
+# How long an unfinished signup holds its email before another signup may take it over
+EMAIL_CLAIM_SECONDS = int(os.environ.get('EMAIL_CLAIM_SECONDS', '30'))
+
+# A signup claims its email row before calling Cognito. The row carries signupKey, a digest
+# of the signup's non-secret fields, so a retry of the same signup finds its own row and
+# gets the same answer instead of "Email already exists". The row stays PENDING until
+# sign_up returns, then becomes UNCONFIRMED and, via POSTCONFIRMATION, CONFIRMED.
+PENDING = 'PENDING'
+
+def normalize_email(email):
+    """Email index keys are stored trimmed and lower-cased."""
+    return email.strip().lower()
+
+def find_existing_emails(emails):
+    """Return the subset of emails already in the index, 100 keys per BatchGetItem."""
+    dynamodb = get_dynamodb()
+    keys = [{'email': normalize_email(email)} for email in emails]
+    found = set()
+    for start in range(0, len(keys), 100):
+        request = {
+            EMAIL_INDEX_TABLE_NAME: {
+                'Keys': keys[start:start + 100],
+                'ProjectionExpression': 'email',
+                'ConsistentRead': True
+            }
+        }
+        while request:
+            response = dynamodb.batch_get_item(RequestItems=request)
+            found.update(item['email'] for item in response['Responses'].get(EMAIL_INDEX_TABLE_NAME, []))
+            request = response.get('UnprocessedKeys')
+    return found
+
+def signup_key(fields):
+    """Digest of a signup's non-secret fields (never the password) identifying repeats of it."""
+    canonical = json.dumps(fields, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def claim_email(email, key):
+    """
+    Claim the email for a signup with one conditional put. Returns None if the claim was
+    taken, otherwise the row already holding the email (which may be this signup's own).
+    """
+    table = get_table(EMAIL_INDEX_TABLE_NAME)
+    now = int(time.time())
+    try:
+        table.put_item(
+            Item={'email': normalize_email(email), 'status': PENDING, 'signupKey': key,
+                  'claimExpiresAt': now + EMAIL_CLAIM_SECONDS, 'updatedAt': datetime.utcnow().isoformat()},
+            ConditionExpression='attribute_not_exists(email) OR (#status = :pending AND claimExpiresAt < :now)',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={':pending': PENDING, ':now': now},
+            ReturnValuesOnConditionCheckFailure='ALL_OLD'
+        )
+        return None
+    except get_dynamodb().meta.client.exceptions.ConditionalCheckFailedException as e:
+        item = e.response.get('Item')
+        if item:
+            return {name: next(iter(value.values())) for name, value in item.items()}
+        # Older SDKs don't return the item; read it instead
+        return table.get_item(Key={'email': normalize_email(email)}, ConsistentRead=True).get('Item') or {'status': PENDING}
+
+def release_email(email, key):
+    """Drop this signup's unfinished claim so the user can try again straight away."""
+    get_table(EMAIL_INDEX_TABLE_NAME).delete_item(
+        Key={'email': normalize_email(email)},
+        ConditionExpression='#status = :pending AND signupKey = :key',
+        ExpressionAttributeNames={'#status': 'status'},
+        ExpressionAttributeValues={':pending': PENDING, ':key': key}
+    )
+
+def build_email_index_item(email, username, status, user_id=None, key=None):
+    item = {
+        'email': normalize_email(email),
+        'username': username,
+        'status': status,
+        'updatedAt': datetime.utcnow().isoformat()
+    }
+    if user_id:
+        item['userId'] = user_id
+    if key:
+        item['signupKey'] = key
+    return item
+
+def index_email(email, username, status, user_id=None, key=None):
+    """Write the email -> username row for an account."""
+    table = get_table(EMAIL_INDEX_TABLE_NAME)
+    table.put_item(Item=build_email_index_item(email, username, status, user_id, key))
@@ -0,0 +1,13 @@
+# Accessors for API Gateway proxy events (REST and HTTP API payloads). The caller is
+# whoever the AUTHORIZER put in the request context: its username and application role.
+
+def caller(event):
+    """(username, role) from the authorizer context; role is lower-case, '' if missing."""
+    authorizer = (event.get('requestContext') or {}).get('authorizer') or {}
+    return authorizer.get('username'), (authorizer.get('role') or '').lower()
+
+def is_admin(event):
+    return caller(event)[1] == 'admin'
+
+def request_method(event, default='GET'):
+    return event.get('httpMethod') or ((event.get('requestContext') or {}).get('http') or {}).get('method', default)
@@ -0,0 +1,74 @@
+import math
+
+# Geohash encoding for proximity lookups in DynamoDB. Points that share a geohash
+# prefix are in the same cell, so "near X" becomes a few begins_with range queries
+# on a sort key that starts with the point's geohash.
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+MAX_PRECISION = 9
+
+def encode(lat, lon, precision=MAX_PRECISION):
+    """Return the geohash of a point, precision characters long."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        current, target = (lon_range, lon) if even else (lat_range, lat)
+        mid = (current[0] + current[1]) / 2
+        value <<= 1
+        if target >= mid:
+            value |= 1
+            current[0] = mid
+        else:
+            current[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+def cell_size(precision):
+    """(latitude degrees, longitude degrees) spanned by a cell at this precision."""
+    lon_bits = math.ceil(5 * precision / 2)
+    lat_bits = math.floor(5 * precision / 2)
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+def precision_for_radius(radius_km, lat=0.0):
+    """Longest precision whose cells are still at least radius_km across at this latitude."""
+    for precision in range(MAX_PRECISION, 0, -1):
+        lat_span, lon_span = cell_size(precision)
+        height = lat_span * KM_PER_DEGREE
+        width = lon_span * KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01)
+        if min(height, width) >= radius_km:
+            return precision
+    return 1
+
+def covering_cells(lat, lon, radius_km):
+    """
+    Geohash prefixes whose cells together contain every point within radius_km:
+    the cell holding the point and its eight neighbours.
+    """
+    precision = precision_for_radius(radius_km, lat)
+    lat_span, lon_span = cell_size(precision)
+    cells = set()
+    for dlat in (-lat_span, 0.0, lat_span):
+        for dlon in (-lon_span, 0.0, lon_span):
+            neighbour_lat = min(max(lat + dlat, -90.0), 90.0)
+            neighbour_lon = (lon + dlon + 180.0) % 360.0 - 180.0
+            cells.add(encode(neighbour_lat, neighbour_lon, precision))
+    return sorted(cells)
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance between two points."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
@@ -0,0 +1,244 @@
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import threading
+from functools import wraps
+
+# Structured JSON logging and CloudWatch Embedded Metric Format (EMF) latency metrics,
+# plus a Throttles count per Cognito operation (common.throttle reports into it).
+# Every line goes to stdout, which Lambda ships to CloudWatch Logs.
+
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'StudyAbroad/Backend')
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+# Fraction of invocations whose INFO lines are written; warnings and errors are always written
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', '1'))
+LOG_HASH_SALT = os.environ.get('LOG_HASH_SALT', '')
+
+# State of the invocation being handled by this container
+_request = {}
+# Invocations seen by this container; the first one is the cold start
+_invocations = 0
+# (service, operation) -> {'latencies': [...], 'errors': n}
+_calls = {}
+# (operation, kind) -> throttled Cognito calls; kind is 'local' (our token bucket) or 'remote' (Cognito)
+_throttles = {}
+# cache name -> {'hits': n, 'misses': n}, written on the "Request complete" line
+_cache_lookups = {}
+_lock = threading.Lock()
+
+def hash_email(email):
+    """Stable pseudonymous id for an email so logs can be correlated without storing addresses."""
+    if not email:
+        return None
+    return hashlib.sha256((LOG_HASH_SALT + email.strip().lower()).encode('utf-8')).hexdigest()[:16]
+
+def is_cold_start():
+    """True while the container is handling its first invocation."""
+    return _invocations <= 1
+
+def set_request_fields(action=None, email=None, **fields):
+    """Attach the action, hashed email and other fields to every log line of this invocation."""
+    if action is not None:
+        _request['action'] = action
+    if email is not None:
+        _request['emailHash'] = hash_email(email)
+    _request.update(fields)
+
+def log(message, level='INFO', **fields):
+    """Write one JSON log line. INFO lines are dropped for invocations outside the sample."""
+    if level == 'INFO' and not _request.get('sampled', True):
+        return
+    record = {
+        'timestamp': round(time.time() * 1000),
+        'level': level,
+        'handler': _request.get('handler'),
+        'requestId': _request.get('requestId'),
+        'action': _request.get('action'),
+        'emailHash': _request.get('emailHash'),
+        'message': message
+    }
+    if 'email' in fields:
+        fields['emailHash'] = hash_email(fields.pop('email'))
+    record.update(fields)
+    sys.stdout.write(json.dumps(record, default=str) + '\n')
+
+def record_call(service, operation, duration_ms, error=False):
+    """Collect the latency of one AWS call for this invocation's metrics."""
+    with _lock:
+        stats = _calls.setdefault((service, operation), {'latencies': [], 'errors': 0})
+        stats['latencies'].append(round(duration_ms, 3))
+        if error:
+            stats['errors'] += 1
+
+def record_throttle(operation, kind):
+    """Count one throttled Cognito call for this invocation's Throttles metric."""
+    with _lock:
+        _throttles[(operation, kind)] = _throttles.get((operation, kind), 0) + 1
+
+def record_cache_lookup(cache_name, hit):
+    """Count one lookup in a named common.cache.TTLCache for this invocation."""
+    with _lock:
+        counts = _cache_lookups.setdefault(cache_name, {'hits': 0, 'misses': 0})
+        counts['hits' if hit else 'misses'] += 1
+
+def _before_call(model, context, **kwargs):
+    context['instrumentationStart'] = time.perf_counter()
+    context['instrumentationOperation'] = model.name
+
+def _after_call(http_response, context, **kwargs):
+    start = context.get('instrumentationStart')
+    if start is not None:
+        record_call(context['instrumentationService'], context['instrumentationOperation'],
+                    (time.perf_counter() - start) * 1000, error=http_response.status_code >= 300)
+
+def _after_call_error(context, **kwargs):
+    start = context.get('instrumentationStart')
+    if start is not None:
+        record_call(context['instrumentationService'], context['instrumentationOperation'], (time.perf_counter() - start) * 1000, error=True)
+
+def instrument_client(client):
+    """Time every API call made through a botocore client using its event hooks."""
+    service = client.meta.service_model.service_name
+
+    def before_call(context, **kwargs):
+        context['instrumentationService'] = service
+        _before_call(context=context, **kwargs)
+
+    client.meta.events.register('before-call', before_call)
+    client.meta.events.register('after-call', _after_call)
+    client.meta.events.register('after-call-error', _after_call_error)
+    return client
+
+def emit_metrics(outcome, duration_ms):
+    """
+    Write EMF documents: one for the invocation, one per AWS operation it called and
+    one per operation it was throttled on.
+    """
+    with _lock:
+        calls = dict(_calls)
+        throttles = dict(_throttles)
+        _calls.clear()
+        _throttles.clear()
+    if not METRICS_ENABLED:
+        return
+
+    handler = _request.get('handler')
+    action = _request.get('action') or 'unknown'
+    timestamp = round(time.time() * 1000)
+    documents = [{
+        '_aws': {
+            'Timestamp': timestamp,
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [['Handler', 'Action'], ['Handler', 'Action', 'Outcome']],
+                'Metrics': [
+                    {'Name': 'RequestLatency', 'Unit': 'Milliseconds'},
+                    {'Name': 'Requests', 'Unit': 'Count'},
+                    {'Name': 'ColdStarts', 'Unit': 'Count'}
+                ]
+            }]
+        },
+        'Handler': handler,
+        'Action': action,
+        'Outcome': outcome,
+        'RequestLatency': round(duration_ms, 3),
+        'Requests': 1,
+        'ColdStarts': 1 if _request.get('coldStart') else 0,
+        'requestId': _request.get('requestId')
+    }]
+    for (service, operation), stats in calls.items():
+        documents.append({
+            '_aws': {
+                'Timestamp': timestamp,
+                'CloudWatchMetrics': [{
+                    'Namespace': METRICS_NAMESPACE,
+                    'Dimensions': [['Handler', 'Action', 'Operation']],
+                    'Metrics': [
+                        {'Name': 'CallLatency', 'Unit': 'Milliseconds'},
+                        {'Name': 'Calls', 'Unit': 'Count'},
+                        {'Name': 'CallErrors', 'Unit': 'Count'}
+                    ]
+                }]
+            },
+            'Handler': handler,
+            'Action': action,
+            'Operation': f"{service}.{operation}",
+            'CallLatency': stats['latencies'],
+            'Calls': len(stats['latencies']),
+            'CallErrors': stats['errors']
+        })
+    for (operation, kind), count in throttles.items():
+        documents.append({
+            '_aws': {
+                'Timestamp': timestamp,
+                'CloudWatchMetrics': [{
+                    'Namespace': METRICS_NAMESPACE,
+                    'Dimensions': [['Operation', 'Kind'], ['Handler', 'Operation', 'Kind']],
+                    'Metrics': [{'Name': 'Throttles', 'Unit': 'Count'}]
+                }]
+            },
+            'Handler': handler,
+            'Operation': f"cognito-idp.{operation}",
+            'Kind': kind,
+            'Throttles': count
+        })
+    sys.stdout.write(''.join(json.dumps(document) + '\n' for document in documents))
+
+def outcome_for(status_code):
+    if status_code is None or status_code < 400:
+        return 'success'
+    if status_code == 429:
+        return 'throttled'
+    if status_code < 500:
+        return 'client_error'
+    return 'error'
+
+def instrumented_handler(handler_name):
+    """Decorator for lambda_handler: sets up the log context, times the invocation and flushes metrics."""
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(event, context):
+            global _invocations
+            if _request.get('active'):
+                # Already instrumented by an outer handler (e.g. AUTHROUTER)
+                return handler(event, context)
+            _invocations += 1
+            _request.clear()
+            _request.update(
+                handler=handler_name,
+                requestId=getattr(context, 'aws_request_id', None),
+                sampled=LOG_SAMPLE_RATE >= 1 or random.random() < LOG_SAMPLE_RATE,
+                coldStart=_invocations == 1,
+                active=True
+            )
+            with _lock:
+                _calls.clear()
+                _throttles.clear()
+                _cache_lookups.clear()
+            start = time.perf_counter()
+            try:
+                response = handler(event, context)
+            except Exception as e:
+                duration_ms = (time.perf_counter() - start) * 1000
+                log("Unhandled exception", level='ERROR', error=str(e), durationMs=round(duration_ms, 3))
+                emit_metrics('exception', duration_ms)
+                raise
+            finally:
+                _request['active'] = False
+            duration_ms = (time.perf_counter() - start) * 1000
+            status_code = response.get('statusCode') if isinstance(response, dict) else None
+            outcome = outcome_for(status_code)
+            with _lock:
+                cache = {name: dict(counts) for name, counts in _cache_lookups.items()}
+                _cache_lookups.clear()
+            extra = {'cache': cache} if cache else {}
+            log("Request complete", level='INFO' if outcome == 'success' else 'WARN',
+                statusCode=status_code, outcome=outcome, durationMs=round(duration_ms, 3), coldStart=_request['coldStart'],
+                **extra)
+            emit_metrics(outcome, duration_ms)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,43 @@
+import json
+import base64
+from common.responses import json_default
+
+# Opaque cursors for DynamoDB query pagination. The browser gets LastEvaluatedKey
+# back as a URL-safe string and returns it unchanged to fetch the next page.
+
+MAX_PAGE_SIZE = 50
+
+def encode_cursor(last_evaluated_key):
+    """Return the cursor for a LastEvaluatedKey, or None on the last page."""
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, separators=(',', ':'), sort_keys=True, default=json_default)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, expected=None):
+    """
+    Return the ExclusiveStartKey for a cursor (None for no cursor).
+    expected pins key attributes to the values the query is for, so a cursor from one
+    partition can't be replayed against another. Raises ValueError for a bad cursor.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if not isinstance(key, dict):
+        raise ValueError("Invalid cursor")
+    for name, value in (expected or {}).items():
+        if key.get(name) != value:
+            raise ValueError("Cursor does not belong to this query")
+    return key
+
+def page_size(value, default=10):
+    """Parse a limit query parameter, clamped to 1..MAX_PAGE_SIZE."""
+    try:
+        size = int(value) if value not in (None, '') else default
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid limit: {value}")
+    return max(1, min(size, MAX_PAGE_SIZE))
@@ -0,0 +1,50 @@
+import uuid
+from datetime import datetime
+
+# userId is derived from the Cognito username, so every writer (confirmation trigger
+# retries, bulk provisioning) addresses the same USER_TABLE row for a user
+USER_ID_NAMESPACE = uuid.UUID('6f1c3c52-2b8e-4d47-9a51-7c0e2d7b9f14')
+
+def user_id_for(username):
+    return str(uuid.uuid5(USER_ID_NAMESPACE, username))
+
+def search_name(first_name, last_name, username=None):
+    """Lower-cased "first last" the directory prefix-searches; falls back to the username."""
+    name = ' '.join(f"{first_name or ''} {last_name or ''}".split()).lower()
+    return name or (username or '').lower() or None
+
+def reversed_search_name(first_name, last_name):
+    """Lower-cased "last first", so a surname prefix finds the user too; None unless both are set."""
+    first, last = ' '.join((first_name or '').split()), ' '.join((last_name or '').split())
+    return f"{last} {first}".lower() if first and last else None
+
+def directory_attributes(item):
+    """
+    Keys of the directory indexes on USER_TABLE (see backend/DIRECTORY). Attributes that
+    would be empty are left out, so the row simply isn't in that index.
+    """
+    attributes = {
+        'directoryRole': (item.get('role') or '').lower() or None,
+        'searchName': search_name(item.get('firstName'), item.get('lastName'), item.get('username')),
+        'searchNameReversed': reversed_search_name(item.get('firstName'), item.get('lastName')),
+        'emailLower': (item.get('email') or '').strip().lower() or None
+    }
+    return {name: value for name, value in attributes.items() if value}
+
+def build_profile_item(username, user_attributes, user_id=None):
+    """Build the USER_TABLE row for a user from their Cognito attributes."""
+    now = datetime.utcnow().isoformat()
+    item = {
+        'userId': user_id or user_id_for(username),
+        'username': username,
+        'email': user_attributes.get('email'),
+        'firstName': user_attributes.get('given_name'),
+        'lastName': user_attributes.get('family_name'),
+        'phone': user_attributes.get('phone_number'),
+        'role': user_attributes.get('custom:userRole'),
+        'createdAt': now,
+        'updatedAt': now,
+        'version': 1
+    }
+    item.update(directory_attributes(item))
+    return item
@@ -0,0 +1,95 @@
+import os
+import time
+import random
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from functools import wraps
+from common.instrumentation import log
+
+# Opt-in profiling of slow invocations. A sampled invocation runs under cProfile (and
+# tracemalloc if enabled); if it takes longer than PROFILE_THRESHOLD_MS, its top functions
+# and allocation sites are written as one "Slow request profile" log line.
+# With PROFILE_SAMPLE_RATE=0 (the default) the decorator returns the handler unchanged,
+# so profiling costs nothing unless it is switched on in the function's configuration.
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_THRESHOLD_MS = float(os.environ.get('PROFILE_THRESHOLD_MS', '500'))
+PROFILE_TOP_N = int(os.environ.get('PROFILE_TOP_N', '15'))
+PROFILE_TRACEMALLOC = os.environ.get('PROFILE_TRACEMALLOC', 'false').lower() == 'true'
+# Frames kept per allocation traceback; 1 is enough for a by-line summary
+PROFILE_TRACEMALLOC_FRAMES = int(os.environ.get('PROFILE_TRACEMALLOC_FRAMES', '1'))
+
+# Only one profiler can run per process; concurrent invocations (benchmark threads,
+# AUTHROUTER calling a profiled handler) just run unprofiled
+_active = threading.Lock()
+
+def short_path(path):
+    """Trim a source path to the part after site-packages or the handler directory."""
+    for marker in ('site-packages/', 'python/', 'backend/'):
+        if marker in path:
+            return path.rsplit(marker, 1)[1]
+    return os.path.basename(path)
+
+def function_summary(profiler, top_n):
+    """Top functions by cumulative time, as compact dicts."""
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, name), (_, calls, total, cumulative, _) in stats.stats.items():
+        where = f"{short_path(filename)}:{line}({name})" if line else name
+        rows.append({'fn': where, 'calls': calls, 'ownMs': round(total * 1000, 3), 'cumMs': round(cumulative * 1000, 3)})
+    rows.sort(key=lambda row: row['cumMs'], reverse=True)
+    return rows[:top_n], stats.total_calls
+
+def allocation_summary(snapshot, top_n):
+    """Top allocation sites by size in a tracemalloc snapshot."""
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__)
+    ])
+    return [
+        {'at': f"{short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+         'kb': round(stat.size / 1024, 1), 'blocks': stat.count}
+        for stat in snapshot.statistics('lineno')[:top_n]
+    ]
+
+def profiled_handler(handler):
+    """
+    Decorator for lambda_handler, applied inside instrumented_handler so the profile line
+    carries the invocation's handler, action and request id.
+    """
+    if PROFILE_SAMPLE_RATE <= 0:
+        return handler
+
+    @wraps(handler)
+    def wrapper(event, context):
+        if random.random() >= PROFILE_SAMPLE_RATE or not _active.acquire(blocking=False):
+            return handler(event, context)
+        try:
+            started_tracing = PROFILE_TRACEMALLOC and not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            profiler.enable()
+            try:
+                return handler(event, context)
+            finally:
+                profiler.disable()
+                duration_ms = (time.perf_counter() - start) * 1000
+                snapshot = peak = None
+                if started_tracing:
+                    snapshot = tracemalloc.take_snapshot()
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                if duration_ms >= PROFILE_THRESHOLD_MS:
+                    functions, total_calls = function_summary(profiler, PROFILE_TOP_N)
+                    fields = {'durationMs': round(duration_ms, 3), 'thresholdMs': PROFILE_THRESHOLD_MS,
+                              'totalCalls': total_calls, 'functions': functions}
+                    if snapshot is not None:
+                        fields['peakKb'] = round(peak / 1024, 1)
+                        fields['allocations'] = allocation_summary(snapshot, PROFILE_TOP_N)
+                    log("Slow request profile", level='WARN', **fields)
+        finally:
+            _active.release()
+    return wrapper
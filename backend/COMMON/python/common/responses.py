@@ -0,0 +1,50 @@
+import json
+from decimal import Decimal
+
+# API Gateway proxy responses with CORS headers. Header dicts are built once per
+# method list and shared by every response that uses them.
+
+ALLOW_ORIGIN = '*'
+_header_sets = {}
+
+def json_default(value):
+    """json.dumps default for DynamoDB values: Decimal to int/float, sets to sorted lists."""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def cors_headers(methods, allow_headers='Content-Type'):
+    """Return the shared CORS header dict for this method list."""
+    key = (methods, allow_headers)
+    headers = _header_sets.get(key)
+    if headers is None:
+        headers = _header_sets[key] = {
+            "Access-Control-Allow-Origin": ALLOW_ORIGIN,
+            "Access-Control-Allow-Headers": allow_headers,
+            "Access-Control-Allow-Methods": methods
+        }
+    return headers
+
+def responder(methods, allow_headers='Content-Type'):
+    """
+    Build the respond(status_code, payload, headers=None) helper for a handler.
+    Extra headers (e.g. Retry-After) are merged into a copy of the shared CORS headers.
+    A payload of None sends an empty body (304 responses).
+    """
+    base_headers = cors_headers(methods, allow_headers)
+
+    def respond(status_code, payload, headers=None):
+        return {
+            "statusCode": status_code,
+            "headers": dict(base_headers, **headers) if headers else base_headers,
+            "body": json.dumps(payload, default=json_default) if payload is not None else ""
+        }
+    return respond
+
+def parse_body(event):
+    """Return the JSON request body, reusing the copy AUTHROUTER already parsed if present."""
+    if 'parsedBody' in event:
+        return event['parsedBody']
+    return json.loads(event['body'])
@@ -0,0 +1,18 @@
+import os
+
+# Application roles, most privileged first. A user's role is the first of these among their
+# Cognito groups (the cognito:groups token claim). Groups are assigned by an admin, by bulk
+# provisioning, or by the Post Confirmation trigger for SELF_SERVICE_ROLES only. The
+# custom:userRole attribute is what the user asked for at signup and never grants access.
+ROLES = ('admin', 'faculty', 'student')
+SELF_SERVICE_ROLES = tuple(
+    role.strip().lower() for role in os.environ.get('SELF_SERVICE_ROLES', 'student').split(',') if role.strip()
+)
+
+def role_from_claims(claims):
+    """The most privileged application role in a token's cognito:groups claim, or '' if none."""
+    groups = claims.get('cognito:groups')
+    if not isinstance(groups, list):
+        return ''
+    groups = {group.lower() for group in groups if isinstance(group, str)}
+    return next((role for role in ROLES if role in groups), '')
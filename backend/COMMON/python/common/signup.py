@@ -0,0 +1,81 @@
+import os
+from common.cache import MISSING, user_attributes_cache, user_key, invalidate_user
+from common.clients import get_dynamodb, get_table
+from common.email_index import index_email
+from common.profiles import build_profile_item, user_id_for
+from common.roles import SELF_SERVICE_ROLES
+from common.throttle import cognito_call
+from common.instrumentation import log
+
+USER_TABLE_NAME = os.environ.get('USER_TABLE')
+
+# What a confirmed signup gets: its self-service group and its USER_TABLE profile row.
+# The POSTCONFIRMATION trigger sets them up inside confirm_sign_up. If the trigger fails
+# after Cognito confirmed the account, CREATEUSER sets them up on the retried confirm.
+# Every step is idempotent, so running it twice for a user is harmless.
+
+def get_user_attributes(user_pool_id, username):
+    """Retrieve user attributes from Cognito, using the warm-container cache first."""
+    cached = user_attributes_cache.get(user_key(username))
+    if cached is not MISSING:
+        return cached
+    try:
+        response = cognito_call(
+            'admin_get_user',
+            UserPoolId=user_pool_id,
+            Username=username
+        )
+        attributes = {attr['Name']: attr['Value'] for attr in response['UserAttributes']}
+        user_attributes_cache.set(user_key(username), attributes)
+        return attributes
+    except Exception as e:
+        log("Error fetching user attributes", level='ERROR', error=str(e))
+        return None
+
+def profile_exists(username):
+    """Point read of the user's USER_TABLE row."""
+    return 'Item' in get_table(USER_TABLE_NAME).get_item(
+        Key={'userId': user_id_for(username)},
+        ProjectionExpression='userId'
+    )
+
+def create_user_profile(username, user_attributes, role):
+    """
+    Store user details in DynamoDB and keep the email index in sync.
+    The row is keyed on the username-derived userId and only written once, so a
+    retried trigger leaves the existing profile alone. role is the role actually
+    granted; a different one asked for at signup is kept as requestedRole.
+    """
+    item = build_profile_item(username, dict(user_attributes, **{'custom:userRole': role}))
+    requested_role = user_attributes.get('custom:userRole')
+    if requested_role and requested_role != role:
+        item['requestedRole'] = requested_role
+    try:
+        get_table(USER_TABLE_NAME).put_item(Item=item, ConditionExpression='attribute_not_exists(userId)')
+    except get_dynamodb().meta.client.exceptions.ConditionalCheckFailedException:
+        log("Profile already exists", userId=item['userId'])
+
+    if item['email']:
+        index_email(item['email'], username, 'CONFIRMED', item['userId'])
+    return item['userId']
+
+def complete_signup(user_pool_id, username, user_attributes):
+    """Add a confirmed user to their self-service group and write their profile row."""
+    # custom:userRole is chosen by the user; only self-service roles become a group here.
+    # Anything else waits for an admin to add the user to the group.
+    requested_role = (user_attributes.get('custom:userRole') or '').lower()
+    user_role = requested_role if requested_role in SELF_SERVICE_ROLES else None
+    log("Creating profile for confirmed user", role=user_role, requestedRole=requested_role)
+
+    if user_role:
+        cognito_call(
+            'admin_add_user_to_group',
+            UserPoolId=user_pool_id,
+            Username=username,
+            GroupName=user_role
+        )
+    elif requested_role:
+        log("Role needs an admin to grant it", level='WARN', requestedRole=requested_role)
+
+    create_user_profile(username, user_attributes, user_role)
+    invalidate_user(username, user_attributes.get('email'))
@@ -0,0 +1,122 @@
+import os
+import shutil
+from common.clients import get_s3
+
+# Object storage for uploaded files. S3 in Lambda; STORAGE_BACKEND=local swaps in a
+# directory on disk for local runs and event replay, with the same interface.
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 's3')
+STORAGE_BUCKET = os.environ.get('STORAGE_BUCKET')
+LOCAL_STORAGE_ROOT = os.environ.get('LOCAL_STORAGE_ROOT', '/tmp/storage')
+# Public base URL for stored objects (CloudFront distribution or local static server)
+STORAGE_PUBLIC_URL = os.environ.get('STORAGE_PUBLIC_URL')
+
+CHUNK_SIZE = 64 * 1024
+
+class ObjectTooLarge(Exception):
+    pass
+
+def copy_bounded(source, target, max_bytes):
+    """Stream source into target in chunks, failing once more than max_bytes have been read."""
+    total = 0
+    while True:
+        chunk = source.read(CHUNK_SIZE)
+        if not chunk:
+            return total
+        total += len(chunk)
+        if total > max_bytes:
+            raise ObjectTooLarge(f"Object is larger than {max_bytes} bytes")
+        target.write(chunk)
+
+class S3Storage:
+    def __init__(self, bucket, public_url=None):
+        self.bucket = bucket
+        self.public_url = public_url or f"https://{bucket}.s3.amazonaws.com"
+
+    def upload_target(self, key, content_type_prefix, max_bytes, expires_in=300):
+        """Presigned POST the browser uploads to directly; S3 enforces the size and type limits."""
+        return get_s3().generate_presigned_post(
+            Bucket=self.bucket,
+            Key=key,
+            Conditions=[
+                ['content-length-range', 1, max_bytes],
+                ['starts-with', '$Content-Type', content_type_prefix]
+            ],
+            ExpiresIn=expires_in
+        )
+
+    def size(self, key):
+        """Object size in bytes, or None if it doesn't exist."""
+        try:
+            return get_s3().head_object(Bucket=self.bucket, Key=key)['ContentLength']
+        except get_s3().exceptions.ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def read_into(self, key, target, max_bytes):
+        body = get_s3().get_object(Bucket=self.bucket, Key=key)['Body']
+        try:
+            return copy_bounded(body, target, max_bytes)
+        finally:
+            body.close()
+
+    def put(self, key, data, content_type, cache_control=None):
+        params = {'Bucket': self.bucket, 'Key': key, 'Body': data, 'ContentType': content_type}
+        if cache_control:
+            params['CacheControl'] = cache_control
+        get_s3().put_object(**params)
+
+    def url(self, key):
+        return f"{self.public_url.rstrip('/')}/{key}"
+
+class LocalStorage:
+    def __init__(self, root, public_url=None):
+        self.root = root
+        self.public_url = public_url or f"file://{os.path.abspath(root)}"
+
+    def _path(self, key):
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(os.path.abspath(self.root) + os.sep):
+            raise ValueError(f"Invalid key: {key}")
+        return path
+
+    def upload_target(self, key, content_type_prefix, max_bytes, expires_in=300):
+        # Same shape as a presigned POST; locally the file is written with put()
+        return {'url': self.public_url, 'fields': {'key': key}}
+
+    def size(self, key):
+        path = self._path(key)
+        return os.path.getsize(path) if os.path.exists(path) else None
+
+    def read_into(self, key, target, max_bytes):
+        with open(self._path(key), 'rb') as source:
+            return copy_bounded(source, target, max_bytes)
+
+    def put(self, key, data, content_type, cache_control=None):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            if isinstance(data, (bytes, bytearray)):
+                f.write(data)
+            else:
+                shutil.copyfileobj(data, f, CHUNK_SIZE)
+
+    def url(self, key):
+        return f"{self.public_url.rstrip('/')}/{key}"
+
+_storage = None
+
+def get_storage():
+    """Return the configured storage backend, creating it on first use."""
+    global _storage
+    if _storage is None:
+        if STORAGE_BACKEND == 'local':
+            _storage = LocalStorage(LOCAL_STORAGE_ROOT, STORAGE_PUBLIC_URL)
+        else:
+            _storage = S3Storage(STORAGE_BUCKET, STORAGE_PUBLIC_URL)
+    return _storage
+
+def install_storage(storage):
+    """Use the given storage object instead of the configured one."""
+    global _storage
+    _storage = storage
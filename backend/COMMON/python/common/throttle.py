@@ -0,0 +1,144 @@
+import os
+import time
+import random
+import threading
+from common.clients import get_cognito
+from common.instrumentation import log, record_throttle
+
+# Cognito quota categories for the operations the backend uses.
+# https://docs.aws.amazon.com/cognito/latest/developerguide/limits.html
+OPERATION_CATEGORIES = {
+    'initiate_auth': 'UserAuthentication',
+    'admin_initiate_auth': 'UserAuthentication',
+    'respond_to_auth_challenge': 'UserAuthentication',
+    'sign_up': 'UserCreation',
+    'confirm_sign_up': 'UserCreation',
+    'admin_create_user': 'UserCreation',
+    'forgot_password': 'UserAccountRecovery',
+    'confirm_forgot_password': 'UserAccountRecovery',
+    'resend_confirmation_code': 'UserAccountRecovery',
+    'admin_get_user': 'UserRead',
+    'get_user': 'UserRead',
+    'list_users': 'UserList',
+    'admin_add_user_to_group': 'UserUpdate',
+    'admin_update_user_attributes': 'UserUpdate',
+    'describe_user_pool_client': 'UserPoolClientRead'
+}
+
+# Default requests per second per category (account defaults); override with COGNITO_RPS_<CATEGORY>,
+# e.g. COGNITO_RPS_USERAUTHENTICATION=40 to give one function a share of the account quota.
+DEFAULT_CATEGORY_RPS = {
+    'UserAuthentication': 120,
+    'UserCreation': 50,
+    'UserAccountRecovery': 30,
+    'UserRead': 120,
+    'UserList': 30,
+    'UserUpdate': 25,
+    'UserPoolClientRead': 15
+}
+
+COGNITO_CALL_DEADLINE_SECONDS = float(os.environ.get('COGNITO_CALL_DEADLINE_SECONDS', '2'))
+BACKOFF_BASE_SECONDS = float(os.environ.get('COGNITO_BACKOFF_BASE_SECONDS', '0.05'))
+BACKOFF_MAX_SECONDS = float(os.environ.get('COGNITO_BACKOFF_MAX_SECONDS', '1'))
+
+THROTTLE_ERROR_CODES = ('TooManyRequestsException', 'ThrottlingException')
+# Retried like throttling; the Cognito client itself makes a single attempt (common.clients)
+TRANSIENT_ERROR_CODES = ('InternalErrorException', 'ServiceUnavailable', 'InternalFailure', 'RequestTimeout')
+
+class CognitoThrottled(Exception):
+    """Raised when a Cognito call can't be made within its deadline; handlers answer 429."""
+
+    def __init__(self, operation, retry_after):
+        super().__init__(f"Cognito {operation} throttled, retry after {retry_after}s")
+        self.operation = operation
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Per-container token bucket refilled at `rate` tokens per second."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token and return how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def refund(self):
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+def get_bucket(category):
+    bucket = _buckets.get(category)
+    if bucket is None:
+        with _buckets_lock:
+            bucket = _buckets.get(category)
+            if bucket is None:
+                rate = float(os.environ.get(f"COGNITO_RPS_{category.upper()}", DEFAULT_CATEGORY_RPS.get(category, 10)))
+                bucket = _buckets[category] = TokenBucket(rate)
+    return bucket
+
+def error_code(error):
+    return getattr(error, 'response', {}).get('Error', {}).get('Code')
+
+def is_throttle_error(error):
+    return error_code(error) in THROTTLE_ERROR_CODES
+
+def is_transient_error(error):
+    status = getattr(error, 'response', {}).get('ResponseMetadata', {}).get('HTTPStatusCode') or 0
+    return error_code(error) in TRANSIENT_ERROR_CODES or status >= 500
+
+def cognito_call(operation, deadline_seconds=None, **params):
+    """
+    Call a cognito-idp operation under its category's token bucket.
+    Throttling and transient service errors are retried with full-jitter backoff until the
+    deadline. After that a throttled call raises CognitoThrottled and other errors are re-raised.
+    """
+    deadline = time.monotonic() + (COGNITO_CALL_DEADLINE_SECONDS if deadline_seconds is None else deadline_seconds)
+    bucket = get_bucket(OPERATION_CATEGORIES.get(operation, 'Other'))
+    method = getattr(get_cognito(), operation)
+    attempt = 0
+
+    while True:
+        wait = bucket.reserve()
+        if wait > 0:
+            if time.monotonic() + wait > deadline:
+                bucket.refund()
+                # Emitted as the Throttles metric: 'local' is our bucket, 'remote' is Cognito's own limit
+                record_throttle(operation, 'local')
+                raise CognitoThrottled(operation, max(1, int(wait + 0.999)))
+            time.sleep(wait)
+
+        try:
+            return method(**params)
+        except Exception as e:
+            throttled = is_throttle_error(e)
+            if not throttled and not is_transient_error(e):
+                raise
+            if throttled:
+                record_throttle(operation, 'remote')
+                log("Cognito throttled", level='WARN', operation=operation, attempt=attempt + 1)
+            else:
+                log("Cognito call failed, retrying", level='WARN', operation=operation, attempt=attempt + 1, error=str(e))
+            failure = e
+
+        delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+        attempt += 1
+        if time.monotonic() + delay > deadline:
+            if is_throttle_error(failure):
+                raise CognitoThrottled(operation, 1)
+            raise failure
+        time.sleep(delay)
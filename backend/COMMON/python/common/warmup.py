@@ -0,0 +1,76 @@
+import os
+import time
+from common.clients import get_table
+from common.instrumentation import is_cold_start, set_request_fields, log
+from common.throttle import cognito_call
+
+# Keep-warm handling. A scheduled EventBridge rule (or serverless-plugin-warmup)
+# invokes the function with a non-API event; handlers answer it before touching
+# the request body and use it to open their AWS connections ahead of real traffic.
+
+# Provisioned concurrency runs init before any traffic arrives, so connections opened
+# there are free; on-demand init is on the first request's path, so it stays opt-in
+PROVISIONED = os.environ.get('AWS_LAMBDA_INITIALIZATION_TYPE') == 'provisioned-concurrency'
+PREWARM_ON_INIT = os.environ.get('PREWARM_ON_INIT', 'true' if PROVISIONED else 'false').lower() == 'true'
+WARMUP_SOURCES = ('aws.events', 'serverless-plugin-warmup')
+
+# Set by the first prewarm_on_init in this container. AUTHROUTER imports LOGIN, CREATEUSER
+# and RESETPASSWORD lazily, inside a live request, after its own init already prewarmed
+_init_prewarmed = False
+
+def is_warmup_event(event):
+    return isinstance(event, dict) and (
+        event.get('warmup') is True
+        or event.get('source') in WARMUP_SOURCES
+        or event.get('detail-type') == 'Scheduled Event'
+    )
+
+def prewarm(cognito=False, tables=None):
+    """
+    Make one cheap call per endpoint so the TLS connection is already in the pool.
+    tables maps table name -> a key that doesn't exist (a GetItem miss costs half a read unit).
+    Failures are logged and ignored.
+    """
+    warmed = {}
+    if cognito:
+        start = time.perf_counter()
+        try:
+            cognito_call(
+                'describe_user_pool_client',
+                deadline_seconds=0,
+                UserPoolId=os.environ['USER_POOL_ID'],
+                ClientId=os.environ['COGNITO_CLIENT_ID']
+            )
+            warmed['cognito-idp'] = round((time.perf_counter() - start) * 1000, 1)
+        except Exception as e:
+            log("Cognito prewarm failed", level='WARN', error=str(e))
+    for table_name, key in (tables or {}).items():
+        if not table_name:
+            continue
+        start = time.perf_counter()
+        try:
+            get_table(table_name).get_item(Key=key, ProjectionExpression=next(iter(key)))
+            warmed[table_name] = round((time.perf_counter() - start) * 1000, 1)
+        except Exception as e:
+            log("DynamoDB prewarm failed", level='WARN', table=table_name, error=str(e))
+    return warmed
+
+def prewarm_on_init(cognito=False, tables=None):
+    """
+    The init-time prewarm for a handler module: runs when PREWARM_ON_INIT is set, once
+    per container, so a module imported by another entry point mid-request skips it.
+    """
+    global _init_prewarmed
+    if not PREWARM_ON_INIT or _init_prewarmed:
+        return None
+    _init_prewarmed = True
+    return prewarm(cognito, tables)
+
+def warmup_response(event, cognito=False, tables=None):
+    """Return the reply for a keep-warm event, or None if this is a real request."""
+    if not is_warmup_event(event):
+        return None
+    set_request_fields(action='warmup')
+    warmed = prewarm(cognito, tables)
+    log("Warm-up complete", warmed=warmed)
+    return {"warmup": True, "coldStart": is_cold_start(), "warmed": warmed}
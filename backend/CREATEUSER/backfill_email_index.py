@@ -0,0 +1,54 @@
+import boto3
+import os
+import argparse
+from datetime import datetime
+
+# One-time backfill of the email index table from the existing Cognito user pool.
+# Run it with admin credentials before switching signup over to the index:
+#   USER_POOL_ID=... EMAIL_INDEX_TABLE=... python backfill_email_index.py
+
+def backfill(user_pool_id, table_name, dry_run=False):
+    """Copy every pool user that has an email into the email -> username table."""
+    cognito = boto3.client('cognito-idp')
+    table = boto3.resource('dynamodb').Table(table_name)
+    paginator = cognito.get_paginator('list_users')
+    now = datetime.utcnow().isoformat()
+
+    written = 0
+    skipped = 0
+    with table.batch_writer(overwrite_by_pkeys=['email']) as batch:
+        for page in paginator.paginate(UserPoolId=user_pool_id, AttributesToGet=['email']):
+            for user in page['Users']:
+                attributes = {attr['Name']: attr['Value'] for attr in user.get('Attributes', [])}
+                email = attributes.get('email')
+                if not email:
+                    skipped += 1
+                    continue
+                status = 'CONFIRMED' if user.get('UserStatus') == 'CONFIRMED' else 'UNCONFIRMED'
+                if not dry_run:
+                    batch.put_item(Item={
+                        'email': email.strip().lower(),
+                        'username': user['Username'],
+                        'status': status,
+                        'updatedAt': now
+                    })
+                written += 1
+            print(f"Indexed {written} users so far ({skipped} without email)")
+
+    return written, skipped
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill the signup email index from Cognito.')
+    parser.add_argument('--user-pool-id', default=os.environ.get('USER_POOL_ID'))
+    parser.add_argument('--table', default=os.environ.get('EMAIL_INDEX_TABLE'))
+    parser.add_argument('--dry-run', action='store_true', help='List users without writing to DynamoDB')
+    args = parser.parse_args()
+
+    if not args.user_pool_id or not args.table:
+        parser.error('USER_POOL_ID and EMAIL_INDEX_TABLE are required')
+
+    written, skipped = backfill(args.user_pool_id, args.table, args.dry_run)
+    print(f"Done: {written} users indexed, {skipped} skipped")
+
+if __name__ == '__main__':
+    main()
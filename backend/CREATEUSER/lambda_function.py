@@ -1,60 +1,39 @@
-import boto3
 import os
-import json
-import hmac
-import hashlib
-import base64
 import uuid
-from datetime import datetime
-
-# Initialize AWS services
-cognito = boto3.client('cognito-idp')
-dynamodb = boto3.resource('dynamodb')
+from common.cache import invalidate_user
+from common.clients import get_cognito, calculate_secret_hash
+from common.throttle import CognitoThrottled, cognito_call
+from common.profiling import profiled_handler
+from common.instrumentation import instrumented_handler, set_request_fields, log
+from common.responses import responder, parse_body
+from common.warmup import prewarm_on_init, warmup_response
+from common.email_index import EMAIL_INDEX_TABLE_NAME, claim_email, release_email, index_email, signup_key
+from common.signup import complete_signup, get_user_attributes, profile_exists
 
 # Environment variables
-USER_POOL_ID = os.environ['USER_POOL_ID']
-TABLE_NAME = os.environ['USER_TABLE']
 COGNITO_CLIENT_ID = os.environ['COGNITO_CLIENT_ID']
-COGNITO_CLIENT_SECRET = os.environ['COGNITO_CLIENT_SECRET']
+USER_POOL_ID = os.environ['USER_POOL_ID']
 
-def calculate_secret_hash(username):
-    """Calculate the SECRET_HASH required for Cognito API calls."""
-    message = username + COGNITO_CLIENT_ID
-    secret = bytes(COGNITO_CLIENT_SECRET, 'utf-8')
-    dig = hmac.new(secret, msg=message.encode('utf-8'), digestmod=hashlib.sha256).digest()
-    return base64.b64encode(dig).decode()
+respond = responder("OPTIONS,POST,GET")
 
-def check_email_exists(email):
-    """Check if a user with the given email already exists in Cognito."""
-    try:
-        response = cognito.list_users(
-            UserPoolId=USER_POOL_ID,
-            Filter=f'email = "{email}"'
-        )
-        return len(response['Users']) > 0
-    except Exception as e:
-        print(f"Error checking email: {str(e)}")
-        return False
+# Connections opened on keep-warm pings (and at init when PREWARM_ON_INIT is set)
+WARMUP_TARGETS = {'cognito': True, 'tables': {EMAIL_INDEX_TABLE_NAME: {'email': '__warmup__'}}}
+prewarm_on_init(**WARMUP_TARGETS)
 
-def get_user_attributes(username):
-    """Retrieve user attributes from Cognito."""
-    try:
-        response = cognito.admin_get_user(
-            UserPoolId=USER_POOL_ID,
-            Username=username
-        )
-        attributes = {attr['Name']: attr['Value'] for attr in response['UserAttributes']}
-        return attributes
-    except Exception as e:
-        print(f"Error fetching user attributes: {str(e)}")
-        return None
-
-def lambda_handler(event, context):
+# Group assignment and the USER_TABLE profile row are written by the
+# POSTCONFIRMATION trigger once Cognito confirms the account.
+#
+# Signup claims the email index row before calling Cognito (see common.email_index), so a
+# retried or double-clicked signup gets the first one's result back: the same 201 once it
+# finished, 409 while it is still running. A repeated confirm is recognised from Cognito's
+# own "already confirmed" error plus a point read of the profile row: if the first confirm's
+# trigger failed after Cognito confirmed the account, the retry finishes the sign-up
+# (common.signup.complete_signup) instead of sending the user to a login with no role.
+
+def process(body, action):
+    """Run one signup/confirm/resend action and return its response."""
+    cognito = get_cognito()
     try:
-        # Parse request body
-        body = json.loads(event['body'])
-        action = body.get('action', 'signup')
-
         if action == 'signup':
             # Extract fields from request
             email = body['email']
@@ -63,187 +42,133 @@ def lambda_handler(event, context):
             last_name = body['lastName']
             phone = body.get('phone', '')
             user_role = body['userRole']
-
-            # Check if email already exists
-            if check_email_exists(email):
-                return {
-                    "statusCode": 400,
-                    "headers": {
-                        "Access-Control-Allow-Origin": "*",
-                        "Access-Control-Allow-Headers": "Content-Type",
-                        "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-                    },
-                    "body": json.dumps({"success": False, "message": "Email already exists!"})
-                }
+            set_request_fields(email=email)
+
+            # Claim the email; a repeat of this same signup finds its own claim
+            key = signup_key({'email': email.strip().lower(), 'firstName': first_name, 'lastName': last_name,
+                              'phone': phone, 'userRole': user_role})
+            existing = claim_email(email, key)
+            if existing is not None:
+                if existing.get('signupKey') != key:
+                    return respond(400, {"success": False, "message": "Email already exists!"})
+                if not existing.get('username'):
+                    return respond(409, {"success": False, "message": "This sign-up is already being processed."}, headers={"Retry-After": "1"})
+                log("Replaying completed sign-up")
+                return respond(201, {"success": True, "message": "Sign-up successful! Check your email for verification.", "username": existing['username']},
+                               headers={"Idempotent-Replayed": "true"})
 
             # Generate unique username
             username = f"{first_name.lower()}.{last_name.lower()}{uuid.uuid4().hex[:6]}"
             secret_hash = calculate_secret_hash(username)
 
             # Sign up the user in Cognito
-            cognito.sign_up(
-                ClientId=COGNITO_CLIENT_ID,
-                Username=username,
-                Password=password,
-                SecretHash=secret_hash,
-                UserAttributes=[
-                    {'Name': 'email', 'Value': email},
-                    {'Name': 'given_name', 'Value': first_name},
-                    {'Name': 'family_name', 'Value': last_name},
-                    {'Name': 'phone_number', 'Value': phone},
-                    {'Name': 'custom:userRole', 'Value': user_role}
-                ]
-            )
-
-            return {
-                "statusCode": 201,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-                },
-                "body": json.dumps({"success": True, "message": "Sign-up successful! Check your email for verification.", "username": username})
-            }
+            try:
+                cognito_call(
+                    'sign_up',
+                    ClientId=COGNITO_CLIENT_ID,
+                    Username=username,
+                    Password=password,
+                    SecretHash=secret_hash,
+                    UserAttributes=[
+                        {'Name': 'email', 'Value': email},
+                        {'Name': 'given_name', 'Value': first_name},
+                        {'Name': 'family_name', 'Value': last_name},
+                        {'Name': 'phone_number', 'Value': phone},
+                        {'Name': 'custom:userRole', 'Value': user_role}
+                    ]
+                )
+            except Exception:
+                try:
+                    release_email(email, key)
+                except Exception as e:
+                    # The claim expires on its own after EMAIL_CLAIM_SECONDS
+                    log("Failed to release email claim", level='WARN', error=str(e))
+                raise
+
+            # Complete the claim with the username, so later signups see it with a single point read
+            index_email(email, username, 'UNCONFIRMED', key=key)
+            invalidate_user(email, username)
+
+            return respond(201, {"success": True, "message": "Sign-up successful! Check your email for verification.", "username": username})
 
         elif action == 'confirm':
             # Confirm user account using the verification code
             username = body['username']
             verification_code = body['verificationCode']
-            user_role = body['userRole']  # Ensure role is passed
 
-            cognito.confirm_sign_up(
-                ClientId=COGNITO_CLIENT_ID,
-                Username=username,
-                ConfirmationCode=verification_code,
-                SecretHash=calculate_secret_hash(username)
-            )
-
-            # Fetch user details from Cognito
-            user_attributes = get_user_attributes(username)
-            if not user_attributes:
-                return {
-                    "statusCode": 500,
-                    "headers": {
-                        "Access-Control-Allow-Origin": "*",
-                        "Access-Control-Allow-Headers": "Content-Type",
-                        "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-                    },
-                    "body": json.dumps({"success": False, "message": "Failed to fetch user details."})
-                }
-
-            # Extract details
-            email = user_attributes.get('email')
-            first_name = user_attributes.get('given_name')
-            last_name = user_attributes.get('family_name')
-            phone = user_attributes.get('phone_number')
-
-            # Add user to Cognito group
-            cognito.admin_add_user_to_group(
-                UserPoolId=USER_POOL_ID,
-                Username=username,
-                GroupName=user_role
-            )
-#
-            # Store user details in DynamoDB
-            table = dynamodb.Table(TABLE_NAME)
-            user_id = str(uuid.uuid4())  # Generate new UUID
-            now = datetime.utcnow().isoformat()
-
-            table.put_item(
-                Item={
-                    'userId': user_id,
-                    'username': username,
-                    'email': email,
-                    'firstName': first_name,
-                    'lastName': last_name,
-                    'phone': phone,
-                    'role': user_role,
-                    'createdAt': now,
-                    'updatedAt': now
-                }
-            )
-
-            return {
-                "statusCode": 200,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-                },
-                "body": json.dumps({"success": True, "message": "Account verified successfully!", "redirect": "/login"})
-            }
+            try:
+                cognito_call(
+                    'confirm_sign_up',
+                    ClientId=COGNITO_CLIENT_ID,
+                    Username=username,
+                    ConfirmationCode=verification_code,
+                    SecretHash=calculate_secret_hash(username)
+                )
+            except cognito.exceptions.NotAuthorizedException as e:
+                if 'CONFIRMED' not in str(e):
+                    raise
+                # A repeated confirm: the first one went through, but its trigger may not have
+                if not profile_exists(username):
+                    log("Confirmed account has no profile, completing sign-up", level='WARN')
+                    user_attributes = get_user_attributes(USER_POOL_ID, username)
+                    if not user_attributes:
+                        raise Exception(f"Failed to fetch user details for {username}")
+                    complete_signup(USER_POOL_ID, username, user_attributes)
+                return respond(200, {"success": True, "message": "Account already verified.", "redirect": "/login"})
+            invalidate_user(username)
+
+            return respond(200, {"success": True, "message": "Account verified successfully!", "redirect": "/login"})
 
         elif action == 'resend_verification':
             # Resend the verification code
             username = body['username']
 
-            cognito.resend_confirmation_code(
+            cognito_call(
+                'resend_confirmation_code',
                 ClientId=COGNITO_CLIENT_ID,
                 Username=username,
                 SecretHash=calculate_secret_hash(username)
             )
 
-            return {
-                "statusCode": 200,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-                },
-                "body": json.dumps({"success": True, "message": "Verification code resent successfully."})
-            }
+            return respond(200, {"success": True, "message": "Verification code resent successfully."})
 
         else:
-            return {
-                "statusCode": 400,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-                },
-                "body": json.dumps({"success": False, "message": f"Invalid action: {action}"})
-            }
+            return respond(400, {"success": False, "message": f"Invalid action: {action}"})
 
     except cognito.exceptions.CodeMismatchException:
-        return {
-            "statusCode": 400,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-            },
-            "body": json.dumps({"success": False, "message": "Invalid verification code."})
-        }
+        return respond(400, {"success": False, "message": "Invalid verification code."})
 
     except cognito.exceptions.ExpiredCodeException:
-        return {
-            "statusCode": 400,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-            },
-            "body": json.dumps({"success": False, "message": "Verification code expired."})
-        }
+        return respond(400, {"success": False, "message": "Verification code expired."})
+
+    except cognito.exceptions.NotAuthorizedException:
+        return respond(400, {"success": False, "message": "This account can't complete that request."})
 
     except cognito.exceptions.UserNotFoundException:
-        return {
-            "statusCode": 404,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-            },
-            "body": json.dumps({"success": False, "message": "User not found. Please sign up first."})
-        }
+        return respond(404, {"success": False, "message": "User not found. Please sign up first."})
+
+    except CognitoThrottled as e:
+        log("Rejecting request, Cognito budget exhausted", level='WARN', error=str(e))
+        return respond(429, {"success": False, "message": "Too many requests. Please try again shortly."}, headers={"Retry-After": str(e.retry_after)})
+
+    except Exception as e:
+        log("Error processing request", level='ERROR', error=str(e))
+        return respond(500, {"success": False, "message": f"An error occurred: {str(e)}"})
 
+@instrumented_handler('CREATEUSER')
+@profiled_handler
+def lambda_handler(event, context):
+    warm = warmup_response(event, **WARMUP_TARGETS)
+    if warm:
+        return warm
+    try:
+        # Parse request body
+        body = parse_body(event)
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Access-Control-Allow-Methods": "OPTIONS,POST,GET"
-            },
-            "body": json.dumps({"success": False, "message": f"An error occurred: {str(e)}"})
-        }
+        log("Error processing request", level='ERROR', error=str(e))
+        return respond(400, {"success": False, "message": "Invalid request body."})
+    if not isinstance(body, dict):
+        return respond(400, {"success": False, "message": "Invalid request body."})
+    action = body.get('action', 'signup')
+    set_request_fields(action=action, username=body.get('username'))
+    return process(body, action)
@@ -0,0 +1,80 @@
+import os
+import sys
+import json
+import argparse
+import boto3
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'COMMON', 'python'))
+from common.profiles import user_id_for  # noqa: E402
+from common.email_index import normalize_email  # noqa: E402
+
+# One-time re-keying of USER_TABLE rows written before userId was derived from the username
+# (random uuid4 keys) to user_id_for(username), pointing each email index row at the new id.
+# Run it with admin credentials at deploy time; it is safe to re-run:
+#   USER_TABLE=... EMAIL_INDEX_TABLE=... python migrate_user_ids.py [--dry-run]
+
+def is_conditional_failure(error):
+    return getattr(error, 'response', {}).get('Error', {}).get('Code') == 'ConditionalCheckFailedException'
+
+def migrate(users, email_index=None, dry_run=False):
+    """
+    Move every row whose userId isn't user_id_for(username) to that key. A row already at
+    the new key is left alone and the old row is reported as a conflict instead of deleted.
+    """
+    counts = {'scanned': 0, 'moved': 0, 'conflicts': []}
+    scan = {}
+    while True:
+        page = users.scan(**scan)
+        for item in page.get('Items', []):
+            counts['scanned'] += 1
+            if not item.get('username') or item['userId'] == user_id_for(item['username']):
+                continue
+            old_id, new_id = item['userId'], user_id_for(item['username'])
+            if dry_run:
+                counts['moved'] += 1
+                continue
+            try:
+                users.put_item(Item=dict(item, userId=new_id), ConditionExpression='attribute_not_exists(userId)')
+            except Exception as e:
+                if not is_conditional_failure(e):
+                    raise
+                counts['conflicts'].append({'username': item['username'], 'userId': old_id})
+                continue
+            users.delete_item(
+                Key={'userId': old_id},
+                ConditionExpression='username = :username',
+                ExpressionAttributeValues={':username': item['username']}
+            )
+            counts['moved'] += 1
+            if email_index is not None and item.get('email'):
+                try:
+                    email_index.update_item(
+                        Key={'email': normalize_email(item['email'])},
+                        UpdateExpression='SET userId = :id',
+                        ConditionExpression='username = :username',
+                        ExpressionAttributeValues={':id': new_id, ':username': item['username']}
+                    )
+                except Exception as e:
+                    # The email now belongs to someone else (or was never indexed)
+                    if not is_conditional_failure(e):
+                        raise
+        if not page.get('LastEvaluatedKey'):
+            return counts
+        scan['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-key USER_TABLE rows on the username-derived userId.')
+    parser.add_argument('--table', default=os.environ.get('USER_TABLE'))
+    parser.add_argument('--email-index-table', default=os.environ.get('EMAIL_INDEX_TABLE'))
+    parser.add_argument('--dry-run', action='store_true', help='Count the rows to move without writing')
+    args = parser.parse_args()
+
+    if not args.table:
+        parser.error('USER_TABLE is required')
+
+    dynamodb = boto3.resource('dynamodb')
+    email_index = dynamodb.Table(args.email_index_table) if args.email_index_table else None
+    print(json.dumps(migrate(dynamodb.Table(args.table), email_index, args.dry_run), indent=2))
+
+if __name__ == '__main__':
+    main()
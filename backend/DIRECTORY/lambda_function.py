@@ -0,0 +1,178 @@
+import os
+import sys
+import json
+from common.clients import get_table
+from common.events import is_admin, request_method
+from common.profiles import directory_attributes
+from common.pagination import encode_cursor, decode_cursor, page_size
+from common.instrumentation import instrumented_handler, set_request_fields, log
+from common.responses import responder
+
+# Environment variables
+TABLE_NAME = os.environ['USER_TABLE']
+DEFAULT_PAGE_SIZE = int(os.environ.get('DIRECTORY_PAGE_SIZE', '20'))
+
+respond = responder("OPTIONS,GET", "Content-Type,Authorization")
+
+# Admin user directory over USER_TABLE. Sparse global secondary indexes, all
+# partitioned by role so a search never reads other roles' accounts:
+#   directoryRole-searchName-index           sort key searchName ('first last', lower-cased)
+#   directoryRole-searchNameReversed-index   sort key searchNameReversed ('last first')
+#   directoryRole-emailLower-index           sort key emailLower
+# projecting only the DIRECTORY_FIELDS below (INCLUDE), plus searchName on the reversed
+# index for its filter. The attributes come from common.profiles.directory_attributes
+# on every profile write.
+#
+#   GET ?q=ann&role=student&limit=20&cursor=...   name prefix, one role
+#   GET ?q=ann@tamu&by=email                       email prefix (the default when q has an @)
+#   GET ?q=ann                                     every role, one role after another
+# A name search reads each role's "first last" index and then its "last first" index, so
+# "doe" finds Jane Doe. The second query filters out names the first one already
+# returned ("ann adams" for "a"), so a user shows up once however the pages fall.
+# Each page is one Query per index and role it touches. The cursor is the index
+# LastEvaluatedKey, which carries the role and the index's sort key, so a page can pick
+# up mid-index or at the start of the next one.
+#
+# Add the directory attributes to rows written before the indexes existed:
+#   python lambda_function.py --backfill [--dry-run]
+
+ROLES = ('admin', 'faculty', 'student')
+INDEXES = {
+    'name': (('directoryRole-searchName-index', 'searchName'),
+             ('directoryRole-searchNameReversed-index', 'searchNameReversed')),
+    'email': (('directoryRole-emailLower-index', 'emailLower'),)
+}
+DIRECTORY_FIELDS = ('userId', 'username', 'firstName', 'lastName', 'email', 'role')
+DIRECTORY_PROJECTION = ', '.join(f"#f{i}" for i in range(len(DIRECTORY_FIELDS)))
+DIRECTORY_NAMES = {f"#f{i}": field for i, field in enumerate(DIRECTORY_FIELDS)}
+MAX_QUERY_LENGTH = 100
+
+def search_plan(params):
+    """(prefix, [(role, index name, sort key), ...] in the order the pages read them)."""
+    prefix = ' '.join((params.get('q') or '').split()).lower()[:MAX_QUERY_LENGTH]
+    by = params.get('by') or ('email' if '@' in prefix else 'name')
+    if by not in INDEXES:
+        raise ValueError(f"Invalid search field: {by}")
+    role = (params.get('role') or '').lower()
+    if role and role not in ROLES:
+        raise ValueError(f"Invalid role: {role}")
+    # Without a prefix the first index already lists everyone
+    indexes = INDEXES[by] if prefix else INDEXES[by][:1]
+    return prefix, [(r, index_name, sort_key) for r in ((role,) if role else ROLES) for index_name, sort_key in indexes]
+
+def start_position(cursor, sources):
+    """(source index, ExclusiveStartKey or None) where the page starts."""
+    key = decode_cursor(cursor)
+    if key is None:
+        return 0, None
+    for position, (role, index_name, sort_key) in enumerate(sources):
+        if key.get('directoryRole') != role:
+            continue
+        if set(key) == {'directoryRole', 'index'} and key['index'] == index_name:
+            # The previous page ended exactly at the end of an index
+            return position, None
+        if set(key) == {'directoryRole', 'userId', sort_key}:
+            return position, key
+    raise ValueError("Cursor does not belong to this query")
+
+def search(params):
+    """Return one page of directory entries and the cursor for the next page."""
+    prefix, sources = search_plan(params)
+    limit = page_size(params.get('limit'), DEFAULT_PAGE_SIZE)
+    first, start_key = start_position(params.get('cursor'), sources)
+
+    table = get_table(TABLE_NAME)
+    users = []
+    position = first
+    while position < len(sources):
+        role, index_name, sort_key = sources[position]
+        query = {
+            'IndexName': index_name,
+            'KeyConditionExpression': 'directoryRole = :role',
+            'ExpressionAttributeValues': {':role': role},
+            'ExpressionAttributeNames': DIRECTORY_NAMES,
+            'ProjectionExpression': DIRECTORY_PROJECTION,
+            'Limit': limit - len(users)
+        }
+        if prefix:
+            query['KeyConditionExpression'] += f" AND begins_with({sort_key}, :prefix)"
+            query['ExpressionAttributeValues'][':prefix'] = prefix
+        if sort_key == 'searchNameReversed':
+            query['FilterExpression'] = 'NOT begins_with(searchName, :prefix)'
+        if start_key:
+            query['ExclusiveStartKey'] = start_key
+
+        result = table.query(**query)
+        users.extend(result.get('Items', []))
+        start_key = result.get('LastEvaluatedKey')
+        if start_key and len(users) >= limit:
+            return users, encode_cursor(start_key)
+        if start_key:
+            # The filter dropped some of what was read; keep reading this index
+            continue
+        position += 1
+        if len(users) >= limit:
+            if position < len(sources):
+                next_role, next_index, _ = sources[position]
+                return users, encode_cursor({'directoryRole': next_role, 'index': next_index})
+            return users, None
+    return users, None
+
+def backfill(dry_run=False):
+    """Set the directory attributes on rows that are missing them or out of date."""
+    table = get_table(TABLE_NAME)
+    fields = ('userId', 'username', 'firstName', 'lastName', 'email', 'role', 'directoryRole', 'searchName',
+              'searchNameReversed', 'emailLower')
+    scan = {
+        'ProjectionExpression': ', '.join(f"#f{i}" for i in range(len(fields))),
+        'ExpressionAttributeNames': {f"#f{i}": field for i, field in enumerate(fields)}
+    }
+    counts = {'scanned': 0, 'updated': 0}
+    while True:
+        page = table.scan(**scan)
+        for item in page.get('Items', []):
+            counts['scanned'] += 1
+            attributes = directory_attributes(item)
+            if not attributes or all(item.get(name) == value for name, value in attributes.items()):
+                continue
+            counts['updated'] += 1
+            if dry_run:
+                continue
+            names = {f"#a{i}": name for i, name in enumerate(attributes)}
+            table.update_item(
+                Key={'userId': item['userId']},
+                UpdateExpression='SET ' + ', '.join(f"#a{i} = :a{i}" for i in range(len(attributes))),
+                ConditionExpression='attribute_exists(userId)',
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues={f":a{i}": value for i, value in enumerate(attributes.values())}
+            )
+        if not page.get('LastEvaluatedKey'):
+            return counts
+        scan['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+@instrumented_handler('DIRECTORY')
+def lambda_handler(event, context):
+    if request_method(event) == 'OPTIONS':
+        return respond(200, {})
+    try:
+        if not is_admin(event):
+            return respond(403, {"success": False, "message": "Admin access required"})
+        params = event.get('queryStringParameters') or {}
+        set_request_fields(action='search')
+        users, cursor = search(params)
+        log("Directory page", count=len(users), hasMore=cursor is not None)
+        return respond(200, {"success": True, "users": users, "cursor": cursor})
+
+    except ValueError as e:
+        return respond(400, {"success": False, "message": str(e)})
+
+    except Exception as e:
+        log("An unexpected error occurred", level='ERROR', error=str(e))
+        return respond(500, {
+            "success": False,
+            "message": "An internal error occurred. Please try again later."
+        })
+
+if __name__ == '__main__':
+    if '--backfill' in sys.argv:
+        print(json.dumps(backfill(dry_run='--dry-run' in sys.argv), indent=2))
@@ -0,0 +1,135 @@
+import os
+import uuid
+from datetime import datetime
+from common.clients import get_table
+from common.events import is_admin, request_method
+from common.pagination import encode_cursor, decode_cursor, page_size
+from common.instrumentation import instrumented_handler, set_request_fields, log
+from common.responses import responder, parse_body
+from common.warmup import prewarm_on_init, warmup_response
+
+# Environment variables
+TABLE_NAME = os.environ['GROUP_TABLE']
+DEFAULT_PAGE_SIZE = int(os.environ.get('GROUP_PAGE_SIZE', '6'))
+
+respond = responder("OPTIONS,GET,POST", "Content-Type,Authorization")
+
+# Course groups for the admin dashboard. GROUP_TABLE is keyed for one Query per page:
+#   partition key groupStatus: 'current' or 'previous'
+#   sort key      sortKey:     '<term>#<createdAt>#<groupId>', term as YYYY-MM of the term start
+# so a page is the newest groups of one status (optionally one term), newest first.
+#
+#   GET  ?status=current&limit=6&cursor=...&term=2024-08
+#   POST {"name": ..., "faculty": ..., "term": "2024-08", "status": "current", "members": 0}
+
+STATUSES = ('current', 'previous')
+
+# Only the fields a dashboard card renders
+CARD_PROJECTION = 'groupId, #name, members, faculty, lastActive'
+CARD_NAMES = {'#name': 'name'}
+
+WARMUP_TARGETS = {'tables': {TABLE_NAME: {'groupStatus': '__warmup__', 'sortKey': '__warmup__'}}}
+prewarm_on_init(**WARMUP_TARGETS)
+
+def list_groups(params):
+    """Return one page of cards and the cursor for the next page."""
+    status = params.get('status', 'current')
+    if status not in STATUSES:
+        raise ValueError(f"Invalid status: {status}")
+    limit = page_size(params.get('limit'), DEFAULT_PAGE_SIZE)
+
+    key_condition = 'groupStatus = :status'
+    values = {':status': status}
+    if params.get('term'):
+        key_condition += ' AND begins_with(sortKey, :term)'
+        values[':term'] = f"{params['term']}#"
+
+    query = {
+        'KeyConditionExpression': key_condition,
+        'ExpressionAttributeValues': values,
+        'ExpressionAttributeNames': CARD_NAMES,
+        'ProjectionExpression': CARD_PROJECTION,
+        'ScanIndexForward': False,
+        'Limit': limit
+    }
+    start_key = decode_cursor(params.get('cursor'), expected={'groupStatus': status})
+    if start_key:
+        query['ExclusiveStartKey'] = start_key
+
+    result = get_table(TABLE_NAME).query(**query)
+    return result.get('Items', []), encode_cursor(result.get('LastEvaluatedKey'))
+
+def member_count(value):
+    """members as a non-negative int; a string of digits is accepted too."""
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+        raise ValueError("members must be a whole number of at least 0")
+    return value
+
+def build_group_item(body):
+    """Build the GROUP_TABLE row for a new group."""
+    if not isinstance(body, dict):
+        raise ValueError("Request body must be a JSON object")
+    fields = {field: body.get(field) or '' for field in ('name', 'faculty', 'term')}
+    if not all(isinstance(value, str) and value.strip() for value in fields.values()):
+        raise ValueError("name, faculty and term are required")
+    name, faculty, term = (fields[field].strip() for field in ('name', 'faculty', 'term'))
+    status = body.get('status', 'current')
+    if status not in STATUSES:
+        raise ValueError(f"Invalid status: {status}")
+    members = member_count(body.get('members', 0))
+
+    group_id = str(uuid.uuid4())
+    now = datetime.utcnow().isoformat()
+    return {
+        'groupStatus': status,
+        'sortKey': f"{term}#{now}#{group_id}",
+        'groupId': group_id,
+        'name': name,
+        'faculty': faculty,
+        'term': term,
+        'members': members,
+        'lastActive': now,
+        'createdAt': now
+    }
+
+@instrumented_handler('GROUPS')
+def lambda_handler(event, context):
+    warm = warmup_response(event, **WARMUP_TARGETS)
+    if warm:
+        return warm
+    method = request_method(event)
+    if method == 'OPTIONS':
+        return respond(200, {})
+    try:
+        if not is_admin(event):
+            return respond(403, {"success": False, "message": "Admin access required"})
+
+        if method == 'GET':
+            params = event.get('queryStringParameters') or {}
+            set_request_fields(action='list', status=params.get('status', 'current'))
+            groups, next_cursor = list_groups(params)
+            return respond(200, {"success": True, "groups": groups, "nextCursor": next_cursor})
+
+        if method == 'POST':
+            set_request_fields(action='create')
+            if not event.get('body'):
+                raise ValueError("Request body must be a JSON object")
+            item = build_group_item(parse_body(event))
+            get_table(TABLE_NAME).put_item(Item=item)
+            log("Group created", groupId=item['groupId'])
+            card = {field: item[field] for field in ('groupId', 'name', 'members', 'faculty', 'lastActive')}
+            return respond(201, {"success": True, "group": card})
+
+        return respond(405, {"success": False, "message": f"Method not allowed: {method}"})
+
+    except ValueError as e:
+        return respond(400, {"success": False, "message": str(e)})
+
+    except Exception as e:
+        log("An unexpected error occurred", level='ERROR', error=str(e))
+        return respond(500, {
+            "success": False,
+            "message": "An internal error occurred. Please try again later."
+        })
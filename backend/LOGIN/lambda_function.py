@@ -1,101 +1,194 @@
-import boto3
 import os
 import json
-import hmac
-import hashlib
 import base64
-
-# Initialize AWS Cognito client
-cognito = boto3.client('cognito-idp')
+from common.abuse import RateLimited, check_request, record_attempt
+from common.cache import MISSING, get_user_exists, set_user_exists
+from common.clients import get_cognito, calculate_secret_hash
+from common.throttle import CognitoThrottled, cognito_call
+from common.profiling import profiled_handler
+from common.roles import role_from_claims
+from common.instrumentation import instrumented_handler, set_request_fields, log
+from common.responses import responder, parse_body
+from common.warmup import prewarm_on_init, warmup_response
 
 # Environment variables
 USER_POOL_ID = os.environ['USER_POOL_ID']
 CLIENT_ID = os.environ['COGNITO_CLIENT_ID']
-CLIENT_SECRET = os.environ['COGNITO_CLIENT_SECRET']
 
-def calculate_secret_hash(username):
-    """
-    Calculate the SECRET_HASH required for Cognito API calls, because client secret is enabled in our cognito.
-    """
-    message = username + CLIENT_ID
-    secret = bytes(CLIENT_SECRET, 'utf-8')
-    dig = hmac.new(secret, msg=message.encode('utf-8'), digestmod=hashlib.sha256).digest()
-    return base64.b64encode(dig).decode()
+respond = responder("OPTIONS,POST")
+
+# Connections opened on keep-warm pings (and at init when PREWARM_ON_INIT is set)
+WARMUP_TARGETS = {'cognito': True}
+prewarm_on_init(**WARMUP_TARGETS)
 
 def check_user_exists(email):
-    """Helper function to check if user exists in Cognito."""
+    """Helper function to check if user exists in Cognito, using the warm-container cache first."""
+    cached = get_user_exists(email)
+    if cached is not MISSING:
+        return cached
+    cognito = get_cognito()
     try:
-        cognito.admin_get_user(
+        cognito_call(
+            'admin_get_user',
             UserPoolId=USER_POOL_ID,
             Username=email
         )
-        return True
+        exists = True
     except cognito.exceptions.UserNotFoundException:
-        return False
+        exists = False
+    set_user_exists(email, exists)
+    return exists
+
+def login_response(tokens, remember, message):
+    """The 200 answer for a completed sign-in, from an AuthenticationResult."""
+    claims = get_id_token_claims(tokens.get('IdToken'))
+    return respond(200, {
+        "success": True,
+        "message": message,
+        "role": role_from_claims(claims),
+        "username": claims.get('cognito:username'),
+        "idToken": tokens.get('IdToken'),
+        "accessToken": tokens.get('AccessToken'),
+        "refreshToken": tokens.get('RefreshToken') if remember else None
+    })
+
+def get_id_token_claims(id_token):
+    """
+    Read the claims (cognito:groups, cognito:username, ...) from a Cognito IdToken.
+    The token comes straight from initiate_auth, so the payload is decoded without verifying the signature.
+    """
+    if not id_token:
+        return {}
+    try:
+        payload = id_token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload))
+    except (IndexError, ValueError):
+        return {}
 
+@instrumented_handler('LOGIN')
+@profiled_handler
 def lambda_handler(event, context):
+    warm = warmup_response(event, **WARMUP_TARGETS)
+    if warm:
+        return warm
+    cognito = get_cognito()
     try:
         # Parse the incoming JSON body
-        body = json.loads(event['body'])
-        email = body['email']
+        body = parse_body(event)
         action = body.get('action', 'login')
-        
-        print(f"Processing {action} request for email: {email}")
-        
-        # First check if user exists
-        user_exists = check_user_exists(email)
+        set_request_fields(action=action)
+
+        if action == 'refresh':
+            # Silent session refresh: a single initiate_auth call, no existence pre-check
+            refresh_token = body.get('refreshToken')
+            username = body.get('username')
+            if not refresh_token or not username:
+                return respond(400, {
+                    "success": False,
+                    "message": "Refresh token and username are required"
+                })
+
+            try:
+                # SECRET_HASH for refresh uses the Cognito username returned at login
+                auth_response = cognito_call(
+                    'initiate_auth',
+                    AuthFlow='REFRESH_TOKEN_AUTH',
+                    ClientId=CLIENT_ID,
+                    AuthParameters={
+                        'REFRESH_TOKEN': refresh_token,
+                        'SECRET_HASH': calculate_secret_hash(username)
+                    }
+                )
+            except cognito.exceptions.NotAuthorizedException:
+                log("Refresh token rejected", level='WARN')
+                return respond(401, {
+                    "success": False,
+                    "message": "Session expired. Please log in again."
+                })
+
+            tokens = auth_response.get('AuthenticationResult', {})
+            claims = get_id_token_claims(tokens.get('IdToken'))
+            return respond(200, {
+                "success": True,
+                "message": "Session refreshed",
+                "role": role_from_claims(claims),
+                "idToken": tokens.get('IdToken'),
+                "accessToken": tokens.get('AccessToken')
+            })
+
+        if action == 'new_password':
+            # Second step for accounts created by an admin (BULKPROVISION): the user signed in
+            # with the emailed temporary password and now chooses their own
+            username = body.get('username')
+            session = body.get('session')
+            new_password = body.get('newPassword')
+            if not username or not session or not new_password:
+                return respond(400, {
+                    "success": False,
+                    "message": "Username, session and new password are required"
+                })
+            set_request_fields(username=username)
+            try:
+                auth_response = cognito_call(
+                    'respond_to_auth_challenge',
+                    ClientId=CLIENT_ID,
+                    ChallengeName='NEW_PASSWORD_REQUIRED',
+                    Session=session,
+                    ChallengeResponses={
+                        'USERNAME': username,
+                        'NEW_PASSWORD': new_password,
+                        'SECRET_HASH': calculate_secret_hash(username)
+                    }
+                )
+            except cognito.exceptions.InvalidPasswordException as e:
+                # Cognito's message names the password policy rule that failed
+                return respond(400, {"success": False, "message": e.response['Error'].get('Message', "Password does not meet the requirements")})
+            except cognito.exceptions.NotAuthorizedException:
+                log("Password challenge rejected", level='WARN')
+                return respond(401, {
+                    "success": False,
+                    "message": "Session expired. Please log in again."
+                })
+            if 'AuthenticationResult' not in auth_response:
+                return respond(403, {"success": False, "message": "Additional sign-in steps are not supported"})
+            log("New password set")
+            return login_response(auth_response['AuthenticationResult'], body.get('remember', False), "Password updated")
+
+        email = body['email']
+        set_request_fields(email=email)
+        log("Processing request")
+
+        if action in ('check', 'login'):
+            # Shed credential stuffing and account enumeration before they reach Cognito
+            check_request(action, event, email)
         
         if action == 'check':
-            return {
-                "statusCode": 200 if user_exists else 404,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST"
-                },
-                "body": json.dumps({
-                    "success": user_exists,
-                    "message": "User exists" if user_exists else "User not found"
-                })
-            }
-            
-        elif action == 'login':
+            user_exists = check_user_exists(email)
             if not user_exists:
-                return {
-                    "statusCode": 404,
-                    "headers": {
-                        "Access-Control-Allow-Origin": "*",
-                        "Access-Control-Allow-Headers": "Content-Type",
-                        "Access-Control-Allow-Methods": "OPTIONS,POST"
-                    },
-                    "body": json.dumps({
-                        "success": False,
-                        "message": "User not found"
-                    })
-                }
+                record_attempt('check', event, email)
+            return respond(200 if user_exists else 404, {
+                "success": user_exists,
+                "message": "User exists" if user_exists else "User not found"
+            })
             
+        elif action == 'login':
+            # Go straight to initiate_auth; a missing user is reported by Cognito itself
             if 'password' not in body:
-                return {
-                    "statusCode": 400,
-                    "headers": {
-                        "Access-Control-Allow-Origin": "*",
-                        "Access-Control-Allow-Headers": "Content-Type",
-                        "Access-Control-Allow-Methods": "OPTIONS,POST"
-                    },
-                    "body": json.dumps({
-                        "success": False,
-                        "message": "Password is required"
-                    })
-                }
+                return respond(400, {
+                    "success": False,
+                    "message": "Password is required"
+                })
             
             try:
-                print(f"Attempting login for email: {email}")
+                log("Attempting login")
                 
                 # Calculate SECRET_HASH
                 secret_hash = calculate_secret_hash(email)
                 
                 # Authenticate the user with Cognito
-                auth_response = cognito.initiate_auth(
+                auth_response = cognito_call(
+                    'initiate_auth',
                     AuthFlow='USER_PASSWORD_AUTH',
                     ClientId=CLIENT_ID,
                     AuthParameters={
@@ -105,81 +198,71 @@ def lambda_handler(event, context):
                     }
                 )
                 
-                tokens = auth_response.get('AuthenticationResult', {})
-                print(f"Login successful for email: {email}")
-                
-                return {
-                    "statusCode": 200,
-                    "headers": {
-                        "Access-Control-Allow-Origin": "*",
-                        "Access-Control-Allow-Headers": "Content-Type",
-                        "Access-Control-Allow-Methods": "OPTIONS,POST"
-                    },
-                    "body": json.dumps({
-                        "success": True,
-                        "message": f"Login successful for {email}",
-                        "idToken": tokens.get('IdToken'),
-                        "accessToken": tokens.get('AccessToken'),
-                        "refreshToken": tokens.get('RefreshToken') if body.get('remember', False) else None
-                    })
-                }
-                
-            except cognito.exceptions.NotAuthorizedException as e:
-                print(f"Invalid credentials for email: {email}. Error: {str(e)}")
-                return {
-                    "statusCode": 401,
-                    "headers": {
-                        "Access-Control-Allow-Origin": "*",
-                        "Access-Control-Allow-Headers": "Content-Type",
-                        "Access-Control-Allow-Methods": "OPTIONS,POST"
-                    },
-                    "body": json.dumps({
+                set_user_exists(email, True)
+                challenge = auth_response.get('ChallengeName')
+                if challenge == 'NEW_PASSWORD_REQUIRED':
+                    # Admin-created accounts start in FORCE_CHANGE_PASSWORD; there are no tokens yet
+                    log("New password required")
+                    return respond(200, {
                         "success": False,
-                        "message": f"Incorrect password for email: {email}"
+                        "challenge": challenge,
+                        "message": "Please choose a new password",
+                        "username": auth_response.get('ChallengeParameters', {}).get('USER_ID_FOR_SRP'),
+                        "session": auth_response.get('Session')
                     })
-                }
-                
-            except cognito.exceptions.UserNotConfirmedException:
-                print(f"User not confirmed: {email}")
-                return {
-                    "statusCode": 403,
-                    "headers": {
-                        "Access-Control-Allow-Origin": "*",
-                        "Access-Control-Allow-Headers": "Content-Type",
-                        "Access-Control-Allow-Methods": "OPTIONS,POST"
-                    },
-                    "body": json.dumps({
+                if challenge or 'AuthenticationResult' not in auth_response:
+                    log("Unsupported sign-in challenge", level='WARN', challenge=challenge)
+                    return respond(403, {
                         "success": False,
-                        "message": f"User not confirmed: {email}"
+                        "message": "Additional sign-in steps are not supported. Please contact support."
                     })
-                }
 
-        else:
-            # Handle unknown actions
-            return {
-                "statusCode": 400,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST"
-                },
-                "body": json.dumps({
+                log("Login successful")
+                return login_response(auth_response['AuthenticationResult'], body.get('remember', False),
+                                      f"Login successful for {email}")
+                
+            except cognito.exceptions.UserNotFoundException:
+                log("User not found", level='WARN')
+                set_user_exists(email, False)
+                record_attempt('login', event, email)
+                return respond(404, {
                     "success": False,
-                    "message": "Invalid action specified"
+                    "message": "User not found"
                 })
-            }
 
-    except Exception as e:
-        print(f"Error processing request: {str(e)}")
-        return {
-            "statusCode": 500,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Access-Control-Allow-Methods": "OPTIONS,POST"
-            },
-            "body": json.dumps({
+            except cognito.exceptions.NotAuthorizedException as e:
+                log("Invalid credentials", level='WARN', error=str(e))
+                record_attempt('login', event, email)
+                return respond(401, {
+                    "success": False,
+                    "message": f"Incorrect password for email: {email}"
+                })
+                
+            except cognito.exceptions.UserNotConfirmedException:
+                log("User not confirmed", level='WARN')
+                return respond(403, {
+                    "success": False,
+                    "message": f"User not confirmed: {email}"
+                })
+
+        else:
+            # Handle unknown actions
+            return respond(400, {
                 "success": False,
-                "message": "Internal server error"
+                "message": "Invalid action specified"
             })
-        }
+
+    except RateLimited as e:
+        log("Rejecting request, too many attempts", level='WARN', scope=e.scope, dimension=e.dimension)
+        return respond(429, {"success": False, "message": "Too many attempts. Please try again later."}, headers={"Retry-After": str(e.retry_after)})
+
+    except CognitoThrottled as e:
+        log("Rejecting request, Cognito budget exhausted", level='WARN', error=str(e))
+        return respond(429, {"success": False, "message": "Too many requests. Please try again shortly."}, headers={"Retry-After": str(e.retry_after)})
+
+    except Exception as e:
+        log("Error processing request", level='ERROR', error=str(e))
+        return respond(500, {
+            "success": False,
+            "message": "Internal server error"
+        })
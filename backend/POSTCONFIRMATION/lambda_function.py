@@ -0,0 +1,71 @@
+import os
+import sys
+import json
+from common.signup import complete_signup, get_user_attributes
+from common.instrumentation import instrumented_handler, set_request_fields
+
+# Environment variables
+TABLE_NAME = os.environ['USER_TABLE']
+
+# Cognito Post Confirmation trigger. Cognito invokes it synchronously inside
+# confirm_sign_up, so the group add and the profile writes below are still part of the
+# CREATEUSER confirm latency; moving them here only takes the admin_get_user lookup and
+# the extra lambda-to-AWS round trips out of that handler. Keep this path short.
+# The work itself is common.signup.complete_signup, which CREATEUSER also runs when a
+# retried confirm finds the account confirmed but this trigger failed.
+
+@instrumented_handler('POSTCONFIRMATION')
+def lambda_handler(event, context):
+    # Password-reset confirmations also fire this trigger; only new signups need a profile
+    if event.get('triggerSource') != 'PostConfirmation_ConfirmSignUp':
+        return event
+
+    user_pool_id = event['userPoolId']
+    username = event['userName']
+    set_request_fields(action=event['triggerSource'], username=username)
+    user_attributes = event.get('request', {}).get('userAttributes') or {}
+
+    # Cognito normally passes every attribute; fall back to a lookup if the role is missing
+    if 'custom:userRole' not in user_attributes:
+        user_attributes = get_user_attributes(user_pool_id, username)
+        if not user_attributes:
+            raise Exception(f"Failed to fetch user details for {username}")
+
+    complete_signup(user_pool_id, username, user_attributes)
+
+    # Cognito expects the trigger event back
+    return event
+
+def install_fakes(events):
+    """
+    Point the layer at the benchmark's in-memory Cognito and DynamoDB, with the users
+    from the given trigger events already signed up. Returns the fake backend.
+    """
+    from common.clients import install_clients
+    from common.email_index import EMAIL_INDEX_TABLE_NAME
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'BENCHMARK'))
+    from fake_aws import FakeBackend
+
+    backend = FakeBackend()
+    backend.dynamodb.create_table(TABLE_NAME, ['userId'])
+    backend.dynamodb.create_table(EMAIL_INDEX_TABLE_NAME, ['email'])
+    for event in events:
+        backend.cognito.add_user(event['userName'], None, event.get('request', {}).get('userAttributes') or {})
+    install_clients(cognito=backend.cognito, dynamodb=backend.dynamodb)
+    return backend
+
+if __name__ == '__main__':
+    # Replay recorded trigger events locally (PYTHONPATH=../COMMON/python, USER_TABLE and EMAIL_INDEX_TABLE set):
+    #   python lambda_function.py events/confirm_signup.json          against the account in the AWS environment
+    #   python lambda_function.py --fake events/confirm_signup.json   against the benchmark fakes, then print what was written
+    events = []
+    for path in [arg for arg in sys.argv[1:] if arg != '--fake']:
+        with open(path) as f:
+            events.append(json.load(f))
+    backend = install_fakes(events) if '--fake' in sys.argv else None
+    for event in events:
+        print(json.dumps(lambda_handler(event, None), indent=2))
+    if backend is not None:
+        written = {name: list(table.items.values()) for name, table in backend.dynamodb.tables.items()}
+        written['groups'] = {group: sorted(members) for group, members in backend.cognito.groups.items()}
+        print(json.dumps(written, indent=2, default=str))
@@ -0,0 +1,189 @@
+import os
+import hashlib
+from datetime import datetime
+from common.clients import get_dynamodb, get_table
+from common.events import caller, request_method
+from common.profiles import reversed_search_name, search_name, user_id_for
+from common.instrumentation import instrumented_handler, set_request_fields, log
+from common.responses import responder, parse_body
+
+# Environment variables
+TABLE_NAME = os.environ['USER_TABLE']
+
+respond = responder("OPTIONS,GET,PATCH", "Content-Type,Authorization,If-Match,If-None-Match")
+
+# The signed-in user's USER_TABLE row. The user comes from the authorizer context,
+# never from the request.
+#
+#   GET   ?fields=firstName,lastName,avatar   only those attributes (ProjectionExpression)
+#         If-None-Match: <etag>              304 with no body when unchanged
+#   PATCH {"withWhom": ..., ...}              If-Match: <etag> required; 412 if the row changed since
+#
+# The ETag is "<version>:<field digest>". version is bumped by every write to the row,
+# and the digest makes each field selection its own representation. If-Match only
+# compares the version, so a page can edit with the ETag from a narrower GET.
+#
+# Rows are keyed on user_id_for(username); rows written before that are re-keyed once by
+# backend/CREATEUSER/migrate_user_ids.py.
+
+READABLE_FIELDS = ('username', 'email', 'firstName', 'lastName', 'phone', 'role', 'avatar',
+                   'withWhom', 'currentPlace', 'comments', 'createdAt', 'updatedAt')
+EDITABLE_FIELDS = ('firstName', 'lastName', 'phone', 'withWhom', 'currentPlace', 'comments')
+DEFAULT_FIELDS = ('firstName', 'lastName', 'email', 'phone', 'role', 'avatar', 'withWhom', 'currentPlace', 'comments')
+MAX_FIELD_LENGTH = 1000
+
+class PreconditionFailed(Exception):
+    pass
+
+def header(event, name):
+    """Case-insensitive request header lookup."""
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+def requested_fields(params):
+    if not params.get('fields'):
+        return DEFAULT_FIELDS
+    fields = tuple(sorted({field.strip() for field in params['fields'].split(',') if field.strip()}))
+    unknown = [field for field in fields if field not in READABLE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+def item_version(item):
+    # Rows written before versioning fall back to their updatedAt
+    return str(item['version']) if 'version' in item else item.get('updatedAt', '0')
+
+def make_etag(version, fields):
+    digest = hashlib.sha256(','.join(sorted(fields)).encode('utf-8')).hexdigest()[:8]
+    return f'"{version}:{digest}"'
+
+def etag_version(etag):
+    """Version part of an If-Match value; weak validators and '*' are not accepted."""
+    etag = (etag or '').strip()
+    if not etag.startswith('"') or ':' not in etag:
+        raise PreconditionFailed("If-Match must be an ETag from a profile GET")
+    # The digest never contains ':', an updatedAt fallback version does
+    return etag.strip('"').rsplit(':', 1)[0]
+
+def projection(fields):
+    """ProjectionExpression with every name aliased, since several (e.g. role) are reserved words."""
+    # Listed once each: DynamoDB rejects overlapping paths, and updatedAt is also a readable field
+    names = {f"#f{i}": field for i, field in enumerate(dict.fromkeys(fields + ('version', 'updatedAt')))}
+    return ', '.join(names), names
+
+def representation(item, fields):
+    return {field: item.get(field) for field in fields}
+
+def get_profile(user_id, fields, if_none_match):
+    expression, names = projection(fields)
+    item = get_table(TABLE_NAME).get_item(
+        Key={'userId': user_id},
+        ProjectionExpression=expression,
+        ExpressionAttributeNames=names
+    ).get('Item')
+    if item is None:
+        return respond(404, {"success": False, "message": "Profile not found"})
+    etag = make_etag(item_version(item), fields)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Access-Control-Expose-Headers": "ETag"}
+    if if_none_match and etag in [value.strip() for value in if_none_match.split(',')]:
+        return respond(304, None, headers=headers)
+    return respond(200, {"success": True, "profile": representation(item, fields)}, headers=headers)
+
+def update_profile(username, changes, if_match):
+    """Apply changes only if the row is still at the version the client read."""
+    if not isinstance(changes, dict):
+        raise ValueError("Request body must be a JSON object")
+    unknown = [field for field in changes if field not in EDITABLE_FIELDS]
+    if unknown:
+        raise ValueError(f"Fields can't be edited: {', '.join(unknown)}")
+    if not changes:
+        raise ValueError("No fields to update")
+    changes = {field: str(value or '')[:MAX_FIELD_LENGTH] for field, value in changes.items()}
+    if ('firstName' in changes) != ('lastName' in changes):
+        # Both are needed to keep the directory's search names in step without a read
+        raise ValueError("firstName and lastName must be updated together")
+    expected = etag_version(if_match)
+
+    names = {'#updatedAt': 'updatedAt', '#version': 'version'}
+    values = {':now': datetime.utcnow().isoformat(), ':one': 1, ':expected': expected}
+    assignments = ['#updatedAt = :now']
+    removals = []
+    for i, (field, value) in enumerate(sorted(changes.items())):
+        names[f"#f{i}"] = field
+        values[f":v{i}"] = value
+        assignments.append(f"#f{i} = :v{i}")
+    if 'firstName' in changes:
+        names['#searchName'] = 'searchName'
+        values[':searchName'] = search_name(changes['firstName'], changes['lastName'], username)
+        assignments.append('#searchName = :searchName')
+        names['#searchNameReversed'] = 'searchNameReversed'
+        reversed_name = reversed_search_name(changes['firstName'], changes['lastName'])
+        if reversed_name:
+            values[':searchNameReversed'] = reversed_name
+            assignments.append('#searchNameReversed = :searchNameReversed')
+        else:
+            # Out of the "last first" index until both names are set again
+            removals.append('#searchNameReversed')
+
+    if expected.isdigit():
+        values[':expected'] = int(expected)
+        condition = '#version = :expected'
+    else:
+        condition = 'attribute_not_exists(#version) AND #updatedAt = :expected'
+
+    try:
+        result = get_table(TABLE_NAME).update_item(
+            Key={'userId': user_id_for(username)},
+            UpdateExpression=f"SET {', '.join(assignments)} ADD #version :one"
+                             + (f" REMOVE {', '.join(removals)}" if removals else ''),
+            ConditionExpression=f"attribute_exists(userId) AND {condition}",
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+            ReturnValues='ALL_NEW'
+        )
+    except get_dynamodb().meta.client.exceptions.ConditionalCheckFailedException:
+        raise PreconditionFailed("The profile was changed by another request. Reload and try again.")
+    item = result['Attributes']
+    etag = make_etag(item_version(item), DEFAULT_FIELDS)
+    return respond(200, {"success": True, "profile": representation(item, DEFAULT_FIELDS)},
+                   headers={"ETag": etag, "Access-Control-Expose-Headers": "ETag"})
+
+@instrumented_handler('PROFILE')
+def lambda_handler(event, context):
+    method = request_method(event)
+    if method == 'OPTIONS':
+        return respond(200, {})
+    try:
+        username, _ = caller(event)
+        if not username:
+            return respond(401, {"success": False, "message": "Unauthorized"})
+        set_request_fields(action=method.lower())
+
+        if method == 'GET':
+            fields = requested_fields(event.get('queryStringParameters') or {})
+            return get_profile(user_id_for(username), fields, header(event, 'If-None-Match'))
+
+        if method == 'PATCH':
+            if_match = header(event, 'If-Match')
+            if not if_match:
+                return respond(428, {"success": False, "message": "If-Match header required"})
+            if not event.get('body'):
+                raise ValueError("Request body must be a JSON object")
+            return update_profile(username, parse_body(event), if_match)
+
+        return respond(405, {"success": False, "message": f"Method not allowed: {method}"})
+
+    except PreconditionFailed as e:
+        return respond(412, {"success": False, "message": str(e)})
+
+    except ValueError as e:
+        return respond(400, {"success": False, "message": str(e)})
+
+    except Exception as e:
+        log("An unexpected error occurred", level='ERROR', error=str(e))
+        return respond(500, {
+            "success": False,
+            "message": "An internal error occurred. Please try again later."
+        })
@@ -1,155 +1,126 @@
-import boto3
 import os
-import json
-import hmac
-import hashlib
-import base64
-
-# Initialize AWS Cognito client
-cognito = boto3.client('cognito-idp')
+from common.abuse import RateLimited, check_request, record_attempt
+from common.cache import MISSING, get_user_exists, set_user_exists, invalidate_user
+from common.clients import get_cognito, calculate_secret_hash
+from common.throttle import CognitoThrottled, cognito_call
+from common.profiling import profiled_handler
+from common.instrumentation import instrumented_handler, set_request_fields, log
+from common.responses import responder, parse_body
+from common.warmup import prewarm_on_init, warmup_response
 
 # Environment variables
 COGNITO_CLIENT_ID = os.environ['COGNITO_CLIENT_ID']
-COGNITO_CLIENT_SECRET = os.environ.get('COGNITO_CLIENT_SECRET')  # Optional, if using client secret
 USER_POOL_ID = os.environ['USER_POOL_ID']  # Required for admin_get_user
+# COGNITO_CLIENT_SECRET is optional and read by calculate_secret_hash if the client has a secret
 
-def calculate_secret_hash(username):
-    """
-    Calculate the SECRET_HASH required for Cognito API calls when client secret is enabled.
-    """
-    if not COGNITO_CLIENT_SECRET:
-        return None  # If no client secret, skip SECRET_HASH
-    message = username + COGNITO_CLIENT_ID
-    secret = bytes(COGNITO_CLIENT_SECRET, 'utf-8')
-    dig = hmac.new(secret, msg=message.encode('utf-8'), digestmod=hashlib.sha256).digest()
-    return base64.b64encode(dig).decode()
+respond = responder("OPTIONS,POST")
+
+# Connections opened on keep-warm pings (and at init when PREWARM_ON_INIT is set)
+WARMUP_TARGETS = {'cognito': True}
+prewarm_on_init(**WARMUP_TARGETS)
 
 def check_user_exists(email):
     """
     Check if a user exists in Cognito using admin_get_user.
+    Results are cached per warm container so reset retries don't repeat the lookup.
     """
+    cached = get_user_exists(email)
+    if cached is not MISSING:
+        return cached
+    cognito = get_cognito()
     try:
-        cognito.admin_get_user(
+        cognito_call(
+            'admin_get_user',
             UserPoolId=USER_POOL_ID,
             Username=email
         )
-        return True
+        exists = True
     except cognito.exceptions.UserNotFoundException:
-        return False
+        exists = False
+    set_user_exists(email, exists)
+    return exists
 
+@instrumented_handler('RESETPASSWORD')
+@profiled_handler
 def lambda_handler(event, context):
+    warm = warmup_response(event, **WARMUP_TARGETS)
+    if warm:
+        return warm
+    cognito = get_cognito()
     try:
         # Parse request body
-        body = json.loads(event['body'])
+        body = parse_body(event)
         email = body['email']
         action = body.get('action', 'initiate')  # Default action is 'initiate'
 
-        print(f"Processing {action} request for email: {email}")
+        set_request_fields(action=action, email=email)
+        log("Processing request")
+
+        if action == 'initiate':
+            # Each initiate sends an email (or probes for one), so every one counts;
+            # shed reset spam before it reaches Cognito
+            check_request('reset', event, email)
+            record_attempt('reset', event, email)
 
         # Check if user exists in Cognito
         if not check_user_exists(email):
-            print(f"User not found: {email}")
-            return {
-                "statusCode": 404,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST"
-                },
-                "body": json.dumps({"success": False, "message": f"User not found: {email}"})
-            }
+            log("User not found", level='WARN')
+            return respond(404, {"success": False, "message": f"User not found: {email}"})
 
         # Calculate SECRET_HASH if client secret is enabled
         secret_hash = calculate_secret_hash(email)
 
         if action == 'initiate':
             # Step 1: Initiate password reset (send verification code)
-            cognito.forgot_password(
+            cognito_call(
+                'forgot_password',
                 ClientId=COGNITO_CLIENT_ID,
                 Username=email,
                 SecretHash=secret_hash  # Include SECRET_HASH here if applicable
             )
-            return {
-                "statusCode": 200,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST"
-                },
-                "body": json.dumps({"success": True, "message": "Password reset initiated. Please check your email."})
-            }
+            return respond(200, {"success": True, "message": "Password reset initiated. Please check your email."})
 
         elif action == 'confirm':
             # Step 2: Confirm password reset (set new password)
             verification_code = body['verificationCode']
             new_password = body['newPassword']
 
-            cognito.confirm_forgot_password(
+            cognito_call(
+                'confirm_forgot_password',
                 ClientId=COGNITO_CLIENT_ID,
                 Username=email,
                 ConfirmationCode=verification_code,
                 Password=new_password,
                 SecretHash=secret_hash  # Include SECRET_HASH here if applicable
             )
-            return {
-                "statusCode": 200,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST"
-                },
-                "body": json.dumps({"success": True, "message": "Password reset successful."})
-            }
+            invalidate_user(email)
+            return respond(200, {"success": True, "message": "Password reset successful."})
 
         else:
-            return {
-                "statusCode": 400,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Content-Type",
-                    "Access-Control-Allow-Methods": "OPTIONS,POST"
-                },
-                "body": json.dumps({"success": False, "message": f"Invalid action: {action}"})
-            }
+            return respond(400, {"success": False, "message": f"Invalid action: {action}"})
 
     except cognito.exceptions.CodeMismatchException as e:
-        print(f"Invalid verification code for email: {email}. Error: {str(e)}")
-        return {
-            "statusCode": 400,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Access-Control-Allow-Methods": "OPTIONS,POST"
-            },
-            "body": json.dumps({"success": False, "message": f"Invalid verification code: {str(e)}"})
-        }
+        log("Invalid verification code", level='WARN', error=str(e))
+        return respond(400, {"success": False, "message": f"Invalid verification code: {str(e)}"})
 
     except cognito.exceptions.InvalidParameterException as e:
-        print(f"Invalid parameter for email: {email}. Error: {str(e)}")
-        return {
-            "statusCode": 400,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Access-Control-Allow-Methods": "OPTIONS,POST"
-            },
-            "body": json.dumps({
-                "success": False,
-                "message": "Invalid parameters provided."
-            })
-        }
+        log("Invalid parameter", level='WARN', error=str(e))
+        return respond(400, {
+            "success": False,
+            "message": "Invalid parameters provided."
+        })
+
+    except RateLimited as e:
+        log("Rejecting request, too many attempts", level='WARN', scope=e.scope, dimension=e.dimension)
+        return respond(429, {"success": False, "message": "Too many attempts. Please try again later."}, headers={"Retry-After": str(e.retry_after)})
+
+    except CognitoThrottled as e:
+        log("Rejecting request, Cognito budget exhausted", level='WARN', error=str(e))
+        return respond(429, {"success": False, "message": "Too many requests. Please try again shortly."}, headers={"Retry-After": str(e.retry_after)})
 
     except Exception as e:
-        print(f"An unexpected error occurred: {str(e)}")
-        return {
-            "statusCode": 500,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type",
-                "Access-Control-Allow-Methods": "OPTIONS,POST"
-            },
-            "body": json.dumps({
-                "success": False,
-                "message": "An internal error occurred. Please try again later."
-            })
-        }
+        log("An unexpected error occurred", level='ERROR', error=str(e))
+        return respond(500, {
+            "success": False,
+            "message": "An internal error occurred. Please try again later."
+        })
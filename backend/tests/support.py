@@ -0,0 +1,29 @@
+import os
+import sys
+import importlib.util
+
+# Shared setup for the handler tests:
+#
+#   python -m unittest discover -s backend/tests
+#   python -m pytest backend/tests
+#
+# Handlers read their configuration from the environment at import time, so each test
+# module sets what it needs and then imports its handler with load_handler(). AWS calls
+# go to the benchmark's in-memory fakes (backend/BENCHMARK/fake_aws.py).
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(TESTS_DIR)
+sys.path[:0] = [os.path.join(BACKEND_DIR, 'COMMON', 'python'), os.path.join(BACKEND_DIR, 'BENCHMARK')]
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('METRICS_ENABLED', 'false')
+os.environ.setdefault('LOG_SAMPLE_RATE', '0')
+
+def load_handler(directory, **environment):
+    """Import backend/<directory>/lambda_function.py with the given environment variables set."""
+    os.environ.update(environment)
+    path = os.path.join(BACKEND_DIR, directory, 'lambda_function.py')
+    spec = importlib.util.spec_from_file_location(f"{directory.lower()}_handler", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
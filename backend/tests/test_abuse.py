@@ -0,0 +1,163 @@
+import json
+import unittest
+from unittest import mock
+
+from support import load_handler
+import fake_aws
+from common import abuse, cache, clients
+
+START = 1_699_999_900.0  # 100 s into a 300 s window
+
+login = load_handler('LOGIN', USER_POOL_ID='us-east-1_tests', COGNITO_CLIENT_ID='tests-client')
+
+def event_from(ip):
+    return {'requestContext': {'identity': {'sourceIp': ip}}}
+
+class AbuseLimiterTests(unittest.TestCase):
+
+    def setUp(self):
+        abuse.local_counters.clear()
+        self.now = START
+        patcher = mock.patch.object(abuse.time, 'time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.backend = fake_aws.FakeBackend()
+        self.counters = self.backend.dynamodb.create_table('AbuseCounters', ['limiterKey'])
+        clients.install_clients(dynamodb=self.backend.dynamodb)
+        patcher = mock.patch.object(abuse, 'ABUSE_TABLE_NAME', 'AbuseCounters')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assertLimited(self, scope, event, email, dimension):
+        with self.assertRaises(abuse.RateLimited) as raised:
+            abuse.check_request(scope, event, email)
+        self.assertEqual(raised.exception.dimension, dimension)
+        return raised.exception.retry_after
+
+    def test_successful_requests_are_never_counted(self):
+        for _ in range(500):
+            abuse.check_request('login', event_from('10.0.0.1'), 'jane@example.edu')
+        self.assertEqual(self.backend.counts, {})
+
+    def test_email_is_locked_out_at_its_limit(self):
+        limit, _ = abuse.limit_for('login', 'email')
+        for n in range(limit):
+            abuse.check_request('login', event_from(f"10.0.0.{n}"), 'jane@example.edu')
+            abuse.record_attempt('login', event_from(f"10.0.0.{n}"), 'jane@example.edu')
+        retry_after = self.assertLimited('login', event_from('10.9.9.9'), 'jane@example.edu', 'email')
+        self.assertEqual(retry_after, abuse.lockout_for('login'))
+
+        # Still locked after the window has slid past every failure
+        self.now += 600
+        self.assertLimited('login', event_from('10.9.9.9'), 'jane@example.edu', 'email')
+        self.now = START + abuse.lockout_for('login') + 2
+        abuse.check_request('login', event_from('10.9.9.9'), 'jane@example.edu')
+
+    def test_ip_is_throttled_not_locked_out(self):
+        limit, window = abuse.limit_for('check', 'ip')
+        for n in range(limit):
+            abuse.record_attempt('check', event_from('192.0.2.7'), f"user{n}@example.edu")
+        retry_after = self.assertLimited('check', event_from('192.0.2.7'), 'someone@example.edu', 'ip')
+        self.assertLessEqual(retry_after, 2 * window)
+        self.assertGreater(retry_after, 0)
+        # Other addresses are unaffected
+        abuse.check_request('check', event_from('192.0.2.8'), 'someone@example.edu')
+
+        # As soon as the sliding window drops under the limit the address gets through again,
+        # well before a lockout would have ended
+        self.now += retry_after
+        abuse.check_request('check', event_from('192.0.2.7'), 'someone@example.edu')
+        self.assertLess(retry_after, abuse.lockout_for('check'))
+
+    def test_shared_tier_is_only_used_near_the_limit(self):
+        limit, _ = abuse.limit_for('login', 'email')
+        near = int(limit * abuse.ABUSE_SHARED_FRACTION)
+        for _ in range(near - 1):
+            abuse.record_attempt('login', {}, 'jane@example.edu')
+        self.assertEqual(self.backend.counts, {})
+
+        abuse.record_attempt('login', {}, 'jane@example.edu')
+        self.assertEqual(self.backend.counts, {'update_item': 1})
+        item, = self.counters.items.values()
+        # The failures counted locally so far arrive with the first shared update
+        self.assertEqual(item['hits'], near)
+
+    def test_lockout_from_another_container_is_picked_up(self):
+        limit, _ = abuse.limit_for('login', 'email')
+        for _ in range(limit):
+            abuse.record_attempt('login', {}, 'jane@example.edu')
+        # A fresh container knows nothing locally, until it nears the limit and asks the table
+        abuse.local_counters.clear()
+        abuse.check_request('login', {}, 'jane@example.edu')
+        for _ in range(int(limit * abuse.ABUSE_SHARED_FRACTION)):
+            abuse.record_attempt('login', {}, 'jane@example.edu')
+        self.assertLimited('login', {}, 'jane@example.edu', 'email')
+
+    def test_synced_key_honours_a_lockout_stored_by_another_container(self):
+        limit, _ = abuse.limit_for('login', 'email')
+        for _ in range(int(limit * abuse.ABUSE_SHARED_FRACTION)):
+            abuse.record_attempt('login', {}, 'jane@example.edu')
+        abuse.check_request('login', {}, 'jane@example.edu')
+
+        # Another container reaches the limit and stores the lockout
+        item, = self.counters.items.values()
+        item['lockedUntil'] = int(self.now) + 600
+        retry_after = self.assertLimited('login', {}, 'jane@example.edu', 'email')
+        self.assertEqual(retry_after, 600)
+        # Enforced from memory from then on
+        self.backend.reset_counts()
+        self.assertLimited('login', {}, 'jane@example.edu', 'email')
+        self.assertEqual(self.backend.counts, {})
+
+    def test_unsynced_key_is_checked_from_memory_only(self):
+        abuse.record_attempt('login', {}, 'jane@example.edu')
+        abuse.check_request('login', {}, 'jane@example.edu')
+        self.assertEqual(self.backend.counts, {})
+
+    def test_counters_unavailable_fall_back_to_memory(self):
+        self.backend.error_rate = 1.0
+        limit, _ = abuse.limit_for('login', 'email')
+        for _ in range(limit):
+            abuse.record_attempt('login', {}, 'jane@example.edu')
+        self.assertLimited('login', {}, 'jane@example.edu', 'email')
+
+class LoginLimiterTests(unittest.TestCase):
+
+    def setUp(self):
+        abuse.local_counters.clear()
+        cache.user_exists_cache.clear()
+        self.backend = fake_aws.FakeBackend()
+        self.backend.cognito.seed_users(1)
+        clients.install_clients(cognito=self.backend.cognito, dynamodb=self.backend.dynamodb)
+        patcher = mock.patch.object(abuse, 'ABUSE_TABLE_NAME', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, body, ip='198.51.100.4'):
+        event = {'httpMethod': 'POST', 'body': json.dumps(body), 'requestContext': {'identity': {'sourceIp': ip}}}
+        return login.lambda_handler(event, None)['statusCode']
+
+    def test_successful_logins_do_not_count(self):
+        for _ in range(3 * abuse.limit_for('login', 'email')[0]):
+            self.assertEqual(self.post({'action': 'login', 'email': 'student0@example.edu', 'password': 'Password1!'}), 200)
+
+    def test_wrong_passwords_lock_the_email(self):
+        limit, _ = abuse.limit_for('login', 'email')
+        for _ in range(limit):
+            self.assertEqual(self.post({'action': 'login', 'email': 'student0@example.edu', 'password': 'guess'}), 401)
+        calls = dict(self.backend.counts)
+        # Locked out even with the right password, from anywhere, without reaching Cognito
+        self.assertEqual(self.post({'action': 'login', 'email': 'student0@example.edu', 'password': 'Password1!'}, ip='203.0.113.1'), 429)
+        self.assertEqual(self.backend.counts, calls)
+
+    def test_checks_for_existing_accounts_do_not_count(self):
+        for _ in range(2 * abuse.limit_for('check', 'ip')[0]):
+            self.assertEqual(self.post({'action': 'check', 'email': 'student0@example.edu'}), 200)
+        limit, _ = abuse.limit_for('check', 'ip')
+        for n in range(limit):
+            self.assertEqual(self.post({'action': 'check', 'email': f"nobody{n}@example.edu"}), 404)
+        self.assertEqual(self.post({'action': 'check', 'email': 'student0@example.edu'}), 429)
+
+if __name__ == '__main__':
+    unittest.main()
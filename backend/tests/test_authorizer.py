@@ -0,0 +1,196 @@
+import io
+import os
+import json
+import time
+import base64
+import hashlib
+import secrets
+import tempfile
+import unittest
+import urllib.error
+from unittest import mock
+
+from support import load_handler
+
+USER_POOL_ID = 'us-east-1_tests'
+CLIENT_ID = 'tests-client'
+ISSUER = f"https://cognito-idp.us-east-1.amazonaws.com/{USER_POOL_ID}"
+JWKS_CACHE_PATH = f"{tempfile.gettempdir()}/jwks-authorizer-tests-{secrets.token_hex(4)}.json"
+
+authorizer = load_handler('AUTHORIZER', USER_POOL_ID=USER_POOL_ID, COGNITO_CLIENT_ID=CLIENT_ID, JWKS_CACHE_PATH=JWKS_CACHE_PATH)
+
+def b64url(data):
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+def int_to_b64url(value):
+    return b64url(value.to_bytes((value.bit_length() + 7) // 8, 'big'))
+
+def is_probable_prime(n, rounds=40):
+    if n < 2:
+        return False
+    for p in (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37):
+        if n % p == 0:
+            return n == p
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d, s = d // 2, s + 1
+    for _ in range(rounds):
+        x = pow(secrets.randbelow(n - 3) + 2, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(s - 1):
+            x = pow(x, 2, n)
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+def random_prime(bits):
+    while True:
+        candidate = secrets.randbits(bits) | (1 << bits - 1) | (1 << bits - 2) | 1
+        if is_probable_prime(candidate):
+            return candidate
+
+class RsaKey:
+    """A locally generated RSA keypair that signs RS256 JWTs the way Cognito does."""
+
+    def __init__(self, kid, bits=2048):
+        self.kid = kid
+        self.e = 65537
+        while True:
+            p, q = random_prime(bits // 2), random_prime(bits // 2)
+            phi = (p - 1) * (q - 1)
+            if p != q and phi % self.e:
+                break
+        self.n = p * q
+        self.d = pow(self.e, -1, phi)
+
+    def jwk(self):
+        return {'kty': 'RSA', 'alg': 'RS256', 'use': 'sig', 'kid': self.kid, 'n': int_to_b64url(self.n), 'e': int_to_b64url(self.e)}
+
+    def sign(self, claims, header=None):
+        header = header or {'alg': 'RS256', 'kid': self.kid}
+        signing_input = f"{b64url(json.dumps(header).encode())}.{b64url(json.dumps(claims).encode())}"
+        size = (self.n.bit_length() + 7) // 8
+        digest_info = authorizer.SHA256_DIGEST_INFO + hashlib.sha256(signing_input.encode('ascii')).digest()
+        encoded = b'\x00\x01' + b'\xff' * (size - len(digest_info) - 3) + b'\x00' + digest_info
+        signature = pow(int.from_bytes(encoded, 'big'), self.d, self.n).to_bytes(size, 'big')
+        return f"{signing_input}.{b64url(signature)}"
+
+def id_claims(**overrides):
+    claims = {
+        'sub': 'a1b2c3', 'iss': ISSUER, 'aud': CLIENT_ID, 'token_use': 'id', 'exp': int(time.time()) + 3600,
+        'cognito:username': 'jane.doe', 'email': 'jane.doe@example.edu', 'cognito:groups': ['student'],
+        'custom:userRole': 'admin'
+    }
+    claims.update(overrides)
+    return claims
+
+METHOD_ARN = 'arn:aws:execute-api:us-east-1:123456789012:abcdef123/test/GET/profile'
+
+class AuthorizerTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.key = RsaKey('key-1')
+
+    def setUp(self):
+        with open(JWKS_CACHE_PATH, 'w') as f:
+            json.dump({'fetchedAt': time.time(), 'jwks': {'keys': [self.key.jwk()]}}, f)
+        authorizer._signing_keys = {}
+        authorizer._jwks_fetched_at = 0.0
+        authorizer.decision_cache.clear()
+        # Nothing in these tests may reach the network unless a test says so
+        patcher = mock.patch.object(authorizer.urllib.request, 'urlopen', side_effect=AssertionError("network call"))
+        self.urlopen = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assertRejected(self, token, reason):
+        with self.assertRaises(authorizer.Unauthorized) as raised:
+            authorizer.verify_token(token)
+        self.assertEqual(str(raised.exception), reason)
+
+    def test_valid_id_token(self):
+        claims = authorizer.verify_token(self.key.sign(id_claims()))
+        self.assertEqual(claims['cognito:username'], 'jane.doe')
+
+    def test_valid_access_token(self):
+        claims = id_claims(token_use='access', client_id=CLIENT_ID, username='jane.doe')
+        del claims['aud']
+        self.assertEqual(authorizer.verify_token(self.key.sign(claims))['username'], 'jane.doe')
+
+    def test_policy_role_comes_from_groups(self):
+        policy = authorizer.lambda_handler({'authorizationToken': f"Bearer {self.key.sign(id_claims())}", 'methodArn': METHOD_ARN}, None)
+        self.assertEqual(policy['policyDocument']['Statement'][0]['Effect'], 'Allow')
+        self.assertEqual(policy['policyDocument']['Statement'][0]['Resource'], 'arn:aws:execute-api:us-east-1:123456789012:abcdef123/test/*')
+        # custom:userRole says admin, but the only group is student
+        self.assertEqual(policy['context']['role'], 'student')
+        self.assertEqual(policy['context']['username'], 'jane.doe')
+
+    def test_no_groups_means_no_role(self):
+        token = self.key.sign(id_claims(**{'cognito:groups': None}))
+        policy = authorizer.lambda_handler({'authorizationToken': token, 'methodArn': METHOD_ARN}, None)
+        self.assertEqual(policy['context']['role'], '')
+
+    def test_wrong_audience(self):
+        self.assertRejected(self.key.sign(id_claims(aud='another-client')), "Invalid audience")
+
+    def test_wrong_issuer(self):
+        self.assertRejected(self.key.sign(id_claims(iss='https://cognito-idp.us-east-1.amazonaws.com/us-east-1_other')), "Invalid issuer")
+
+    def test_expired(self):
+        self.assertRejected(self.key.sign(id_claims(exp=int(time.time()) - authorizer.CLOCK_SKEW_SECONDS - 60)), "Token expired")
+
+    def test_tampered_payload(self):
+        header, _, signature = self.key.sign(id_claims()).split('.')
+        tampered = b64url(json.dumps(id_claims(**{'cognito:groups': ['admin']})).encode())
+        self.assertRejected(f"{header}.{tampered}.{signature}", "Invalid signature")
+
+    def test_signed_by_another_key(self):
+        other = RsaKey('key-1', bits=1024)
+        self.assertRejected(other.sign(id_claims()), "Invalid signature")
+
+    def test_unsigned_token(self):
+        token = self.key.sign(id_claims(), header={'alg': 'none', 'kid': 'key-1'})
+        self.assertRejected(token, "Unsupported algorithm")
+
+    def test_header_that_is_not_an_object(self):
+        # "W10" is base64url for [], which used to raise AttributeError and surface as a 500
+        self.assertRejected('W10.W10.AA', "Malformed token")
+        with self.assertRaisesRegex(Exception, '^Unauthorized$'):
+            authorizer.lambda_handler({'authorizationToken': 'W10.W10.AA', 'methodArn': METHOD_ARN}, None)
+
+    def test_garbage(self):
+        for token in ('not-a-jwt', 'a.b', '!!.??.**', 'e30.e30.AA'):
+            with self.subTest(token=token), self.assertRaises(authorizer.Unauthorized):
+                authorizer.verify_token(token)
+
+    def test_jwks_fetch_failure_is_unauthorized(self):
+        # Cold container without a /tmp copy, and Cognito unreachable
+        os.remove(JWKS_CACHE_PATH)
+        self.urlopen.side_effect = urllib.error.URLError('connection refused')
+        self.assertRejected(self.key.sign(id_claims()), "Signing keys unavailable")
+
+    def test_rotated_key_is_fetched(self):
+        rotated = RsaKey('key-2', bits=1024)
+        body = json.dumps({'keys': [self.key.jwk(), rotated.jwk()]}).encode()
+        self.urlopen.side_effect = None
+        self.urlopen.return_value = io.BytesIO(body)
+        authorizer.verify_token(self.key.sign(id_claims()))
+        authorizer._jwks_fetched_at -= authorizer.JWKS_MIN_REFRESH_SECONDS + 1
+        self.assertEqual(authorizer.verify_token(rotated.sign(id_claims()))['sub'], 'a1b2c3')
+        self.assertEqual(self.urlopen.call_count, 1)
+
+    def test_decisions_are_cached(self):
+        token = self.key.sign(id_claims())
+        authorizer.authorize(token)
+        with mock.patch.object(authorizer, 'verify_token', side_effect=AssertionError("verified twice")):
+            self.assertEqual(authorizer.authorize(token)['sub'], 'a1b2c3')
+
+def tearDownModule():
+    if os.path.exists(JWKS_CACHE_PATH):
+        os.remove(JWKS_CACHE_PATH)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import json
+import unittest
+from unittest import mock
+
+from support import load_handler
+import fake_aws
+from common import abuse, clients, warmup
+
+ENVIRONMENT = {'USER_POOL_ID': 'us-east-1_tests', 'COGNITO_CLIENT_ID': 'tests-client',
+               'USER_TABLE': 'Users', 'EMAIL_INDEX_TABLE': 'UserEmails'}
+
+class PrewarmOnInitTests(unittest.TestCase):
+
+    def setUp(self):
+        abuse.local_counters.clear()
+        self.backend = fake_aws.FakeBackend()
+        self.backend.cognito.seed_users(1)
+        self.backend.dynamodb.create_table('UserEmails', ['email'])
+        clients.install_clients(cognito=self.backend.cognito, dynamodb=self.backend.dynamodb)
+        # As under provisioned concurrency, in a fresh container
+        for name, value in (('PREWARM_ON_INIT', True), ('_init_prewarmed', False)):
+            patcher = mock.patch.object(warmup, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def login(self, router):
+        body = {'action': 'login', 'email': 'student0@example.edu', 'password': 'Password1!'}
+        event = {'httpMethod': 'POST', 'resource': '/auth/login', 'body': json.dumps(body),
+                 'requestContext': {'identity': {'sourceIp': '198.51.100.4'}}}
+        return router.lambda_handler(event, None)['statusCode']
+
+    def test_init_prewarms_once(self):
+        router = load_handler('AUTHROUTER', **ENVIRONMENT)
+        self.assertEqual(self.backend.counts, {'describe_user_pool_client': 1, 'get_item': 1})
+
+        # The route handler imported inside the first request doesn't prewarm again
+        self.backend.reset_counts()
+        self.assertEqual(self.login(router), 200)
+        self.assertEqual(self.backend.counts, {'initiate_auth': 1})
+
+    def test_handler_deployed_on_its_own_still_prewarms(self):
+        load_handler('LOGIN', **ENVIRONMENT)
+        self.assertEqual(self.backend.counts, {'describe_user_pool_client': 1})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import io
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from support import load_handler
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+import fake_aws
+from common import clients
+from common.storage import LocalStorage, install_storage
+from common.profiles import build_profile_item, user_id_for
+
+USERNAME = 'jane.doe'
+USER_ID = user_id_for(USERNAME)
+
+def png_bytes(width, height, color=(200, 30, 30)):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+def s3_event(key):
+    return {'Records': [{'eventSource': 'aws:s3', 's3': {'object': {'key': key}}}]}
+
+@unittest.skipUnless(Image, "Pillow is not installed")
+class AvatarTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.avatars = load_handler('AVATARS', USER_TABLE='Users', AVATAR_MAX_BYTES='200000',
+                                   AVATAR_MAX_PIXELS='1000000', AVATAR_SIZES='64,256')
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='avatars-tests-')
+        self.addCleanup(shutil.rmtree, self.root)
+        self.storage = LocalStorage(self.root, 'https://cdn.example.edu')
+        install_storage(self.storage)
+        self.addCleanup(install_storage, None)
+
+        backend = fake_aws.FakeBackend()
+        self.users = backend.dynamodb.create_table('Users', ['userId'])
+        profile = build_profile_item(USERNAME, {'email': 'jane.doe@example.edu', 'given_name': 'Jane', 'family_name': 'Doe'})
+        self.users.items[(USER_ID,)] = profile
+        clients.install_clients(dynamodb=backend.dynamodb)
+
+    def post(self, body, username=USERNAME):
+        event = {'httpMethod': 'POST', 'body': json.dumps(body),
+                 'requestContext': {'authorizer': {'username': username, 'role': 'faculty'}}}
+        response = self.avatars.lambda_handler(event, None)
+        return response['statusCode'], json.loads(response['body'])
+
+    def upload(self, data):
+        status, body = self.post({'action': 'upload'})
+        self.assertEqual(status, 200)
+        self.storage.put(body['key'], data, 'image/png')
+        return body['key']
+
+    def profile(self):
+        return self.users.items[(USER_ID,)]
+
+    def test_upload_target_is_under_the_callers_prefix(self):
+        status, body = self.post({'action': 'upload'})
+        self.assertEqual(status, 200)
+        self.assertTrue(body['key'].startswith(f"uploads/{USER_ID}/"))
+        self.assertEqual(body['fields'], {'key': body['key']})
+        self.assertEqual(body['maxBytes'], 200000)
+
+    def test_s3_event_stores_variants_and_records_them(self):
+        key = self.upload(png_bytes(800, 600))
+        upload_id = key.rsplit('/', 1)[1]
+
+        self.assertEqual(self.avatars.lambda_handler(s3_event(key), None), {'processed': 1})
+
+        avatar = self.profile()['avatar']
+        self.assertEqual(avatar['uploadId'], upload_id)
+        self.assertEqual(avatar['original'], f"https://cdn.example.edu/{key}")
+        self.assertEqual(sorted(avatar['sizes']), ['256', '64'])
+        self.assertEqual(self.profile()['version'], 2)
+        for size in (64, 256):
+            for fmt in ('webp', 'jpeg'):
+                variant_key = f"avatars/{USER_ID}/{upload_id}/{size}.{fmt}"
+                self.assertEqual(avatar['sizes'][str(size)][fmt], f"https://cdn.example.edu/{variant_key}")
+                with Image.open(os.path.join(self.root, variant_key)) as variant:
+                    self.assertEqual(variant.size, (size, size))
+
+    def test_status_is_processing_until_the_event_runs(self):
+        key = self.upload(png_bytes(300, 300))
+        status, body = self.post({'action': 'status', 'key': key})
+        self.assertEqual((status, body['status']), (202, 'processing'))
+
+        self.avatars.lambda_handler(s3_event(key), None)
+        status, body = self.post({'action': 'status', 'key': key})
+        self.assertEqual((status, body['status']), (200, 'ready'))
+        self.assertEqual(body['avatar']['uploadId'], key.rsplit('/', 1)[1])
+
+    def test_status_never_processes_the_upload(self):
+        key = self.upload(png_bytes(300, 300))
+        self.post({'action': 'status', 'key': key})
+        self.assertNotIn('avatar', self.profile())
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'avatars')))
+
+    def test_file_that_is_not_an_image_is_rejected(self):
+        key = self.upload(b'%PDF-1.7 not a picture')
+        self.assertEqual(self.avatars.lambda_handler(s3_event(key), None), {'processed': 0})
+        status, body = self.post({'action': 'status', 'key': key})
+        self.assertEqual((status, body['status']), (200, 'rejected'))
+        self.assertIn('Unsupported image', body['message'])
+        self.assertNotIn('avatar', self.profile())
+
+    def test_oversized_upload_is_rejected(self):
+        key = self.upload(os.urandom(200001))
+        self.avatars.lambda_handler(s3_event(key), None)
+        status, body = self.post({'action': 'status', 'key': key})
+        self.assertEqual(body['status'], 'rejected')
+
+    def test_too_many_pixels_is_rejected_before_decoding(self):
+        key = self.upload(png_bytes(1200, 1000))
+        self.avatars.lambda_handler(s3_event(key), None)
+        self.assertIn('pixel limit', self.profile()['avatarRejected']['message'])
+
+    def test_status_of_another_users_upload(self):
+        key = self.upload(png_bytes(100, 100))
+        status, _ = self.post({'action': 'status', 'key': key}, username='john.roe')
+        self.assertEqual(status, 403)
+
+    def test_removed_complete_action(self):
+        key = self.upload(png_bytes(100, 100))
+        status, _ = self.post({'action': 'complete', 'key': key})
+        self.assertEqual(status, 400)
+        self.assertNotIn('avatar', self.profile())
+
+    def test_body_that_is_not_an_object(self):
+        event = {'httpMethod': 'POST', 'body': '[]', 'requestContext': {'authorizer': {'username': USERNAME}}}
+        self.assertEqual(self.avatars.lambda_handler(event, None)['statusCode'], 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import json
+import unittest
+
+from support import load_handler
+import fake_aws
+from common import cache, clients
+from common.profiles import build_profile_item, user_id_for
+
+createuser = load_handler('CREATEUSER', USER_POOL_ID='us-east-1_tests', COGNITO_CLIENT_ID='tests-client',
+                          USER_TABLE='Users', EMAIL_INDEX_TABLE='UserEmails')
+
+USERNAME = 'jane.doe3f9a1c'
+ATTRIBUTES = {'email': 'jane.doe@example.edu', 'given_name': 'Jane', 'family_name': 'Doe',
+              'phone_number': '', 'custom:userRole': 'student'}
+
+class ConfirmRetryTests(unittest.TestCase):
+
+    def setUp(self):
+        cache.user_attributes_cache.clear()
+        self.backend = fake_aws.FakeBackend()
+        self.users = self.backend.dynamodb.create_table('Users', ['userId'])
+        self.backend.dynamodb.create_table('UserEmails', ['email'])
+        clients.install_clients(cognito=self.backend.cognito, dynamodb=self.backend.dynamodb)
+
+    def confirm(self):
+        body = {'action': 'confirm', 'username': USERNAME, 'verificationCode': '123456'}
+        response = createuser.lambda_handler({'httpMethod': 'POST', 'body': json.dumps(body)}, None)
+        return response['statusCode'], json.loads(response['body'])
+
+    def groups(self):
+        return {group for group, members in self.backend.cognito.groups.items() if USERNAME in members}
+
+    def test_retry_after_a_completed_confirm(self):
+        self.backend.cognito.add_user(USERNAME, 'Password1!', ATTRIBUTES, 'CONFIRMED')
+        profile = build_profile_item(USERNAME, ATTRIBUTES)
+        self.users.items[(profile['userId'],)] = profile
+
+        status, body = self.confirm()
+        self.assertEqual((status, body['message']), (200, "Account already verified."))
+        self.assertEqual(self.backend.counts, {'confirm_sign_up': 1, 'get_item': 1})
+
+    def test_retry_after_the_trigger_failed_completes_the_signup(self):
+        # Cognito confirmed the account, but the Post Confirmation trigger never finished
+        self.backend.cognito.add_user(USERNAME, 'Password1!', ATTRIBUTES, 'CONFIRMED')
+
+        status, body = self.confirm()
+        self.assertEqual(status, 200)
+        self.assertEqual(body['redirect'], '/login')
+        self.assertEqual(self.groups(), {'student'})
+        profile = self.users.items[(user_id_for(USERNAME),)]
+        self.assertEqual((profile['username'], profile['role']), (USERNAME, 'student'))
+        self.assertEqual(self.backend.dynamodb.Table('UserEmails').items[('jane.doe@example.edu',)]['status'], 'CONFIRMED')
+
+    def test_failed_repair_is_not_reported_as_verified(self):
+        self.backend.cognito.add_user(USERNAME, 'Password1!', ATTRIBUTES, 'CONFIRMED')
+        self.backend.error_rate = 1.0
+        status, _ = self.confirm()
+        self.assertNotEqual(status, 200)
+
+        self.backend.error_rate = 0.0
+        status, _ = self.confirm()
+        self.assertEqual(status, 200)
+        self.assertIn((user_id_for(USERNAME),), self.users.items)
+
+    def test_wrong_code_for_an_unconfirmed_account(self):
+        self.backend.cognito.add_user(USERNAME, 'Password1!', ATTRIBUTES, 'UNCONFIRMED')
+        body = {'action': 'confirm', 'username': USERNAME, 'verificationCode': '000000'}
+        response = createuser.lambda_handler({'httpMethod': 'POST', 'body': json.dumps(body)}, None)
+        self.assertEqual(response['statusCode'], 400)
+        self.assertNotIn((user_id_for(USERNAME),), self.users.items)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+
+from support import load_handler
+import fake_aws
+from common import clients
+from common.pagination import decode_cursor
+from common.profiles import build_profile_item
+
+directory = load_handler('DIRECTORY', USER_TABLE='Users')
+
+PEOPLE = [
+    ('jane.doe', 'Jane', 'Doe', 'student'),
+    ('john.doering', 'John', 'Doering', 'faculty'),
+    ('ann.adams', 'Ann', 'Adams', 'student'),
+    ('adam.smith', 'Adam', 'Smith', 'student'),
+    ('dora.lee', 'Dora', 'Lee', 'admin')
+]
+
+class DirectorySearchTests(unittest.TestCase):
+
+    def setUp(self):
+        backend = fake_aws.FakeBackend()
+        self.users = backend.dynamodb.create_table('Users', ['userId'], {
+            'directoryRole-searchName-index': ['directoryRole', 'searchName'],
+            'directoryRole-searchNameReversed-index': ['directoryRole', 'searchNameReversed'],
+            'directoryRole-emailLower-index': ['directoryRole', 'emailLower']
+        })
+        for username, first, last, role in PEOPLE:
+            item = build_profile_item(username, {'email': f"{username}@example.edu", 'given_name': first,
+                                                 'family_name': last, 'custom:userRole': role})
+            self.users.items[(item['userId'],)] = item
+        clients.install_clients(dynamodb=backend.dynamodb)
+
+    def search(self, **params):
+        users, cursor = directory.search(params)
+        return [user['username'] for user in users], cursor
+
+    def search_all(self, **params):
+        found, cursor = [], None
+        while True:
+            users, cursor = self.search(cursor=cursor, **params)
+            found.extend(users)
+            if cursor is None:
+                return found
+
+    def test_last_name_prefix_finds_the_user(self):
+        self.assertEqual(self.search(q='doe')[0], ['john.doering', 'jane.doe'])
+        self.assertEqual(self.search(q='Doe  J', role='student')[0], ['jane.doe'])
+
+    def test_first_name_prefix_still_matches(self):
+        self.assertEqual(self.search(q='jane')[0], ['jane.doe'])
+
+    def test_user_matching_both_orders_is_listed_once(self):
+        # "ann adams" and "adams ann" both start with "a"
+        self.assertEqual(sorted(self.search_all(q='a', role='student', limit='1')), ['adam.smith', 'ann.adams'])
+
+    def test_pages_cover_every_match_once(self):
+        everyone = self.search_all(q='d', limit='1')
+        self.assertEqual(sorted(everyone), ['dora.lee', 'jane.doe', 'john.doering'])
+
+    def test_cursor_at_the_end_of_an_index_names_the_next_one(self):
+        _, cursor = self.search(q='jane', role='student', limit='1')
+        self.assertEqual(decode_cursor(cursor), {'directoryRole': 'student',
+                                                  'index': 'directoryRole-searchNameReversed-index'})
+
+    def test_cursor_from_another_query(self):
+        _, cursor = self.search(q='dora', role='admin', limit='1')
+        with self.assertRaises(ValueError):
+            directory.search({'q': 'dora', 'role': 'student', 'cursor': cursor})
+
+    def test_backfill_adds_the_reversed_name(self):
+        for item in self.users.items.values():
+            item.pop('searchNameReversed')
+        self.assertEqual(directory.backfill(), {'scanned': len(PEOPLE), 'updated': len(PEOPLE)})
+        self.assertEqual(self.search(q='lee')[0], ['dora.lee'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import json
+import unittest
+
+from support import load_handler
+import fake_aws
+from common import clients
+
+groups = load_handler('GROUPS', GROUP_TABLE='Groups')
+
+class CreateGroupTests(unittest.TestCase):
+
+    def setUp(self):
+        backend = fake_aws.FakeBackend()
+        self.table = backend.dynamodb.create_table('Groups', ['groupStatus', 'sortKey'])
+        clients.install_clients(dynamodb=backend.dynamodb)
+
+    def post(self, body, raw=None):
+        event = {'httpMethod': 'POST', 'body': raw if raw is not None else json.dumps(body),
+                 'requestContext': {'authorizer': {'role': 'admin', 'username': 'admin'}}}
+        response = groups.lambda_handler(event, None)
+        return response['statusCode'], json.loads(response['body'])
+
+    def test_create(self):
+        status, body = self.post({'name': ' ISTM 631 Group A ', 'faculty': 'Dr. Lee', 'term': '2024-08', 'members': '12'})
+        self.assertEqual(status, 201)
+        self.assertEqual((body['group']['name'], body['group']['members']), ('ISTM 631 Group A', 12))
+        item, = self.table.items.values()
+        self.assertEqual(item['groupStatus'], 'current')
+
+    def test_invalid_bodies_are_rejected(self):
+        valid = {'name': 'Group A', 'faculty': 'Dr. Lee', 'term': '2024-08'}
+        cases = {
+            'not an object': '[]',
+            'no body': '',
+            'members null': json.dumps(dict(valid, members=None)),
+            'members negative': json.dumps(dict(valid, members=-1)),
+            'members fractional': json.dumps(dict(valid, members=2.5)),
+            'members boolean': json.dumps(dict(valid, members=True)),
+            'name not a string': json.dumps(dict(valid, name=['Group A'])),
+            'faculty missing': json.dumps(dict(valid, faculty=' ')),
+            'unknown status': json.dumps(dict(valid, status='archived'))
+        }
+        for case, raw in cases.items():
+            with self.subTest(case):
+                status, _ = self.post(None, raw=raw)
+                self.assertEqual(status, 400)
+        self.assertEqual(self.table.items, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import io
+import json
+import unittest
+import contextlib
+from unittest import mock
+
+from support import load_handler
+import fake_aws
+from common import abuse, cache, clients, instrumentation, throttle
+
+login = load_handler('LOGIN', USER_POOL_ID='us-east-1_tests', COGNITO_CLIENT_ID='tests-client')
+
+def metric_documents(output, metric):
+    documents = [json.loads(line) for line in output.splitlines() if line.startswith('{')]
+    return [document for document in documents if metric in document]
+
+class ThrottleMetricTests(unittest.TestCase):
+
+    def setUp(self):
+        abuse.local_counters.clear()
+        self.backend = fake_aws.FakeBackend()
+        clients.install_clients(cognito=self.backend.cognito)
+        patcher = mock.patch.object(instrumentation, 'METRICS_ENABLED', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def invoke(self, handler):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            instrumentation.instrumented_handler('TESTS')(handler)({}, None)
+        return output.getvalue()
+
+    def test_cognito_throttles_are_emitted_per_operation(self):
+        self.backend.cognito.seed_users(1)
+        self.backend.throttle_rate = 1.0
+        body = {'action': 'login', 'email': 'student0@example.edu', 'password': 'Password1!'}
+        event = {'httpMethod': 'POST', 'body': json.dumps(body), 'requestContext': {'identity': {'sourceIp': '198.51.100.4'}}}
+        output = io.StringIO()
+        with mock.patch.object(throttle, 'COGNITO_CALL_DEADLINE_SECONDS', 0.05), contextlib.redirect_stdout(output):
+            self.assertEqual(login.lambda_handler(event, None)['statusCode'], 429)
+
+        throttles, = metric_documents(output.getvalue(), 'Throttles')
+        self.assertEqual((throttles['Handler'], throttles['Operation'], throttles['Kind']),
+                         ('LOGIN', 'cognito-idp.initiate_auth', 'remote'))
+        self.assertGreaterEqual(throttles['Throttles'], 1)
+        self.assertEqual(throttles['_aws']['CloudWatchMetrics'][0]['Dimensions'][0], ['Operation', 'Kind'])
+
+    def test_local_bucket_rejections_are_counted_as_local(self):
+        def handler(event, context):
+            with mock.patch.object(throttle.TokenBucket, 'reserve', return_value=5.0):
+                with self.assertRaises(throttle.CognitoThrottled):
+                    throttle.cognito_call('sign_up', ClientId='client')
+            return {'statusCode': 429}
+
+        throttles, = metric_documents(self.invoke(handler), 'Throttles')
+        self.assertEqual((throttles['Kind'], throttles['Throttles']), ('local', 1))
+
+    def test_counts_do_not_carry_over_to_the_next_invocation(self):
+        self.backend.throttle_rate = 1.0
+
+        def throttled(event, context):
+            with self.assertRaises(throttle.CognitoThrottled):
+                throttle.cognito_call('admin_get_user', deadline_seconds=0, UserPoolId='pool', Username='jane')
+            return {'statusCode': 429}
+
+        self.invoke(throttled)
+        self.assertEqual(metric_documents(self.invoke(lambda event, context: {'statusCode': 200}), 'Throttles'), [])
+
+class CacheLookupLogTests(unittest.TestCase):
+
+    def setUp(self):
+        abuse.local_counters.clear()
+        cache.user_exists_cache.clear()
+        self.backend = fake_aws.FakeBackend()
+        self.backend.cognito.seed_users(1)
+        clients.install_clients(cognito=self.backend.cognito)
+        patcher = mock.patch.object(instrumentation, 'LOG_SAMPLE_RATE', 1.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def check(self, email):
+        event = {'httpMethod': 'POST', 'body': json.dumps({'action': 'check', 'email': email}),
+                 'requestContext': {'identity': {'sourceIp': '198.51.100.4'}}}
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            login.lambda_handler(event, None)
+        complete, = [record for record in map(json.loads, output.getvalue().splitlines())
+                     if record.get('message') == 'Request complete']
+        return complete.get('cache')
+
+    def test_hits_and_misses_are_logged_per_invocation(self):
+        self.assertEqual(self.check('student0@example.edu'), {'userExists': {'hits': 0, 'misses': 1}})
+        self.assertEqual(self.check('student0@example.edu'), {'userExists': {'hits': 1, 'misses': 0}})
+
+if __name__ == '__main__':
+    unittest.main()
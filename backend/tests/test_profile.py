@@ -0,0 +1,45 @@
+import json
+import unittest
+
+from support import load_handler
+import fake_aws
+from common import clients
+from common.profiles import build_profile_item, user_id_for
+
+profile = load_handler('PROFILE', USER_TABLE='Users')
+
+USERNAME = 'jane.doe'
+
+class ProfileReadTests(unittest.TestCase):
+
+    def setUp(self):
+        backend = fake_aws.FakeBackend()
+        self.users = backend.dynamodb.create_table('Users', ['userId'])
+        item = build_profile_item(USERNAME, {'email': 'jane.doe@example.edu', 'given_name': 'Jane', 'family_name': 'Doe'})
+        self.users.items[(user_id_for(USERNAME),)] = item
+        clients.install_clients(dynamodb=backend.dynamodb)
+
+    def get(self, fields=None, headers=None):
+        event = {'httpMethod': 'GET', 'queryStringParameters': {'fields': fields} if fields else None,
+                 'headers': headers or {}, 'requestContext': {'authorizer': {'username': USERNAME}}}
+        response = profile.lambda_handler(event, None)
+        return response['statusCode'], json.loads(response['body']) if response.get('body') else None, response['headers']
+
+    def test_fields_that_are_also_in_the_projection(self):
+        for fields in ('updatedAt', 'firstName,updatedAt'):
+            with self.subTest(fields=fields):
+                status, body, _ = self.get(fields)
+                self.assertEqual(status, 200)
+                self.assertEqual(body['profile']['updatedAt'], self.users.items[(user_id_for(USERNAME),)]['updatedAt'])
+
+    def test_unchanged_profile_is_not_sent_again(self):
+        _, _, headers = self.get('firstName')
+        status, body, _ = self.get('firstName', {'If-None-Match': headers['ETag']})
+        self.assertEqual((status, body), (304, None))
+
+    def test_unknown_field(self):
+        status, _, _ = self.get('password')
+        self.assertEqual(status, 400)
+
+if __name__ == '__main__':
+    unittest.main()
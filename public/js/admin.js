@@ -31,152 +31,99 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 });
 
-// Sample data for groups - 6 items in each array
-const currentGroups = [
-    {
-        id: 1,
-        name: 'ISTM 631 Group A',
-        members: 25,
-        faculty: 'Dr. Sarah Martinez',
-        lastActive: '2 hours ago'
-    },
-    {
-        id: 2,
-        name: 'ISTM 615 Group B',
-        members: 30,
-        faculty: 'Dr. James Wilson',
-        lastActive: '4 hours ago'
-    },
-    {
-        id: 3,
-        name: 'ISTM 645 Group C',
-        members: 28,
-        faculty: 'Dr. Emily Chen',
-        lastActive: '1 day ago'
-    },
-    {
-        id: 4,
-        name: 'ISTM 631 Group D',
-        members: 27,
-        faculty: 'Dr. Michael Brown',
-        lastActive: '3 hours ago'
-    },
-    {
-        id: 5,
-        name: 'ISTM 615 Group E',
-        members: 29,
-        faculty: 'Dr. Lisa Anderson',
-        lastActive: '5 hours ago'
-    },
-    {
-        id: 6,
-        name: 'ISTM 645 Group F',
-        members: 26,
-        faculty: 'Dr. Robert Taylor',
-        lastActive: '2 days ago'
+// Groups API (GROUPS lambda). Each section loads one small page; "See All" fetches the next pages.
+const GROUPS_ENDPOINT = `${window.APP_CONFIG.apiBaseUrl}/groups`;
+const INITIAL_PAGE_SIZE = 3;
+const SEE_ALL_PAGE_SIZE = 12;
+
+// Next-page cursor per section, null once the last page is loaded
+const nextCursors = {
+    current: null,
+    previous: null
+};
+
+// Fetch one page of group cards for a section
+async function fetchGroups(section, limit, cursor) {
+    const params = new URLSearchParams({ status: section, limit: limit });
+    if (cursor) {
+        params.set('cursor', cursor);
     }
-];
-
-const previousGroups = [
-    {
-        id: 7,
-        name: 'ISTM 631 Fall 2023',
-        members: 25,
-        faculty: 'Dr. Sarah Martinez',
-        lastActive: '3 months ago'
-    },
-    {
-        id: 8,
-        name: 'ISTM 615 Fall 2023',
-        members: 30,
-        faculty: 'Dr. James Wilson',
-        lastActive: '3 months ago'
-    },
-    {
-        id: 9,
-        name: 'ISTM 645 Fall 2023',
-        members: 28,
-        faculty: 'Dr. Emily Chen',
-        lastActive: '3 months ago'
-    },
-    {
-        id: 10,
-        name: 'ISTM 631 Summer 2023',
-        members: 24,
-        faculty: 'Dr. Michael Brown',
-        lastActive: '6 months ago'
-    },
-    {
-        id: 11,
-        name: 'ISTM 615 Summer 2023',
-        members: 29,
-        faculty: 'Dr. Lisa Anderson',
-        lastActive: '6 months ago'
-    },
-    {
-        id: 12,
-        name: 'ISTM 645 Summer 2023',
-        members: 27,
-        faculty: 'Dr. Robert Taylor',
-        lastActive: '6 months ago'
+
+    const response = await fetch(`${GROUPS_ENDPOINT}?${params}`, {
+        headers: {
+            'Authorization': localStorage.getItem('idToken')
+        }
+    });
+    const data = await response.json();
+    if (!response.ok) {
+        throw new Error(data.message || 'Failed to load groups');
     }
-];
+    return data;
+}
+
+// Load a page into a section and show "See All" only while more pages remain
+async function loadGroups(section, limit) {
+    const container = document.querySelector(`.${section}-groups`);
+    const button = document.querySelector(`.see-all-btn[data-section="${section}"]`);
 
-// Function to populate groups with initial 3 visible
+    try {
+        const data = await fetchGroups(section, limit, nextCursors[section]);
+        data.groups.forEach(group => container.appendChild(createCard(group)));
+        nextCursors[section] = data.nextCursor;
+        button.classList.toggle('hidden', !data.nextCursor);
+    } catch (error) {
+        console.error(`Error loading ${section} groups:`, error);
+        button.classList.add('hidden');
+    }
+}
+
+// Function to populate groups with the first page of each section
 function populateGroups() {
-    const currentGroupsContainer = document.querySelector('.current-groups');
-    const previousGroupsContainer = document.querySelector('.previous-groups');
-    
-    // Clear existing content
-    currentGroupsContainer.innerHTML = '';
-    previousGroupsContainer.innerHTML = '';
-    
-    // Add current groups (initially first 3)
-    currentGroups.forEach((group, index) => {
-        const card = createCard(group);
-        
-        // Hide groups after first 3
-        if (index >= 3) {
-            card.classList.add('row-hidden');
-        }
-        
-        currentGroupsContainer.appendChild(card);
+    ['current', 'previous'].forEach(section => {
+        document.querySelector(`.${section}-groups`).innerHTML = '';
+        nextCursors[section] = null;
+        loadGroups(section, INITIAL_PAGE_SIZE);
     });
-    
-    // Add previous groups (initially first 3)
-    previousGroups.forEach((group, index) => {
-        const card = createCard(group);
-        
-        // Hide groups after first 3
-        if (index >= 3) {
-            card.classList.add('row-hidden');
+}
+
+// Format an ISO timestamp as "2 hours ago"
+function timeAgo(timestamp) {
+    const seconds = Math.max(0, (Date.now() - new Date(timestamp + (timestamp.endsWith('Z') ? '' : 'Z'))) / 1000);
+    const units = [
+        ['year', 31536000],
+        ['month', 2592000],
+        ['day', 86400],
+        ['hour', 3600],
+        ['minute', 60]
+    ];
+    for (const [unit, size] of units) {
+        const count = Math.floor(seconds / size);
+        if (count >= 1) {
+            return `${count} ${unit}${count > 1 ? 's' : ''} ago`;
         }
-        
-        previousGroupsContainer.appendChild(card);
-    });
-    
-    // Hide "See All" buttons if there are 3 or fewer groups
-    if (currentGroups.length <= 3) {
-        document.querySelector('.see-all-btn[data-section="current"]').classList.add('hidden');
-    }
-    
-    if (previousGroups.length <= 3) {
-        document.querySelector('.see-all-btn[data-section="previous"]').classList.add('hidden');
     }
+    return 'just now';
+}
+
+// Group fields are stored server-side and entered by other admins, so they are escaped before going into markup
+function escapeHtml(value) {
+    const div = document.createElement('div');
+    div.textContent = value == null ? '' : String(value);
+    return div.innerHTML;
 }
 
 // Function to create a card element
 function createCard(group) {
     const card = document.createElement('div');
     card.className = 'card';
-    card.setAttribute('data-id', group.id);
+    card.setAttribute('data-id', group.groupId);
     
     card.innerHTML = `
-        <h3>${group.name}</h3>
+        <h3>${escapeHtml(group.name)}</h3>
         <div class="card-info">
-            <p>Members: <span>${group.members}</span></p>
-            <p>Faculty: <span>${group.faculty}</span></p>
-            <p>Last Active: <span>${group.lastActive}</span></p>
+            <p>Members: <span>${escapeHtml(group.members)}</span></p>
+            <p>Faculty: <span>${escapeHtml(group.faculty)}</span></p>
+            <p>Last Active: <span>${escapeHtml(timeAgo(group.lastActive))}</span></p>
         </div>
     `;
     
@@ -197,17 +144,8 @@ function setupSeeAllButtons() {
     
     seeAllButtons.forEach(button => {
         button.addEventListener('click', () => {
-            const section = button.getAttribute('data-section');
-            const container = document.querySelector(`.${section}-groups`);
-            const hiddenCards = container.querySelectorAll('.row-hidden');
-            
-            // Show all hidden cards
-            hiddenCards.forEach(card => {
-                card.classList.remove('row-hidden');
-            });
-            
-            // Hide the "See All" button after it's clicked
-            button.classList.add('hidden');
+            // Fetch the next page; the button stays until the last page is loaded
+            loadGroups(button.getAttribute('data-section'), SEE_ALL_PAGE_SIZE);
         });
     });
 }
@@ -217,9 +155,34 @@ function setupCreateGroupButton() {
     const createGroupBtn = document.querySelector('.create-group-btn');
     
     if (createGroupBtn) {
-        createGroupBtn.addEventListener('click', () => {
-            console.log('Create group button clicked');
-            // Additional dropdown functionality can be added here
+        createGroupBtn.addEventListener('click', async () => {
+            const name = prompt('Group name (e.g. ISTM 631 Group A):');
+            if (!name) return;
+            const faculty = prompt('Faculty lead:');
+            if (!faculty) return;
+            const now = new Date();
+            const term = prompt('Term start (YYYY-MM):', `${now.getFullYear()}-${String(now.getMonth() + 1).padStart(2, '0')}`);
+            if (!term) return;
+
+            try {
+                const response = await fetch(GROUPS_ENDPOINT, {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'Authorization': localStorage.getItem('idToken')
+                    },
+                    body: JSON.stringify({ name, faculty, term, status: 'current' })
+                });
+                const data = await response.json();
+                if (!response.ok) {
+                    throw new Error(data.message || 'Failed to create group');
+                }
+                // Newest groups sort first, so the new card goes to the front
+                document.querySelector('.current-groups').prepend(createCard(data.group));
+            } catch (error) {
+                console.error('Error creating group:', error);
+                alert(`Could not create group: ${error.message}`);
+            }
         });
     }
-}
\ No newline at end of file
+}
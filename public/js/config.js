@@ -0,0 +1,5 @@
+// API Gateway stage every page calls. tools/build_assets.py writes a fingerprinted copy
+// for each deploy (--api-base-url picks the stage); this one is used when public/ is served as is.
+window.APP_CONFIG = Object.freeze({
+    apiBaseUrl: 'https://fgwxjjo7j9.execute-api.us-east-1.amazonaws.com/test'
+});
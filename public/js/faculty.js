@@ -7,10 +7,60 @@ document.addEventListener('DOMContentLoaded', function() {
         return;
     }
 
-    // Profile Picture Upload
+    // Profile Picture Upload (AVATARS lambda). The file goes straight to storage with a
+    // presigned POST; the page then shows the small resized variant, not the original.
+    const AVATARS_ENDPOINT = `${window.APP_CONFIG.apiBaseUrl}/avatars`;
     const profilePicInput = document.getElementById('profilePicInput');
     const profilePic = document.getElementById('profilePic');
 
+    async function postAvatarAction(payload) {
+        const response = await fetch(AVATARS_ENDPOINT, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Authorization': idToken
+            },
+            body: JSON.stringify(payload)
+        });
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.message || 'Upload failed');
+        }
+        return data;
+    }
+
+    async function uploadProfilePicture(file) {
+        const target = await postAvatarAction({ action: 'upload' });
+
+        const form = new FormData();
+        Object.entries(target.fields).forEach(([name, value]) => form.append(name, value));
+        form.append('Content-Type', file.type);
+        form.append('file', file);
+        const upload = await fetch(target.url, { method: 'POST', body: form });
+        if (!upload.ok) {
+            throw new Error('Upload to storage failed');
+        }
+
+        // Storage notifies the AVATARS lambda, which resizes the upload; poll until it has
+        const avatar = await waitForAvatar(target.key);
+        const size = avatar.sizes['256'];
+        return size ? size.webp : avatar.original;
+    }
+
+    async function waitForAvatar(key) {
+        for (let attempt = 0; attempt < 15; attempt++) {
+            const result = await postAvatarAction({ action: 'status', key: key });
+            if (result.status === 'ready') {
+                return result.avatar;
+            }
+            if (result.status === 'rejected') {
+                throw new Error(result.message || 'Upload rejected');
+            }
+            await new Promise(resolve => setTimeout(resolve, 1000));
+        }
+        throw new Error('Your picture is still being processed. Refresh the page in a moment.');
+    }
+
     if (profilePicInput && profilePic) {
         profilePicInput.addEventListener('change', function(e) {
             const file = e.target.files[0];
@@ -27,13 +77,26 @@ document.addEventListener('DOMContentLoaded', function() {
                     return;
                 }
 
-                const reader = new FileReader();
-                reader.onload = function(e) {
-                    profilePic.src = e.target.result;
-                };
-                reader.readAsDataURL(file);
+                // Show a local preview while the upload runs, without reading the file into a data URL
+                const previewUrl = URL.createObjectURL(file);
+                profilePic.src = previewUrl;
+                uploadProfilePicture(file)
+                    .then(avatarUrl => {
+                        profilePic.src = avatarUrl;
+                        localStorage.setItem('avatarUrl', avatarUrl);
+                    })
+                    .catch(error => {
+                        console.error('Error uploading profile picture:', error);
+                        alert(`Could not save your profile picture: ${error.message}`);
+                    })
+                    .finally(() => URL.revokeObjectURL(previewUrl));
             }
         });
+
+        const savedAvatar = localStorage.getItem('avatarUrl');
+        if (savedAvatar) {
+            profilePic.src = savedAvatar;
+        }
     }
 
     // Navigation Menu Active State
@@ -54,6 +117,24 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 
+    // Check-in API (CHECKINS lambda) and pre-aggregated dashboard stats (CHECKINSTATS lambda)
+    const CHECKINS_ENDPOINT = `${window.APP_CONFIG.apiBaseUrl}/checkins`;
+    const STATS_ENDPOINT = `${window.APP_CONFIG.apiBaseUrl}/checkin-stats`;
+
+    // GET a JSON API with the session token
+    async function getJson(endpoint, params) {
+        const response = await fetch(`${endpoint}?${new URLSearchParams(params)}`, {
+            headers: {
+                'Authorization': idToken
+            }
+        });
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.message || 'Request failed');
+        }
+        return data;
+    }
+
     // Create Check-in Functionality
     const createCheckinBtn = document.getElementById('createCheckinBtn');
     const presetCheckin = document.getElementById('presetCheckin');
@@ -94,10 +175,10 @@ document.addEventListener('DOMContentLoaded', function() {
                 <h2>${type === 'preset' ? 'Select Preset Check-in' : 'Create New Check-in'}</h2>
                 <form id="checkinForm">
                     ${formContent}
-                    <input type="text" placeholder="Student Name" required>
-                    <input type="text" placeholder="Location" required>
-                    <input type="text" placeholder="Companion Name">
-                    <textarea placeholder="Comments"></textarea>
+                    ${type === 'custom' ? '<input type="text" name="title" placeholder="Check-in Title" required>' : ''}
+                    <input type="text" name="courseId" placeholder="Course (e.g. ISTM 631)" required>
+                    <input type="text" name="site" placeholder="Program Site Coordinates (lat,lon)">
+                    <textarea name="expectedStudents" placeholder="Expected Students (usernames, comma separated)"></textarea>
                     <div class="modal-buttons">
                         <button type="submit">Create</button>
                         <button type="button" class="cancel">Cancel</button>
@@ -109,11 +190,41 @@ document.addEventListener('DOMContentLoaded', function() {
         document.body.appendChild(modal);
         
         const form = modal.querySelector('form');
-        form.addEventListener('submit', function(e) {
+        form.addEventListener('submit', async function(e) {
             e.preventDefault();
-            // Add your form submission logic here (e.g., API call)
-            console.log('Check-in submitted:', new FormData(this));
-            document.body.removeChild(modal);
+            const fields = new FormData(this);
+            const preset = this.querySelector('select[name="preset"]');
+            const [siteLat, siteLon] = (fields.get('site') || '').split(',').map(value => value.trim());
+            const prompt = {
+                action: 'prompt',
+                title: fields.get('title') || (preset ? preset.options[preset.selectedIndex].text : 'Check-in'),
+                courseId: fields.get('courseId'),
+                siteLat: siteLat || null,
+                siteLon: siteLon || null,
+                expectedStudents: (fields.get('expectedStudents') || '').split(',').map(name => name.trim()).filter(Boolean)
+            };
+
+            try {
+                const response = await fetch(CHECKINS_ENDPOINT, {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'Authorization': idToken
+                    },
+                    body: JSON.stringify(prompt)
+                });
+                const data = await response.json();
+                if (!response.ok) {
+                    throw new Error(data.message || 'Failed to create check-in');
+                }
+                // Students open this link to check in against the prompt
+                const link = `${window.location.origin}${window.location.pathname.replace(/[^/]*$/, '')}student.html?checkin=${data.checkinId}`;
+                window.prompt('Check-in created. Share this link with your students:', link);
+                document.body.removeChild(modal);
+            } catch (error) {
+                console.error('Error creating check-in:', error);
+                alert(`Could not create check-in: ${error.message}`);
+            }
         });
         
         const cancelBtn = modal.querySelector('.cancel');
@@ -132,6 +243,8 @@ document.addEventListener('DOMContentLoaded', function() {
                 localStorage.removeItem('accessToken');
                 localStorage.removeItem('refreshToken');
                 localStorage.removeItem('userRole');
+                localStorage.removeItem('username');
+                localStorage.removeItem('avatarUrl');
                 // Redirect to login page
                 window.location.href = 'login.html'; // Updated to match your file structure
             }
@@ -147,24 +260,86 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 
+    // Fill each course card's "Last checked" from its COURSE stats item (one request for all cards)
+    async function loadCourseCards() {
+        const courseIds = Array.from(courseCards).map(card => card.querySelector('h3').textContent.trim());
+        if (!courseIds.length) return;
+        try {
+            const data = await getJson(STATS_ENDPOINT, { courseIds: courseIds.join(',') });
+            data.courses.forEach(course => {
+                const card = Array.from(courseCards).find(c => c.querySelector('h3').textContent.trim() === course.courseId);
+                const lastChecked = card && card.querySelector('p');
+                if (lastChecked && course.lastCheckinAt) {
+                    lastChecked.textContent = `Last checked: ${new Date(course.lastCheckinAt + 'Z').toLocaleDateString()}`;
+                }
+            });
+        } catch (error) {
+            console.error('Error loading course stats:', error);
+        }
+    }
+
+    loadCourseCards();
+
     // Table Row Hover Effect
-    const tableRows = document.querySelectorAll('tbody tr');
-    tableRows.forEach(row => {
-        row.addEventListener('mouseover', function() {
-            this.style.backgroundColor = 'var(--gray-100)';
+    function addRowHover(rows) {
+        rows.forEach(row => {
+            row.addEventListener('mouseover', function() {
+                this.style.backgroundColor = 'var(--gray-100)';
+            });
+            row.addEventListener('mouseout', function() {
+                this.style.backgroundColor = '';
+            });
         });
-        row.addEventListener('mouseout', function() {
-            this.style.backgroundColor = '';
-        });
-    });
+    }
+
+    addRowHover(document.querySelectorAll('tbody tr'));
 
     // Helper Functions
-    function loadCourseDetails(courseCode) {
+    function escapeHtml(value) {
+        const div = document.createElement('div');
+        div.textContent = value == null ? '' : String(value);
+        return div.innerHTML;
+    }
+
+    async function loadCourseDetails(courseCode) {
         const assignmentsSection = document.querySelector('.assignments-section');
-        if (assignmentsSection) {
-            const sectionTitle = assignmentsSection.querySelector('h2');
-            sectionTitle.textContent = `Current Assignments: ${courseCode}`;
-            console.log(`Loading details for ${courseCode}`);
+        if (!assignmentsSection) return;
+
+        const sectionTitle = assignmentsSection.querySelector('h2');
+        sectionTitle.textContent = `Current Assignments: ${courseCode}`;
+
+        let summary = assignmentsSection.querySelector('.checkin-summary');
+        if (!summary) {
+            summary = document.createElement('p');
+            summary.className = 'checkin-summary';
+            sectionTitle.insertAdjacentElement('afterend', summary);
+        }
+
+        try {
+            // Course totals and the latest check-ins are pre-aggregated; no per-row counting here
+            const stats = await getJson(STATS_ENDPOINT, { courseId: courseCode });
+            const latest = stats.checkins[0];
+            if (!latest) {
+                summary.textContent = 'No check-ins yet for this course.';
+                return;
+            }
+            summary.textContent = `${latest.title}: ${latest.responded} of ${latest.expected} checked in` +
+                (latest.missing.length ? ` · Missing: ${latest.missing.join(', ')}` : '');
+
+            const responses = await getJson(CHECKINS_ENDPOINT, { checkinId: latest.checkinId, limit: 25 });
+            const tbody = assignmentsSection.querySelector('tbody');
+            tbody.innerHTML = responses.responses.map(row => `
+                <tr>
+                    <td>${escapeHtml(row.username)}</td>
+                    <td><a href="https://www.google.com/maps?q=${Number(row.lat)},${Number(row.lon)}" target="_blank" rel="noopener">${Number(row.lat)}, ${Number(row.lon)}</a></td>
+                    <td>${escapeHtml(row.withWhom)}</td>
+                    <td>${escapeHtml(row.comments || row.currentPlace)}</td>
+                </tr>
+            `).join('');
+            addRowHover(tbody.querySelectorAll('tr'));
+        } catch (error) {
+            console.error(`Error loading details for ${courseCode}:`, error);
+            summary.textContent = 'Could not load check-in details.';
         }
     }
 
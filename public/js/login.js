@@ -4,6 +4,53 @@ document.addEventListener('DOMContentLoaded', function() {
     loginStatus.id = 'loginStatus';
     loginForm.appendChild(loginStatus); // Place status inside form for styling
 
+    // Set when an admin-created account must choose a new password before its first login
+    let passwordChallenge = null;
+
+    function showNewPasswordField() {
+        if (document.getElementById('newPassword')) return;
+        const group = document.createElement('div');
+        group.className = 'form-group';
+        const label = document.createElement('label');
+        label.htmlFor = 'newPassword';
+        label.textContent = 'New password';
+        const input = document.createElement('input');
+        input.type = 'password';
+        input.id = 'newPassword';
+        input.placeholder = 'Choose a new password';
+        group.append(label, input);
+        document.getElementById('password').closest('.form-group').after(group);
+        input.focus();
+    }
+
+    function completeLogin(data) {
+        // Establish session by storing tokens in localStorage
+        if (data.idToken) localStorage.setItem('idToken', data.idToken);
+        if (data.accessToken) localStorage.setItem('accessToken', data.accessToken);
+        if (data.refreshToken) localStorage.setItem('refreshToken', data.refreshToken);
+        if (data.role) localStorage.setItem('userRole', data.role);
+        if (data.username) localStorage.setItem('username', data.username);
+
+        loginStatus.innerText = 'Successfully Logged In';
+        loginStatus.style.color = 'green';
+
+        // Redirect based on role
+        const role = data.role ? data.role.toLowerCase() : null;
+        switch (role) {
+            case 'student':
+                window.location.href = 'student.html';
+                break;
+            case 'faculty':
+                window.location.href = 'faculty.html';
+                break;
+            case 'admin':
+                window.location.href = 'admin.html';
+                break;
+            default:
+                throw new Error('Unknown role. Please contact support.');
+        }
+    }
+
     loginForm.addEventListener('submit', async function(e) {
         e.preventDefault();
 
@@ -22,43 +69,34 @@ document.addEventListener('DOMContentLoaded', function() {
             if (!email || !email.includes('@')) throw new Error('Please enter a valid email');
             if (!password) throw new Error('Please enter a password');
 
+            let request = { email, password, remember };
+            if (passwordChallenge) {
+                const newPassword = document.getElementById('newPassword').value;
+                if (!newPassword) throw new Error('Please choose a new password');
+                request = { action: 'new_password', username: passwordChallenge.username, session: passwordChallenge.session, newPassword, remember };
+            }
+
             // Authenticate with Lambda
-            const response = await fetch('https://fgwxjjo7j9.execute-api.us-east-1.amazonaws.com/test/auth/login', {
+            const response = await fetch(`${window.APP_CONFIG.apiBaseUrl}/auth/login`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ email, password, remember })
+                body: JSON.stringify(request)
             });
 
             const data = await response.json();
-            console.log('Login response:', data); // Debug response
 
-            if (data.success) {
-                // Establish session by storing tokens in localStorage
-                if (data.idToken) localStorage.setItem('idToken', data.idToken);
-                if (data.accessToken) localStorage.setItem('accessToken', data.accessToken);
-                if (data.refreshToken) localStorage.setItem('refreshToken', data.refreshToken);
-                if (data.role) localStorage.setItem('userRole', data.role);
-
-                loginStatus.innerText = 'Successfully Logged In';
-                loginStatus.style.color = 'green';
-
-                // Redirect based on role
-                const role = data.role ? data.role.toLowerCase() : null;
-                console.log('Normalized role:', role); // Debug role
-                switch (role) {
-                    case 'student':
-                        window.location.href = 'student.html';
-                        break;
-                    case 'faculty':
-                        window.location.href = 'faculty.html';
-                        break;
-                    case 'admin':
-                        window.location.href = 'admin.html';
-                        break;
-                    default:
-                        throw new Error('Unknown role. Please contact support.');
-                }
+            if (data.challenge === 'NEW_PASSWORD_REQUIRED') {
+                passwordChallenge = { username: data.username, session: data.session };
+                showNewPasswordField();
+                loginStatus.innerText = data.message;
+                loginStatus.style.color = 'black';
+            } else if (data.success) {
+                completeLogin(data);
             } else {
+                if (response.status === 401 && passwordChallenge) {
+                    // The challenge session lasts a few minutes; start over with the temporary password
+                    passwordChallenge = null;
+                }
                 loginStatus.innerText = 'Login Failed: ' + data.message;
                 loginStatus.style.color = 'red';
             }
@@ -84,13 +122,14 @@ document.addEventListener('DOMContentLoaded', function() {
     /*
     async function refreshTokens() {
         const refreshToken = localStorage.getItem('refreshToken');
-        if (!refreshToken) return false;
+        const username = localStorage.getItem('username');
+        if (!refreshToken || !username) return false;
 
         try {
-            const response = await fetch('https://fgwxjjo7j9.execute-api.us-east-1.amazonaws.com/test/auth/refresh', {
+            const response = await fetch(`${window.APP_CONFIG.apiBaseUrl}/auth/refresh`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ refreshToken, action: 'refresh' })
+                body: JSON.stringify({ refreshToken, username, action: 'refresh' })
             });
             const data = await response.json();
             if (data.success) {
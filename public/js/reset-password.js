@@ -1,6 +1,6 @@
 document.addEventListener('DOMContentLoaded', function() {
     // Constants
-    const API_ENDPOINT = 'https://fgwxjjo7j9.execute-api.us-east-1.amazonaws.com/test/auth/reset-password';
+    const API_ENDPOINT = `${window.APP_CONFIG.apiBaseUrl}/auth/reset-password`;
     
     // Elements
     const resetForm = document.getElementById('resetForm');
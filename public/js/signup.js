@@ -53,13 +53,22 @@ document.addEventListener('DOMContentLoaded', function () {
             userRole: roleInput.value
         };
 
+        const submitBtn = this.querySelector('button[type="submit"]');
+        if (submitBtn) submitBtn.disabled = true;
+
         try {
             // Make API call to your backend Lambda function via API Gateway
-            const response = await fetch('https://fgwxjjo7j9.execute-api.us-east-1.amazonaws.com/test/users', {
+            const request = {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify(userData),
-            });
+            };
+            let response = await fetch(`${window.APP_CONFIG.apiBaseUrl}/users`, request);
+            // 409: an identical sign-up is still running; retrying returns its stored result
+            for (let attempt = 0; response.status === 409 && attempt < 3; attempt++) {
+                await new Promise(resolve => setTimeout(resolve, 1000 * (parseInt(response.headers.get('Retry-After'), 10) || 1)));
+                response = await fetch(`${window.APP_CONFIG.apiBaseUrl}/users`, request);
+            }
 
             if (!response.ok) {
                 const errorResponse = await response.json();
@@ -77,6 +86,8 @@ document.addEventListener('DOMContentLoaded', function () {
         } catch (error) {
             console.error('Error during sign-up:', error);
             alert(`Sign-up failed: ${error.message}`);
+        } finally {
+            if (submitBtn) submitBtn.disabled = false;
         }
     });
 
@@ -7,6 +7,106 @@ document.addEventListener('DOMContentLoaded', function() {
         return;
     }
 
+    // Check-in API (CHECKINS lambda). A faculty prompt link carries ?checkin=<checkinId>;
+    // without one the location goes to today's check-ins.
+    const CHECKINS_ENDPOINT = `${window.APP_CONFIG.apiBaseUrl}/checkins`;
+    const checkinId = new URLSearchParams(window.location.search).get('checkin');
+
+    // Send a check-in with the current coordinates and additional details
+    async function submitCheckin(position) {
+        const submission = {
+            lat: position.coords.latitude,
+            lon: position.coords.longitude,
+            accuracy: position.coords.accuracy,
+            withWhom: document.getElementById('withWhomText').textContent,
+            currentPlace: document.getElementById('currentPlaceText').textContent,
+            comments: document.getElementById('commentsText').textContent
+        };
+        if (checkinId) {
+            submission.checkinId = checkinId;
+        }
+
+        const response = await fetch(CHECKINS_ENDPOINT, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Authorization': idToken
+            },
+            body: JSON.stringify(submission)
+        });
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.message || (data.results && data.results[0].message) || 'Check-in failed');
+        }
+        return data;
+    }
+
+    // Profile API (PROFILE lambda). The last response is kept with its ETag so a reload
+    // revalidates with If-None-Match and an unchanged profile comes back as an empty 304.
+    const PROFILE_ENDPOINT = `${window.APP_CONFIG.apiBaseUrl}/profile`;
+    const PROFILE_CACHE_KEY = 'profileCache';
+    const DETAIL_FIELDS = ['withWhom', 'currentPlace', 'comments'];
+    let profileEtag = null;
+
+    function showDetails(profile) {
+        DETAIL_FIELDS.forEach(field => {
+            document.getElementById(`${field}Text`).textContent = profile[field] || '';
+        });
+    }
+
+    function cacheProfile(etag, profile) {
+        profileEtag = etag;
+        if (etag) {
+            localStorage.setItem(PROFILE_CACHE_KEY, JSON.stringify({ etag, profile }));
+        }
+    }
+
+    async function loadProfile() {
+        const cached = JSON.parse(localStorage.getItem(PROFILE_CACHE_KEY) || 'null');
+        const headers = { 'Authorization': idToken };
+        if (cached) {
+            headers['If-None-Match'] = cached.etag;
+            profileEtag = cached.etag;
+            showDetails(cached.profile);
+        }
+        const response = await fetch(PROFILE_ENDPOINT, { headers });
+        if (response.status === 304) {
+            return;
+        }
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.message || 'Failed to load profile');
+        }
+        cacheProfile(response.headers.get('ETag'), data.profile);
+        showDetails(data.profile);
+    }
+
+    // Only applies if nobody changed the profile since it was loaded; otherwise 412
+    async function saveProfile(changes) {
+        const response = await fetch(PROFILE_ENDPOINT, {
+            method: 'PATCH',
+            headers: {
+                'Content-Type': 'application/json',
+                'Authorization': idToken,
+                'If-Match': profileEtag || ''
+            },
+            body: JSON.stringify(changes)
+        });
+        const data = await response.json();
+        if (response.status === 412 || response.status === 428) {
+            localStorage.removeItem(PROFILE_CACHE_KEY);
+            await loadProfile();
+            throw new Error('Your profile was updated elsewhere. The latest details have been loaded, please edit again.');
+        }
+        if (!response.ok) {
+            throw new Error(data.message || 'Failed to save details');
+        }
+        cacheProfile(response.headers.get('ETag'), data.profile);
+        return data.profile;
+    }
+
+    loadProfile().catch(error => console.error('Error loading profile:', error));
+
     // Get Location Button
     const getLocationBtn = document.getElementById('getLocation');
     const coordinatesDisplay = document.getElementById('coordinates');
@@ -28,8 +128,18 @@ document.addEventListener('DOMContentLoaded', function() {
                 function(position) {
                     const coords = `${position.coords.latitude.toFixed(6)},${position.coords.longitude.toFixed(6)}`;
                     coordinatesDisplay.textContent = coords;
-                    getLocationBtn.disabled = false;
-                    getLocationBtn.innerHTML = 'Get Current Location';
+                    submitCheckin(position)
+                        .then(() => {
+                            getLocationBtn.innerHTML = 'Checked In';
+                        })
+                        .catch(error => {
+                            console.error("Error submitting check-in:", error);
+                            alert(`Your location was found but the check-in failed: ${error.message}`);
+                            getLocationBtn.innerHTML = 'Get Current Location';
+                        })
+                        .finally(() => {
+                            getLocationBtn.disabled = false;
+                        });
                 },
                 function(error) {
                     console.error("Error getting location:", error);
@@ -62,12 +172,25 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Save Details
     saveDetailsBtn.addEventListener('click', function() {
-        document.getElementById('withWhomText').textContent = document.getElementById('withWhomInput').value;
-        document.getElementById('currentPlaceText').textContent = document.getElementById('currentPlaceInput').value;
-        document.getElementById('commentsText').textContent = document.getElementById('commentsInput').value;
+        const changes = {};
+        DETAIL_FIELDS.forEach(field => {
+            changes[field] = document.getElementById(`${field}Input`).value;
+        });
 
-        viewMode.classList.remove('hidden');
-        editMode.classList.add('hidden');
+        saveDetailsBtn.disabled = true;
+        saveProfile(changes)
+            .then(profile => {
+                showDetails(profile);
+                viewMode.classList.remove('hidden');
+                editMode.classList.add('hidden');
+            })
+            .catch(error => {
+                console.error('Error saving details:', error);
+                alert(error.message);
+            })
+            .finally(() => {
+                saveDetailsBtn.disabled = false;
+            });
     });
 
     // Cancel Edit
@@ -123,6 +246,8 @@ document.addEventListener('DOMContentLoaded', function() {
             localStorage.removeItem('accessToken');
             localStorage.removeItem('refreshToken');
             localStorage.removeItem('userRole');
+            localStorage.removeItem('username');
+            localStorage.removeItem(PROFILE_CACHE_KEY);
             // Redirect to login page
             window.location.href = 'login.html'; // Updated to match your file structure
         }
@@ -15,8 +15,11 @@ document.getElementById('verifyForm').addEventListener('submit', async function
         return;
     }
 
+    const submitBtn = this.querySelector('button[type="submit"]');
+    if (submitBtn) submitBtn.disabled = true;
+
     try {
-        const response = await fetch('https://fgwxjjo7j9.execute-api.us-east-1.amazonaws.com/test/users', {
+        const response = await fetch(`${window.APP_CONFIG.apiBaseUrl}/users`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
@@ -38,5 +41,7 @@ document.getElementById('verifyForm').addEventListener('submit', async function
     } catch (error) {
         console.error('Error during account verification:', error);
         alert('An unexpected error occurred.');
+    } finally {
+        if (submitBtn) submitBtn.disabled = false;
     }
 });
\ No newline at end of file
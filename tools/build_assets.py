@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Build public/ into dist/ for deployment:
+
+  * css/*.css and js/*.js are minified and renamed with a content hash
+    (js/login.js -> js/login.3f2a9c1b0d.js), so they can be cached forever
+  * the HTML pages are rewritten to point at the hashed names
+  * js/config.js is regenerated with the API Gateway stage for this deploy
+  * every text asset gets a .gz and a .br copy
+  * asset-manifest.json lists each file with its Content-Type and Cache-Control:
+    immutable for hashed assets, no-cache for the HTML entry points
+
+Usage:
+  pip install -r tools/requirements.txt
+  python tools/build_assets.py [--api-base-url https://.../prod] [--out dist] [--no-brotli]
+
+The build fails when the brotli module is missing; --no-brotli writes gzip copies only.
+
+Upload with the manifest's headers, and serve a .gz/.br copy with the matching
+Content-Encoding when the browser's Accept-Encoding allows it.
+"""
+import os
+import re
+import sys
+import gzip
+import json
+import shutil
+import hashlib
+import argparse
+
+# tools/requirements.txt; only optional with --no-brotli
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DIR = os.path.join(ROOT_DIR, 'public')
+CONFIG_SCRIPT = 'js/config.js'
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.js': 'application/javascript; charset=utf-8',
+    '.json': 'application/json',
+    '.svg': 'image/svg+xml',
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.ico': 'image/x-icon'
+}
+COMPRESSIBLE = ('.html', '.css', '.js', '.json', '.svg')
+# Not part of the site
+SKIPPED = ('.DS_Store', 'testfile')
+
+HASH_LENGTH = 10
+ASSET_REFERENCE_RE = re.compile(r'''(\b(?:src|href)=["'])((?:css|js)/[^"'?#]+)(["'])''')
+API_BASE_URL_RE = re.compile(r"(apiBaseUrl:\s*)'[^']*'")
+
+def _squeeze_css(chunk):
+    chunk = re.sub(r'\s+', ' ', chunk)
+    # Spaces before ':' are kept: "a :hover" and "a:hover" are different selectors
+    chunk = re.sub(r'\s*([{};,>])\s*', r'\1', chunk)
+    return re.sub(r':\s+', ':', chunk).replace(';}', '}')
+
+def minify_css(source):
+    """Drop comments and the whitespace around punctuation; strings are copied as they are."""
+    out = []
+    chunk = []
+    i = 0
+    while i < len(source):
+        char = source[i]
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = len(source) if end < 0 else end + 2
+            chunk.append(' ')
+            continue
+        if char in '"\'':
+            end = i + 1
+            while end < len(source) and source[end] != char:
+                end += 2 if source[end] == '\\' else 1
+            out.append(_squeeze_css(''.join(chunk)))
+            out.append(source[i:end + 1])
+            chunk = []
+            i = end + 1
+            continue
+        chunk.append(char)
+        i += 1
+    out.append(_squeeze_css(''.join(chunk)))
+    return ''.join(out).strip() + '\n'
+
+# A '/' after one of these (or these keywords) starts a regular expression, not a division
+REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+REGEX_KEYWORDS = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'throw'}
+
+def minify_js(source):
+    """
+    Drop comments, indentation and blank lines. Line breaks are kept, so automatic
+    semicolon insertion works as before; strings, template literals and regular
+    expressions are copied as they are.
+    """
+    out = []
+    # One entry per open template literal: the brace depth of its current ${...}
+    templates = []
+    last = ''
+    word = ''
+    i = 0
+    n = len(source)
+
+    def copy_string(start, quote):
+        end = start + 1
+        while end < n and source[end] != quote:
+            end += 2 if source[end] == '\\' else 1
+        return end + 1
+
+    def copy_template(start):
+        """From inside a template literal to its closing ` (returns end, False) or a ${ (end, True)."""
+        end = start
+        while end < n:
+            if source[end] == '\\':
+                end += 2
+            elif source[end] == '`':
+                return end + 1, False
+            elif source.startswith('${', end):
+                return end + 2, True
+            else:
+                end += 1
+        return n, False
+
+    while i < n:
+        char = source[i]
+        if source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end < 0 else end
+            continue
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            continue
+        if char.isspace():
+            start = i
+            while i < n and source[i].isspace():
+                i += 1
+            newline = '\n' in source[start:i]
+            if out and out[-1] == ' ' and newline:
+                # A comment sat between the space and the line break
+                out[-1] = '\n'
+            elif out and out[-1] not in ('\n', ' '):
+                out.append('\n' if newline else ' ')
+            continue
+        if char in '"\'':
+            end = copy_string(i, char)
+            out.append(source[i:end])
+            i, last, word = end, char, ''
+            continue
+        if char == '`' or (char == '}' and templates and templates[-1] == 0):
+            if char == '}':
+                templates.pop()
+            end, expression = copy_template(i + 1)
+            out.append(source[i:end])
+            if expression:
+                templates.append(0)
+            i, last, word = end, '`', ''
+            continue
+        if char == '/' and (not last or last in REGEX_PRECEDERS or word in REGEX_KEYWORDS):
+            end = i + 1
+            in_class = False
+            while end < n and (source[end] != '/' or in_class):
+                if source[end] == '\\':
+                    end += 1
+                elif source[end] == '[':
+                    in_class = True
+                elif source[end] == ']':
+                    in_class = False
+                end += 1
+            end += 1
+            while end < n and source[end].isalpha():
+                end += 1
+            out.append(source[i:end])
+            i, last, word = end, '/', ''
+            continue
+        if templates and char in '{}':
+            templates[-1] += 1 if char == '{' else -1
+        if char.isalnum() or char in '_$':
+            start = i
+            while i < n and (source[i].isalnum() or source[i] in '_$'):
+                i += 1
+            word = source[start:i]
+            out.append(word)
+            last = word[-1]
+            continue
+        out.append(char)
+        last, word = char, ''
+        i += 1
+    return ''.join(out).strip() + '\n'
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+def hashed_name(path, data):
+    stem, extension = os.path.splitext(path)
+    return f"{stem}.{content_hash(data)}{extension}"
+
+def write(out_dir, path, data):
+    target = os.path.join(out_dir, path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as f:
+        f.write(data)
+
+def precompress(out_dir, path, data, with_brotli=True):
+    """Write .gz (and .br) copies when they are smaller; returns their sizes."""
+    sizes = {}
+    if os.path.splitext(path)[1] not in COMPRESSIBLE:
+        return sizes
+    # mtime=0 keeps the output identical between builds of the same input
+    variants = [('gzip', '.gz', lambda raw: gzip.compress(raw, 9, mtime=0))]
+    if with_brotli:
+        variants.append(('br', '.br', lambda raw: brotli.compress(raw, quality=11)))
+    for encoding, suffix, compress in variants:
+        compressed = compress(data)
+        if len(compressed) < len(data):
+            write(out_dir, path + suffix, compressed)
+            sizes[encoding] = len(compressed)
+    return sizes
+
+def source_files():
+    for directory, _, files in os.walk(SOURCE_DIR):
+        for name in sorted(files):
+            if name not in SKIPPED:
+                path = os.path.join(directory, name)
+                yield os.path.relpath(path, SOURCE_DIR).replace(os.sep, '/')
+
+def read(path):
+    with open(os.path.join(SOURCE_DIR, path), 'rb') as f:
+        return f.read()
+
+def render_config(api_base_url):
+    config = read(CONFIG_SCRIPT).decode('utf-8')
+    if api_base_url:
+        if not API_BASE_URL_RE.search(config):
+            raise ValueError(f"No apiBaseUrl in {CONFIG_SCRIPT}")
+        config = API_BASE_URL_RE.sub(lambda m: f"{m.group(1)}'{api_base_url.rstrip('/')}'", config, count=1)
+    return config
+
+def build(out_dir, api_base_url=None, with_brotli=True):
+    """Build SOURCE_DIR into out_dir and return the manifest."""
+    if with_brotli and brotli is None:
+        raise RuntimeError("The brotli module is not installed (pip install -r tools/requirements.txt)")
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+    manifest = {}
+    renamed = {}
+    pages = []
+
+    def record(source, path, data, cache_control):
+        entry = {
+            'path': path,
+            'contentType': CONTENT_TYPES.get(os.path.splitext(path)[1], 'application/octet-stream'),
+            'cacheControl': cache_control,
+            'size': len(data)
+        }
+        compressed = precompress(out_dir, path, data, with_brotli)
+        if compressed:
+            entry['encodings'] = compressed
+        write(out_dir, path, data)
+        manifest[source] = entry
+
+    for path in source_files():
+        extension = os.path.splitext(path)[1]
+        if extension == '.html':
+            pages.append(path)
+            continue
+        if path == CONFIG_SCRIPT:
+            text = render_config(api_base_url)
+        elif extension in MINIFIERS:
+            text = MINIFIERS[extension](read(path).decode('utf-8'))
+        else:
+            text = None
+        data = text.encode('utf-8') if text is not None else read(path)
+        renamed[path] = hashed_name(path, data)
+        record(path, renamed[path], data, IMMUTABLE)
+
+    # Pages are entry points: same names, revalidated on every visit
+    for path in pages:
+        html = read(path).decode('utf-8')
+
+        def rewrite(match):
+            target = renamed.get(match.group(2))
+            if target is None:
+                print(f"warning: {path} references missing {match.group(2)}", file=sys.stderr)
+                return match.group(0)
+            return f"{match.group(1)}{target}{match.group(3)}"
+
+        record(path, path, ASSET_REFERENCE_RE.sub(rewrite, html).encode('utf-8'), REVALIDATE)
+
+    manifest_data = json.dumps({'files': manifest}, indent=2, sort_keys=True).encode('utf-8')
+    write(out_dir, 'asset-manifest.json', manifest_data + b'\n')
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description='Minify, fingerprint and precompress public/ into a deployable directory.')
+    parser.add_argument('--out', default=os.path.join(ROOT_DIR, 'dist'), help='Output directory (replaced on every build)')
+    parser.add_argument('--api-base-url', default=os.environ.get('API_BASE_URL'),
+                        help='API Gateway stage URL for js/config.js (default: $API_BASE_URL, else the checked-in value)')
+    parser.add_argument('--no-brotli', dest='brotli', action='store_false',
+                        help='Write gzip copies only, e.g. where the brotli module is not available')
+    args = parser.parse_args()
+
+    if args.brotli and brotli is None:
+        parser.error("the brotli module is not installed; pip install -r tools/requirements.txt, or pass --no-brotli")
+    manifest = build(args.out, args.api_base_url, args.brotli)
+
+    original = sum(os.path.getsize(os.path.join(SOURCE_DIR, path)) for path in manifest)
+    built = sum(entry['size'] for entry in manifest.values())
+    gzipped = sum(entry.get('encodings', {}).get('gzip', entry['size']) for entry in manifest.values())
+    print(f"{len(manifest)} files: {original} bytes -> {built} minified, {gzipped} gzipped, in {args.out}")
+
+if __name__ == '__main__':
+    main()